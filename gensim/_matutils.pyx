@@ -0,0 +1,85 @@
+#!/usr/bin/env cython
+# cython: boundscheck=False
+# cython: wraparound=False
+# cython: cdivision=True
+# coding: utf-8
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+Optimized (compiled) helpers for `gensim.matutils`.
+
+Do not use directly: `gensim.matutils` falls back to plain numpy if this
+module cannot be imported.
+"""
+
+import numpy as np
+
+from libc.stdlib cimport strtoll, strtod
+
+
+cdef inline const char *skip_blanks(const char *pos, const char *stop) nogil:
+    # skip spaces/tabs (but not newlines) within a line
+    while pos < stop and (pos[0] == b' ' or pos[0] == b'\t' or pos[0] == b'\r'):
+        pos += 1
+    return pos
+
+
+def parse_mm_block(bytes data):
+    """
+    Parse a block of complete Matrix Market coordinate lines ("row col value")
+    from the bytestring `data`.
+
+    Return three numpy arrays of equal length: row ids (int64), column ids (int64)
+    and values (float64), exactly as stored (ie. still 1-based). Empty lines are
+    ignored; any malformed line raises `ValueError`.
+    """
+    cdef Py_ssize_t max_lines = data.count(b'\n') + 1
+    rows_arr = np.empty(max_lines, dtype=np.int64)
+    cols_arr = np.empty(max_lines, dtype=np.int64)
+    vals_arr = np.empty(max_lines, dtype=np.float64)
+    cdef long long[:] rows = rows_arr
+    cdef long long[:] cols = cols_arr
+    cdef double[:] vals = vals_arr
+
+    cdef const char *pos = data  # bytes objects are always NUL-terminated, so strtoX stop safely
+    cdef const char *stop = pos + len(data)
+    cdef char *end
+    cdef Py_ssize_t num_lines = 0
+    cdef const char *error = NULL
+
+    with nogil:
+        while pos < stop:
+            pos = skip_blanks(pos, stop)
+            if pos < stop and pos[0] == b'\n':
+                pos += 1  # empty line
+                continue
+            if pos >= stop:
+                break
+            error = pos
+            rows[num_lines] = strtoll(pos, &end, 10)
+            if end == pos:
+                break
+            pos = skip_blanks(end, stop)
+            if pos >= stop or pos[0] == b'\n':
+                break
+            cols[num_lines] = strtoll(pos, &end, 10)
+            if end == pos:
+                break
+            pos = skip_blanks(end, stop)
+            if pos >= stop or pos[0] == b'\n':
+                break
+            vals[num_lines] = strtod(pos, &end)
+            if end == pos:
+                break
+            pos = skip_blanks(end, stop)
+            if pos < stop and pos[0] != b'\n':
+                break
+            pos += 1
+            num_lines += 1
+            error = NULL
+
+    if error != NULL:
+        line_end = data.find(b'\n', error - <const char *>data)
+        raise ValueError("malformed Matrix Market line: %r" % data[error - <const char *>data: line_end if line_end >= 0 else len(data)])
+    return rows_arr[:num_lines], cols_arr[:num_lines], vals_arr[:num_lines]
@@ -120,12 +120,11 @@ class BleiCorpus(IndexedCorpus):
 
         return offsets
 
-    def docbyoffset(self, offset):
+    def _docbyoffset(self, fin, offset):
         """
-        Return the document stored at file position `offset`.
+        Return the document stored at file position `offset` of the open file `fin`.
         """
-        with utils.smart_open(self.fname) as f:
-            f.seek(offset)
-            return self.line2doc(f.readline())
+        fin.seek(offset)
+        return self.line2doc(fin.readline())
 
 # endclass BleiCorpus
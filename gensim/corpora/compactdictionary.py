@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+
+"""
+This module implements a compact, read-only variant of :class:`Dictionary`, for very
+large vocabularies.
+
+Instead of Python dicts, all tokens are stored as a single sorted UTF-8 blob plus an
+array of offsets into it, and token ids and document frequencies are numpy arrays.
+Saving and loading such a dictionary is very fast, and with `mmap='r'` the arrays are
+memory-mapped instead of loaded:
+
+>>> compact = CompactDictionary(dictionary)  # convert a regular Dictionary
+>>> compact.save('/tmp/wiki.cdict')
+>>> compact = CompactDictionary.load('/tmp/wiki.cdict', mmap='r')
+>>> compact.token2id['computer']
+>>> compact.doc2bow(['human', 'computer', 'interaction'])
+>>> compact.filter_extremes(no_below=5, no_above=0.5)  # vectorized, no dict rebuilding
+"""
+
+from __future__ import with_statement
+
+from collections import Mapping, defaultdict
+import logging
+import struct
+
+import numpy
+
+from gensim import utils
+from gensim.corpora.dictionary import Dictionary, tokenize_batch, count_batch, csr2bows
+
+from six import integer_types, iteritems, string_types
+from six.moves import xrange, map as imap, zip as izip
+
+
+logger = logging.getLogger('gensim.corpora.compactdictionary')
+
+PREFIX = struct.Struct('>Q')  # first 8 bytes of a token, as a big-endian integer (= same order as the bytes)
+
+
+def token_prefixes(blob, offsets):
+    """Return the (zero-padded) first 8 bytes of each token in `blob`, as uint64 integers."""
+    starts, lengths = offsets[:-1], numpy.diff(offsets)
+    prefixes = numpy.zeros((len(lengths), 8), dtype=numpy.uint8)
+    for k in xrange(8):
+        present = lengths > k
+        prefixes[present, k] = blob[starts[present] + k]
+    return prefixes.view(PREFIX.format).ravel().astype(numpy.uint64)
+
+
+class TokenIds(Mapping):
+    """
+    Read-only `token -> id` mapping of a :class:`CompactDictionary`, available as its
+    `token2id` attribute. Lookups are binary searches in the sorted token blob.
+    """
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+
+    def __getitem__(self, token):
+        tokenid = self.dictionary.token_id(token)
+        if tokenid < 0:
+            raise KeyError(token)
+        return tokenid
+
+    def __iter__(self):
+        """Iterate over all tokens, in their (UTF-8 byte) sorted order."""
+        dictionary = self.dictionary
+        for position in xrange(len(dictionary)):
+            yield dictionary.token_at(position)
+
+    def __len__(self):
+        return len(self.dictionary)
+
+
+class CompactDictionary(utils.SaveLoad, Mapping):
+    """
+    CompactDictionary is a read-only mapping between tokens and their integer ids, which
+    keeps its data in a few numpy arrays:
+
+    * `blob`: all tokens, UTF-8 encoded, sorted and concatenated;
+    * `offsets`: start of each token in `blob` (plus the end of the last one);
+    * `ids`: the id of each token, in the sorted order;
+    * `positions`: the reverse mapping, from id to the position in the sorted order
+      (-1 for unused ids);
+    * `docfreqs`: document frequency of each id;
+    * `prefixes`: the first 8 bytes of each sorted token, as integers, to speed up lookups.
+
+    It supports the lookup and conversion API of :class:`Dictionary` (`token2id`,
+    `doc2bow`, `doc2bow_batch`, `filter_extremes`, ...), but no adding of documents; build
+    the vocabulary with a regular :class:`Dictionary` and convert it.
+    """
+    def __init__(self, dictionary=None):
+        """
+        Create a CompactDictionary with the same tokens, ids, document frequencies and corpus
+        statistics as `dictionary` (a :class:`Dictionary`, or any `id -> token` mapping).
+        """
+        if dictionary is None:
+            dictionary = {}
+        token2id = getattr(dictionary, 'token2id', None)
+        if token2id is None:
+            token2id = dict((token, tokenid) for tokenid, token in iteritems(dictionary))
+        pairs = sorted((utils.to_utf8(token), tokenid) for token, tokenid in iteritems(token2id))
+
+        encoded = [token for token, _ in pairs]
+        self.offsets = numpy.zeros(len(pairs) + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.fromiter(imap(len, encoded), dtype=numpy.int64, count=len(encoded)), out=self.offsets[1:])
+        self.blob = numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8).copy()
+        self.ids = numpy.fromiter((tokenid for _, tokenid in pairs), dtype=numpy.int64, count=len(pairs))
+        del encoded, pairs
+
+        num_ids = int(self.ids.max()) + 1 if len(self.ids) else 0
+        self.docfreqs = numpy.zeros(num_ids, dtype=numpy.int64)
+        for tokenid, docfreq in iteritems(getattr(dictionary, 'dfs', {})):
+            if 0 <= tokenid < num_ids:
+                self.docfreqs[tokenid] = docfreq
+        self._index_positions()
+
+        self.num_docs = getattr(dictionary, 'num_docs', 0)  # number of documents processed
+        self.num_pos = getattr(dictionary, 'num_pos', 0)  # total number of corpus positions
+        self.num_nnz = getattr(dictionary, 'num_nnz', 0)  # total number of non-zeroes in the BOW matrix
+
+    def _index_positions(self):
+        """Recompute `positions` from `ids` and `prefixes` from `blob`; unused ids also get
+        a zero document frequency."""
+        self.prefixes = token_prefixes(self.blob, self.offsets)
+        self.positions = numpy.full(len(self.docfreqs), -1, dtype=numpy.int64)
+        self.positions[self.ids] = numpy.arange(len(self.ids))
+        self.docfreqs[self.positions < 0] = 0
+
+    @property
+    def token2id(self):
+        return TokenIds(self)
+
+    @property
+    def dfs(self):
+        """Document frequencies as a `{id: frequency}` dict, for compatibility with
+        :class:`Dictionary`. Use the `docfreqs` array directly where possible."""
+        return dict(izip(self.ids.tolist(), self.docfreqs[self.ids].tolist()))
+
+    def token_at(self, position):
+        """Return the token at `position` of the sorted order, as unicode."""
+        return self.blob[self.offsets[position]: self.offsets[position + 1]].tobytes().decode('utf8')
+
+    def token_id(self, token):
+        """Return the id of `token` (unicode or UTF-8 bytestring), or -1 if unknown."""
+        key = utils.to_utf8(token)
+        blob, offsets = self.blob, self.offsets
+        # narrow down the search to tokens with the same prefix using numpy, then bisect
+        prefix = numpy.uint64(PREFIX.unpack(key[:8].ljust(8, b'\0'))[0])
+        lo = int(numpy.searchsorted(self.prefixes, prefix, side='left'))
+        hi = int(numpy.searchsorted(self.prefixes, prefix, side='right'))
+        end = hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if blob[offsets[mid]: offsets[mid + 1]].tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < end and blob[offsets[lo]: offsets[lo + 1]].tobytes() == key:
+            return int(self.ids[lo])
+        return -1
+
+    def __getitem__(self, tokenid):
+        if not isinstance(tokenid, integer_types + (numpy.integer,)):
+            raise KeyError(tokenid)
+        if not 0 <= tokenid < len(self.positions) or self.positions[tokenid] < 0:
+            raise KeyError(tokenid)
+        return self.token_at(self.positions[tokenid])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        """Return a list of all token ids."""
+        return self.ids.tolist()
+
+    def __len__(self):
+        """
+        Return the number of token->id mappings in the dictionary.
+        """
+        return len(self.ids)
+
+    def __str__(self):
+        some_tokens = [self.token_at(position) for position in xrange(min(5, len(self)))]
+        return "CompactDictionary(%i unique tokens: %s%s)" % (len(self), some_tokens, '...' if len(self) > 5 else '')
+
+    def doc2bow(self, document, allow_update=False, return_missing=False):
+        """
+        Convert `document` (a list of words) into the bag-of-words format = list
+        of `(token_id, token_count)` 2-tuples, see `Dictionary.doc2bow`.
+
+        CompactDictionary is read-only, so `allow_update` is not supported.
+        """
+        if isinstance(document, string_types):
+            raise TypeError("doc2bow expects an array of unicode tokens on input, not a single string")
+        if allow_update:
+            raise ValueError("CompactDictionary is read-only; update a Dictionary and convert it instead")
+
+        counter = defaultdict(int)
+        for w in document:
+            counter[w] += 1
+        result, missing = defaultdict(int), {}
+        for w, freq in iteritems(counter):
+            tokenid = self.token_id(w)
+            if tokenid < 0:
+                missing[w] = freq
+            else:
+                result[tokenid] += freq  # both a unicode and a utf8 version of a word may be present
+
+        # return tokenids, in ascending id order
+        result = sorted(iteritems(result))
+        if return_missing:
+            return result, missing
+        else:
+            return result
+
+    def doc2bow_batch(self, documents, allow_update=False, return_csr=True, dtype=numpy.float64):
+        """
+        Convert many `documents` (lists of words) at once, see `Dictionary.doc2bow_batch`.
+
+        CompactDictionary is read-only, so `allow_update` is not supported.
+        """
+        if allow_update:
+            raise ValueError("CompactDictionary is read-only; update a Dictionary and convert it instead")
+        tokens, positions, lengths = tokenize_batch(documents)
+        termids = numpy.fromiter(imap(self.token_id, tokens), dtype=numpy.int64, count=len(tokens))
+        result = count_batch(lengths, termids[positions], len(self.docfreqs), dtype=dtype if return_csr else numpy.int64)
+        if not return_csr:
+            return csr2bows(result)
+        return result
+
+    def filter_extremes(self, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None):
+        """
+        Filter out tokens that appear in too few or too many documents, and keep only the
+        `keep_n` most frequent ones, see `Dictionary.filter_extremes`.
+
+        After the pruning, shrink resulting gaps in word ids (see `compactify`).
+        """
+        no_above_abs = int(no_above * self.num_docs)  # convert fractional threshold to absolute threshold
+
+        # determine which tokens to keep, as a mask over the sorted tokens
+        docfreqs = self.docfreqs[self.ids]
+        good = (no_below <= docfreqs) & (docfreqs <= no_above_abs)
+        if keep_tokens:
+            keep_ids = [tokenid for tokenid in imap(self.token_id, keep_tokens) if tokenid >= 0]
+            good[self.positions[keep_ids]] = True
+        if keep_n is not None and good.sum() > keep_n:
+            # most frequent first; ties are broken by the lower id
+            candidates = numpy.flatnonzero(good)
+            candidates = candidates[numpy.argsort(self.ids[candidates], kind='mergesort')]
+            candidates = candidates[numpy.argsort(-docfreqs[candidates], kind='mergesort')]
+            good = numpy.zeros(len(self), dtype=bool)
+            good[candidates[:keep_n]] = True
+
+        logger.info("discarding %i tokens", len(self) - good.sum())
+        logger.info(
+            "keeping %i tokens which were in no less than %i and no more than %i (=%.1f%%) documents",
+            good.sum(), no_below, no_above_abs, 100.0 * no_above)
+        self._select(good)
+        self.compactify()
+        logger.info("resulting dictionary: %s", self)
+
+    def filter_n_most_frequent(self, remove_n):
+        """
+        Filter out the `remove_n` most frequent tokens, then shrink resulting gaps in word ids.
+        """
+        docfreqs = self.docfreqs[self.ids]
+        order = numpy.argsort(self.ids, kind='mergesort')
+        order = order[numpy.argsort(-docfreqs[order], kind='mergesort')]
+        good = numpy.ones(len(self), dtype=bool)
+        good[order[:remove_n]] = False
+        logger.info("discarding %i tokens", len(self) - good.sum())
+        self._select(good)
+        self.compactify()
+
+    def filter_tokens(self, bad_ids=None, good_ids=None):
+        """
+        Remove the selected `bad_ids` tokens from all dictionary mappings, or, keep
+        selected `good_ids` in the mapping and remove the rest.
+
+        `bad_ids` and `good_ids` are collections of word ids to be removed.
+        """
+        good = numpy.ones(len(self), dtype=bool)
+        if bad_ids is not None:
+            good &= ~numpy.in1d(self.ids, numpy.fromiter(bad_ids, dtype=numpy.int64))
+        if good_ids is not None:
+            good &= numpy.in1d(self.ids, numpy.fromiter(good_ids, dtype=numpy.int64))
+        self._select(good)
+        self.compactify()
+
+    def _select(self, mask):
+        """Keep only the tokens selected by the boolean `mask` over the sorted tokens."""
+        lengths = numpy.diff(self.offsets)
+        self.blob = self.blob[numpy.repeat(mask, lengths)]
+        self.offsets = numpy.zeros(mask.sum() + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths[mask], out=self.offsets[1:])
+        self.ids = self.ids[mask]
+        self.docfreqs = numpy.array(self.docfreqs)  # copy, the original may be a read-only mmap
+        self._index_positions()
+
+    def compactify(self):
+        """
+        Assign new word ids to all words, removing the gaps in the id series (the relative
+        order of the ids stays the same).
+        """
+        logger.debug("rebuilding dictionary, shrinking gaps")
+        order = numpy.argsort(self.ids, kind='mergesort')  # the sorted position of each new id
+        self.docfreqs = self.docfreqs[self.ids[order]]
+        self.ids = numpy.empty_like(order)
+        self.ids[order] = numpy.arange(len(order))
+        self.positions = order
+
+    def save(self, fname_or_handle, separately=None, *args, **kwargs):
+        """
+        Save the dictionary to a file, see `utils.SaveLoad.save`.
+
+        Unless `separately` says otherwise, all arrays are stored in separate `.npy`
+        files, so that `load(fname, mmap='r')` can memory-map them regardless of size.
+        """
+        if separately is None:
+            separately = ['blob', 'offsets', 'ids', 'positions', 'docfreqs', 'prefixes']
+        super(CompactDictionary, self).save(fname_or_handle, separately, *args, **kwargs)
+
+    def to_dictionary(self):
+        """Convert back to a regular (updatable) :class:`Dictionary`."""
+        result = Dictionary()
+        tokens = [self.token_at(position) for position in xrange(len(self))]
+        result.token2id = dict(izip(tokens, self.ids.tolist()))
+        result.dfs = self.dfs
+        result.num_docs, result.num_pos, result.num_nnz = self.num_docs, self.num_pos, self.num_nnz
+        return result
+# endclass CompactDictionary
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+
+"""
+Corpus stored as a binary, memory-mappable CSR (Compressed Sparse Row) matrix.
+
+Unlike the text-based formats (`MmCorpus` etc.), nothing has to be parsed when
+reading the corpus back: the file holds a small header followed by the raw
+`indices`, `data` and `indptr` arrays of a `scipy.sparse.csr_matrix` with one
+row per document, which are mmap'ed straight from disk.
+
+>>> CsrCorpus.serialize('/tmp/corpus.csr', corpus)
+>>> csr = CsrCorpus('/tmp/corpus.csr')
+>>> print(csr[42])  # O(1) random access
+>>> for chunk in csr.iter_chunks(chunksize=10000):  # scipy.sparse views into the file
+>>>     ...
+
+"""
+
+from __future__ import with_statement
+
+import logging
+import os
+import shutil
+import struct
+
+import numpy
+import scipy.sparse
+
+from gensim import utils
+from gensim.corpora import IndexedCorpus
+from six.moves import xrange, zip as izip
+
+
+logger = logging.getLogger('gensim.corpora.csrcorpus')
+
+MAGIC = b'GSIMCSR\0'
+VERSION = 1
+# magic, version, flags, num_docs, num_terms, num_nnz, indices offset, data offset,
+# indptr offset, indices dtype, data dtype
+HEADER = struct.Struct('<8sIIQQQQQQ4s4s')
+HEADER_SIZE = 128  # bytes reserved for the header at the beginning of the file
+ALIGN = 64  # all arrays start at an offset divisible by ALIGN
+
+
+def _pad(fout):
+    """Pad `fout` with zeros up to the next ALIGN boundary, return the new position."""
+    pos = fout.tell()
+    if pos % ALIGN:
+        fout.write(b'\0' * (ALIGN - pos % ALIGN))
+    return fout.tell()
+
+
+class CsrCorpus(IndexedCorpus):
+    """
+    Corpus in a binary CSR format, with O(1) random access and zero-copy chunking.
+
+    Documents are returned in the standard gensim sparse format (list of
+    `(term_id, value)` 2-tuples), or, via `iter_chunks` and `get_chunk`, as whole
+    `scipy.sparse.csr_matrix` blocks (one row per document) that share memory
+    with the underlying file.
+    """
+    def __init__(self, fname, mmap='r'):
+        """
+        Open the corpus stored in `fname`. With `mmap='r'` (default) the arrays
+        are memory-mapped; use `mmap=None` to load them into RAM instead.
+        """
+        self.fname = fname
+        self.mmap = mmap
+        self.length = None
+        self._open()
+        # document "offsets" are simply the document positions
+        self.index = numpy.arange(self.num_docs)
+        logger.info("loaded %s", self)
+
+    def _open(self):
+        if os.path.getsize(self.fname) == 0:
+            self.num_docs = self.num_terms = self.num_nnz = 0
+            self.indptr = numpy.zeros(1, dtype=numpy.int64)
+            self.indices = numpy.zeros(0, dtype=numpy.int32)
+            self.data = numpy.zeros(0, dtype=numpy.float64)
+            return
+
+        with open(self.fname, 'rb') as fin:
+            magic, version, _, num_docs, num_terms, num_nnz, indices_offset, data_offset, indptr_offset, \
+                indices_dtype, data_dtype = HEADER.unpack(fin.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("%s is not a CsrCorpus file" % self.fname)
+        if version > VERSION:
+            raise ValueError("unsupported CsrCorpus version %i in %s" % (version, self.fname))
+        self.num_docs, self.num_terms, self.num_nnz = num_docs, num_terms, num_nnz
+
+        if self.mmap is None:
+            buf = numpy.fromfile(self.fname, dtype=numpy.uint8)
+        else:
+            buf = numpy.memmap(self.fname, dtype=numpy.uint8, mode=self.mmap)
+
+        def view(offset, dtype, length):
+            dtype = numpy.dtype(dtype.rstrip(b'\0').decode('ascii'))
+            return buf[offset: offset + length * dtype.itemsize].view(dtype)
+
+        self.indices = view(indices_offset, indices_dtype, num_nnz)
+        self.data = view(data_offset, data_dtype, num_nnz)
+        self.indptr = view(indptr_offset, b'<i8', num_docs + 1)
+
+    def __getstate__(self):
+        # don't pickle the (possibly mmap'ed) arrays, reopen the file on unpickling instead
+        result = super(CsrCorpus, self).__getstate__()
+        for attr in ('indptr', 'indices', 'data'):
+            result.pop(attr, None)
+        return result
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return self.num_docs
+
+    def __str__(self):
+        return ("CsrCorpus(%i documents, %i features, %i non-zero entries)" %
+                (self.num_docs, self.num_terms, self.num_nnz))
+
+    def __iter__(self):
+        """
+        Iterate over the corpus, yielding one document at a time.
+        """
+        return self._iter_range(0, self.num_docs)
+
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate over the `partno`-th of `num_partitions` contiguous ranges of documents.
+        """
+        return self._iter_range(*utils.partition_range(self.num_docs, partno, num_partitions))
+
+    def _iter_range(self, docstart, docstop):
+        chunksize = 4096
+        for start in xrange(docstart, docstop, chunksize):
+            stop = min(start + chunksize, docstop)
+            # convert whole chunks to Python lists at once, that's much faster than per document
+            lo, hi = int(self.indptr[start]), int(self.indptr[stop])
+            termids, vals = self.indices[lo: hi].tolist(), self.data[lo: hi].tolist()
+            bounds = (self.indptr[start: stop + 1] - lo).tolist()
+            for docstart, docend in izip(bounds, bounds[1:]):
+                yield list(izip(termids[docstart: docend], vals[docstart: docend]))
+
+    def docbyoffset(self, offset):
+        """
+        Return the document at position `offset` (for `CsrCorpus`, document
+        offsets are simply document positions).
+        """
+        start, end = self.indptr[offset], self.indptr[offset + 1]
+        return list(izip(self.indices[start: end].tolist(), self.data[start: end].tolist()))
+
+    def get_chunk(self, start, stop):
+        """
+        Return documents `start` to `stop` (exclusive) as a `scipy.sparse.csr_matrix`
+        of shape `(stop - start, num_terms)`.
+
+        The `indices` and `data` arrays of the result are views into the underlying
+        (mmap'ed) file, only the small `indptr` array is copied.
+        """
+        start, stop = max(0, start), min(stop, self.num_docs)
+        stop = max(start, stop)
+        lo, hi = self.indptr[start], self.indptr[stop]
+        indptr = self.indptr[start: stop + 1] - lo
+        if hi - lo <= numpy.iinfo(self.indices.dtype).max:
+            # scipy.sparse would upcast (=copy) `indices` if `indptr` had a different dtype
+            indptr = indptr.astype(self.indices.dtype)
+        return scipy.sparse.csr_matrix(
+            (self.data[lo: hi], self.indices[lo: hi], indptr),
+            shape=(stop - start, self.num_terms), copy=False)
+
+    def iter_chunks(self, chunksize=10000):
+        """
+        Iteratively yield the corpus as `scipy.sparse.csr_matrix` chunks of (at most)
+        `chunksize` documents each, see `get_chunk`.
+        """
+        for start in xrange(0, self.num_docs, chunksize):
+            yield self.get_chunk(start, start + chunksize)
+
+    @staticmethod
+    def save_corpus(fname, corpus, id2word=None, progress_cnt=10000, metadata=False, dtype=numpy.float64):
+        """
+        Save a corpus in the binary CSR format, with values stored as `dtype`.
+
+        This function is automatically called by `CsrCorpus.serialize`; don't
+        call it directly, call `serialize` instead.
+
+        Term ids are stored as 32-bit integers, unless `id2word` says that more
+        than 2**31 of them are needed. The document values are written into a
+        temporary file `fname.tmp` first, which is removed once the corpus is saved.
+        """
+        logger.info("storing corpus in CSR format to %s", fname)
+        if metadata:
+            logger.warning("CsrCorpus doesn't support storing document metadata")
+
+        index_dtype = numpy.dtype('<i4')
+        if id2word is not None and len(id2word) > numpy.iinfo(index_dtype).max:
+            index_dtype = numpy.dtype('<i8')
+        dtype = numpy.dtype(dtype).newbyteorder('<')
+        max_termid = numpy.iinfo(index_dtype).max
+
+        indptr, num_terms = [0], 0 if id2word is None else len(id2word)
+        ids_buf, vals_buf = [], []
+        tmp_fname = fname + '.tmp'
+        with open(fname, 'wb') as fout, open(tmp_fname, 'wb') as fdata:
+            fout.write(b'\0' * HEADER_SIZE)
+            indices_offset = fout.tell()
+
+            def flush():
+                ids = numpy.array(ids_buf, dtype=numpy.int64)
+                if len(ids) and ids.max() > max_termid:
+                    raise ValueError("term id %i too large to store as %s" % (ids.max(), index_dtype))
+                ids.astype(index_dtype).tofile(fout)
+                numpy.array(vals_buf, dtype=dtype).tofile(fdata)
+                del ids_buf[:], vals_buf[:]
+
+            for docno, doc in enumerate(corpus):
+                if docno % progress_cnt == 0:
+                    logger.info("PROGRESS: saving document #%i", docno)
+                for termid, val in doc:
+                    ids_buf.append(termid)
+                    vals_buf.append(val)
+                    if termid >= num_terms:
+                        num_terms = termid + 1
+                indptr.append(indptr[-1] + len(doc))
+                if len(ids_buf) >= 1000000:
+                    flush()
+            flush()
+
+        num_docs, num_nnz = len(indptr) - 1, indptr[-1]
+        try:
+            with open(fname, 'r+b') as fout, open(tmp_fname, 'rb') as fdata:
+                fout.seek(0, os.SEEK_END)
+                data_offset = _pad(fout)
+                shutil.copyfileobj(fdata, fout)
+                indptr_offset = _pad(fout)
+                numpy.array(indptr, dtype='<i8').tofile(fout)
+                fout.seek(0)
+                fout.write(HEADER.pack(
+                    MAGIC, VERSION, 0, num_docs, num_terms, num_nnz,
+                    indices_offset, data_offset, indptr_offset,
+                    index_dtype.str.encode('ascii'), dtype.str.encode('ascii')))
+        finally:
+            os.remove(tmp_fname)
+
+        logger.info("saved %ix%i CSR matrix with %i non-zero entries to %s", num_docs, num_terms, num_nnz, fname)
+        return numpy.arange(num_docs)
+
+# endclass CsrCorpus
@@ -17,16 +17,20 @@ with other dictionary (:func:`Dictionary.merge_with`) etc.
 
 from __future__ import with_statement
 
-from collections import Mapping, defaultdict
+from collections import Mapping, defaultdict, deque
 import sys
 import logging
 import itertools
+import multiprocessing
+
+import numpy
+import scipy.sparse
 
 from gensim import utils
 
 from six import PY3, iteritems, iterkeys, itervalues, string_types
 from six.moves import xrange
-from six.moves import zip as izip
+from six.moves import map as imap, zip as izip
 
 if sys.version_info[0] >= 3:
     unicode = str
@@ -35,6 +39,61 @@ if sys.version_info[0] >= 3:
 logger = logging.getLogger('gensim.corpora.dictionary')
 
 
+def tokenize_batch(documents):
+    """
+    Collect all tokens from `documents` (a sequence of lists of tokens) in one pass.
+
+    Return a 3-tuple: the list of distinct tokens, in the order of their first
+    appearance (on Python 3.6+); a numpy array with the position of each token of
+    each document in that list; and a numpy array with the number of tokens in each
+    document.
+    """
+    documents = list(documents)
+    if any(isinstance(document, string_types) for document in documents):
+        raise TypeError("doc2bow expects an array of unicode tokens on input, not a single string")
+    documents = [document if isinstance(document, (list, tuple)) else list(document) for document in documents]
+    lengths = numpy.fromiter(imap(len, documents), dtype=numpy.int64, count=len(documents))
+    # the per-token work is done by builtins only, which is several times faster than a Python loop
+    tokens = list(dict.fromkeys(itertools.chain.from_iterable(documents)))
+    vocab = dict(izip(tokens, xrange(len(tokens))))
+    positions = numpy.fromiter(
+        imap(vocab.__getitem__, itertools.chain.from_iterable(documents)),
+        dtype=numpy.int64, count=int(lengths.sum()))
+    return tokens, positions, lengths
+
+
+def count_batch(lengths, termids, num_terms, dtype=numpy.float64):
+    """
+    Count the occurrences of `termids` (a numpy int array, with -1 for tokens to ignore),
+    belonging to consecutive documents of `lengths` tokens each.
+
+    Return a `scipy.sparse.csr_matrix` of shape `(len(lengths), num_terms)` with one row
+    per document, with sorted column indices.
+    """
+    docids = numpy.repeat(numpy.arange(len(lengths), dtype=numpy.int64), lengths)
+    known = termids >= 0
+    # one key per (document, term) pair; numpy.unique sorts them by document, then term
+    keys, counts = numpy.unique(docids[known] * max(num_terms, 1) + termids[known], return_counts=True)
+    indptr = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(keys // max(num_terms, 1), minlength=len(lengths)), out=indptr[1:])
+    return scipy.sparse.csr_matrix(
+        (counts.astype(dtype), keys % max(num_terms, 1), indptr), shape=(len(lengths), num_terms))
+
+
+def build_partial(documents):
+    """Build a Dictionary from a chunk of `documents`; used by the worker processes of
+    `Dictionary.add_documents`."""
+    result = Dictionary()
+    result.doc2bow_batch(documents, allow_update=True)
+    return result
+
+
+def csr2bows(csr):
+    """Convert the rows of `csr` into a list of documents in the gensim bag-of-words format."""
+    termids, counts, indptr = csr.indices.tolist(), csr.data.tolist(), csr.indptr.tolist()
+    return [list(izip(termids[start: end], counts[start: end])) for start, end in izip(indptr, indptr[1:])]
+
+
 class Dictionary(utils.SaveLoad, Mapping):
     """
     Dictionary encapsulates the mapping between normalized words and their integer ids.
@@ -42,7 +101,7 @@ class Dictionary(utils.SaveLoad, Mapping):
     The main function is `doc2bow`, which converts a collection of words to its
     bag-of-words representation: a list of (word_id, word_frequency) 2-tuples.
     """
-    def __init__(self, documents=None, prune_at=2000000):
+    def __init__(self, documents=None, prune_at=2000000, processes=None):
         """
         If `documents` are given, use them to initialize Dictionary (see `add_documents()`).
         """
@@ -55,7 +114,7 @@ class Dictionary(utils.SaveLoad, Mapping):
         self.num_nnz = 0  # total number of non-zeroes in the BOW matrix
 
         if documents is not None:
-            self.add_documents(documents, prune_at=prune_at)
+            self.add_documents(documents, prune_at=prune_at, processes=processes)
 
     def __getitem__(self, tokenid):
         if len(self.id2token) != len(self.token2id):
@@ -92,10 +151,10 @@ class Dictionary(utils.SaveLoad, Mapping):
         return "Dictionary(%i unique tokens: %s%s)" % (len(self), some_keys, '...' if len(self) > 5 else '')
 
     @staticmethod
-    def from_documents(documents):
-        return Dictionary(documents=documents)
+    def from_documents(documents, processes=None):
+        return Dictionary(documents=documents, processes=processes)
 
-    def add_documents(self, documents, prune_at=2000000):
+    def add_documents(self, documents, prune_at=2000000, processes=None):
         """
         Update dictionary from a collection of documents. Each document is a list
         of tokens = **tokenized and normalized** strings (either utf8 or unicode).
@@ -105,23 +164,79 @@ class Dictionary(utils.SaveLoad, Mapping):
         total number of unique words <= `prune_at`. This is to save memory on very
         large inputs. To disable this pruning, set `prune_at=None`.
 
+        With `processes` > 1, the documents are counted in chunks of 10,000 documents
+        by that many worker processes, and the partial results merged in the original
+        order (see `merge_partial`). The resulting dictionary, including its ids, is
+        exactly the same as with the default serial processing.
+
         >>> print(Dictionary(["máma mele maso".split(), "ema má máma".split()]))
         Dictionary(5 unique tokens)
         """
-        for docno, document in enumerate(documents):
-            # log progress & run a regular check for pruning, once every 10k docs
-            if docno % 10000 == 0:
+        chunks = utils.grouper(documents, 10000)
+        if processes is not None and processes > 1:
+            pool = multiprocessing.Pool(processes)
+            chunks = self._build_partials(pool, chunks, processes)
+        else:
+            pool = None
+
+        try:
+            for chunkno, chunk in enumerate(chunks):
+                # log progress & run a regular check for pruning, once every 10k docs
                 if prune_at is not None and len(self) > prune_at:
                     self.filter_extremes(no_below=0, no_above=1.0, keep_n=prune_at)
-                logger.info("adding document #%i to %s", docno, self)
+                logger.info("adding document #%i to %s", chunkno * 10000, self)
 
-            # update Dictionary with the document
-            self.doc2bow(document, allow_update=True)  # ignore the result, here we only care about updating token ids
+                # update Dictionary with the documents
+                if pool is None:
+                    self.doc2bow_batch(chunk, allow_update=True)  # ignore the result, here we only care about updating token ids
+                else:
+                    self.merge_partial(chunk)
+        finally:
+            if pool is not None:
+                pool.terminate()
 
         logger.info(
             "built %s from %i documents (total %i corpus positions)",
             self, self.num_docs, self.num_pos)
 
+    @staticmethod
+    def _build_partials(pool, chunks, processes):
+        """Yield `build_partial` of each of `chunks` computed by `pool`, in the original order.
+        At most two chunks per worker are in flight at any time, to bound memory use."""
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(build_partial, (chunk,)))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def merge_partial(self, other):
+        """
+        Add the counts of the Dictionary `other` (with no gaps in its ids), built from
+        documents that come right after the documents seen by this dictionary so far.
+
+        Unlike `merge_with`, which maps the ids of an independent dictionary, this assigns
+        ids to new tokens in the order of `other`'s ids, and adds up document frequencies
+        and corpus statistics. So merging dictionaries built over consecutive shards of a
+        corpus (in order) gives the same result as building one dictionary over the whole
+        corpus, ids included.
+        """
+        id2token = [None] * len(other.token2id)
+        for token, tokenid in iteritems(other.token2id):
+            id2token[tokenid] = token
+
+        token2id, dfs, other_dfs = self.token2id, self.dfs, other.dfs
+        for other_id, token in enumerate(id2token):
+            tokenid = token2id.get(token)
+            if tokenid is None:
+                tokenid = token2id[token] = len(token2id)
+            dfs[tokenid] = dfs.get(tokenid, 0) + other_dfs.get(other_id, 0)
+
+        self.num_docs += other.num_docs
+        self.num_pos += other.num_pos
+        self.num_nnz += other.num_nnz
+
     def doc2bow(self, document, allow_update=False, return_missing=False):
         """
         Convert `document` (a list of words) into the bag-of-words format = list
@@ -172,6 +287,55 @@ class Dictionary(utils.SaveLoad, Mapping):
         else:
             return result
 
+    def doc2bow_batch(self, documents, allow_update=False, return_csr=True, dtype=numpy.float64):
+        """
+        Convert many `documents` (lists of words) at once, see `doc2bow`.
+
+        Return a `scipy.sparse.csr_matrix` of shape `(len(documents), max id + 1)` with
+        one row per document, holding the token counts as `dtype`. With `return_csr=False`,
+        return a list of documents in the bag-of-words format instead, same as calling
+        `doc2bow` on each document.
+
+        Each distinct word is looked up in the dictionary only once per batch, and the
+        counting is done by numpy, so this is much faster than calling `doc2bow` repeatedly.
+
+        If `allow_update` is set, then also update dictionary in the process: create ids
+        for new words and update the document frequencies and corpus statistics
+        (`dfs`, `num_docs`, `num_pos`, `num_nnz`), exactly like `doc2bow` would.
+        """
+        tokens, positions, lengths = tokenize_batch(documents)
+
+        token2id = self.token2id
+        termids = numpy.empty(len(tokens), dtype=numpy.int64)
+        for position, w in enumerate(tokens):
+            w = w if isinstance(w, unicode) else unicode(w, 'utf-8')
+            tokenid = token2id.get(w)
+            if tokenid is None:
+                if allow_update:
+                    # new id = number of ids made so far;
+                    # NOTE this assumes there are no gaps in the id sequence!
+                    tokenid = token2id[w] = len(token2id)
+                else:
+                    tokenid = -1
+            termids[position] = tokenid
+
+        # ids may have gaps (after `filter_tokens` with `compact=False`), so size by the largest id
+        num_terms = max(itervalues(token2id)) + 1 if token2id else 0
+        result = count_batch(lengths, termids[positions], num_terms, dtype=dtype if return_csr else numpy.int64)
+
+        if allow_update:
+            self.num_docs += len(lengths)
+            self.num_pos += len(positions)
+            self.num_nnz += result.nnz
+            # increase document count for each unique token that appeared in each document
+            dfs = self.dfs
+            for tokenid, docfreq in izip(*(a.tolist() for a in numpy.unique(result.indices, return_counts=True))):
+                dfs[tokenid] = dfs.get(tokenid, 0) + docfreq
+
+        if not return_csr:
+            return csr2bows(result)
+        return result
+
     def filter_extremes(self, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None):
         """
         Filter out tokens that appear in
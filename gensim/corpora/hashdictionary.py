@@ -19,6 +19,13 @@ advantage: HashDictionary can be used with non-repeatable (once-only) streams of
 A disadvantage of HashDictionary is that, unlike plain :class:`Dictionary`, several words may map
 to the same id, causing hash collisions. The word<->id mapping is no longer a bijection.
 
+For streaming vectorization in constant memory, turn off the debug bookkeeping and convert
+documents in batches; with the default adler32 hash, the hashing is vectorized, too:
+
+>>> hashdict = HashDictionary(id_range=2**20, debug=False)
+>>> for chunk in utils.grouper(texts, 10000):
+>>>     csr = hashdict.doc2bow_batch(chunk)  # scipy.sparse.csr_matrix, one row per document
+
 """
 
 from __future__ import with_statement
@@ -27,13 +34,41 @@ import logging
 import itertools
 import zlib
 
+import numpy
+
 from gensim import utils
-from six import iteritems, iterkeys
+from gensim.corpora.dictionary import tokenize_batch, count_batch, csr2bows
+from six import PY2, iteritems, iterkeys
+from six.moves import map as imap, zip as izip
 
 
 logger = logging.getLogger(__name__)
 
 
+def adler32_batch(tokens):
+    """
+    Compute `zlib.adler32` of all bytestrings in `tokens` at once, with numpy.
+
+    Return a numpy array of the (unsigned) checksums, as int64.
+    """
+    # adler32 = B << 16 | A, where A = 1 + sum of the bytes and B = sum of all the
+    # intermediate A values = length + sum of each byte times its distance from the end,
+    # all modulo 65521. The sums fit into int64 for tokens of up to ~10M bytes.
+    lengths = numpy.fromiter(imap(len, tokens), dtype=numpy.int64, count=len(tokens))
+    data = numpy.frombuffer(b''.join(tokens), dtype=numpy.uint8).astype(numpy.int64)
+    ends = numpy.cumsum(lengths)
+    distances = numpy.repeat(ends, lengths) - numpy.arange(len(data))
+
+    def segment_sums(values):
+        cumulative = numpy.zeros(len(values) + 1, dtype=numpy.int64)
+        numpy.cumsum(values, out=cumulative[1:])
+        return cumulative[ends] - cumulative[ends - lengths]
+
+    a = (1 + segment_sums(data)) % 65521
+    b = (lengths + segment_sums(data * distances)) % 65521
+    return (b << 16) | a
+
+
 class HashDictionary(utils.SaveLoad, dict):
     """
     HashDictionary encapsulates the mapping between normalized words and their
@@ -51,7 +86,8 @@ class HashDictionary(utils.SaveLoad, dict):
         """
         By default, keep track of debug statistics and mappings. If you find yourself
         running out of memory (or are sure you don't need the debug info), set
-        `debug=False`.
+        `debug=False`: the dictionary then only keeps the overall corpus statistics
+        and uses constant memory, no matter how many documents it processes.
         """
         self.myhash = myhash  # hash fnc: string->integer
         self.id_range = id_range  # hash range: id = myhash(key) % id_range
@@ -90,6 +126,27 @@ class HashDictionary(utils.SaveLoad, dict):
             self.id2token.setdefault(h, set()).add(token)
         return h
 
+    def restricted_hash_batch(self, tokens):
+        """
+        Calculate ids of all `tokens` at once, same as calling `restricted_hash` on each.
+
+        With the default `myhash=zlib.adler32`, the hashes are computed by numpy
+        (see `adler32_batch`) instead of one by one.
+        """
+        if self.myhash is not zlib.adler32:
+            return numpy.fromiter(imap(self.restricted_hash, tokens), dtype=numpy.int64, count=len(tokens))
+
+        hashes = adler32_batch([utils.to_utf8(token) for token in tokens])
+        if PY2:
+            # zlib.adler32 returns signed integers in Python 2
+            hashes[hashes >= 2 ** 31] -= 2 ** 32
+        result = hashes % self.id_range
+        if self.debug:
+            for token, h in izip(tokens, result.tolist()):
+                self.token2id[token] = h
+                self.id2token.setdefault(h, set()).add(token)
+        return result
+
     def __len__(self):
         """
         Return the number of distinct ids = the entire dictionary size.
@@ -112,13 +169,12 @@ class HashDictionary(utils.SaveLoad, dict):
         Build dictionary from a collection of documents. Each document is a list
         of tokens = **tokenized and normalized** utf-8 encoded strings.
 
-        This is only a convenience wrapper for calling `doc2bow` on each document
-        with `allow_update=True`.
+        This is only a convenience wrapper for calling `doc2bow_batch` on chunks of
+        documents with `allow_update=True`.
         """
-        for docno, document in enumerate(documents):
-            if docno % 10000 == 0:
-                logger.info("adding document #%i to %s" % (docno, self))
-            _ = self.doc2bow(document, allow_update=True)  # ignore the result, here we only care about updating token ids
+        for chunkno, chunk in enumerate(utils.grouper(documents, 10000)):
+            logger.info("adding document #%i to %s" % (chunkno * 10000, self))
+            _ = self.doc2bow_batch(chunk, allow_update=True)  # ignore the result, here we only care about updating token ids
         logger.info(
             "built %s from %i documents (total %i corpus positions)",
             self, self.num_docs, self.num_pos)
@@ -165,6 +221,44 @@ class HashDictionary(utils.SaveLoad, dict):
         else:
             return result
 
+    def doc2bow_batch(self, documents, allow_update=False, return_csr=True, dtype=numpy.float64):
+        """
+        Convert many `documents` (lists of words) at once, see `doc2bow`.
+
+        Return a `scipy.sparse.csr_matrix` of shape `(len(documents), self.id_range)`
+        with one row per document, holding the token counts as `dtype`. With
+        `return_csr=False`, return a list of documents in the bag-of-words format
+        instead, same as calling `doc2bow` on each document.
+
+        Each distinct word is hashed only once per batch (see `restricted_hash_batch`), and
+        the counting is done by numpy, so this is much faster than calling `doc2bow` repeatedly.
+        Corpus statistics are updated in bulk, under the same conditions as in `doc2bow`.
+        """
+        tokens, positions, lengths = tokenize_batch(documents)
+        termids = self.restricted_hash_batch(tokens)
+        result = count_batch(lengths, termids[positions], self.id_range, dtype=dtype if return_csr else numpy.int64)
+
+        if self.debug:
+            # increment document count for each unique token that appeared in each document
+            docids = numpy.repeat(numpy.arange(len(lengths), dtype=numpy.int64), lengths)
+            pairs = numpy.unique(docids * max(len(tokens), 1) + positions)
+            dfs_debug = self.dfs_debug
+            for position, docfreq in izip(*(a.tolist() for a in numpy.unique(pairs % max(len(tokens), 1), return_counts=True))):
+                dfs_debug[tokens[position]] = dfs_debug.get(tokens[position], 0) + docfreq
+
+        if allow_update or self.allow_update:
+            self.num_docs += len(lengths)
+            self.num_pos += len(positions)
+            self.num_nnz += result.nnz
+            if self.debug:
+                # increment document count for each unique tokenid that appeared in each document
+                for tokenid, docfreq in izip(*(a.tolist() for a in numpy.unique(result.indices, return_counts=True))):
+                    self.dfs[tokenid] = self.dfs.get(tokenid, 0) + docfreq
+
+        if not return_csr:
+            return csr2bows(result)
+        return result
+
     def filter_extremes(self, no_below=5, no_above=0.5, keep_n=100000):
         """
         Remove document frequency statistics for tokens that appear in
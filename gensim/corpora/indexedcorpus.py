@@ -15,9 +15,15 @@ While the standard corpus interface in gensim allows iterating over corpus with
 This functionality is achieved by storing an extra file (by default named the same
 as the corpus file plus '.index' suffix) that stores the byte offset of the beginning
 of each document.
+
+Documents are read through a small pool of file handles that stay open between
+calls, and batches of documents (`corpus[list_of_docnos]`, `corpus[slice]`) are
+read in the order of their file offsets, so that random-sampling workloads don't
+pay a file open (or, for compressed files, a re-decompression) per document.
 """
 
 import logging
+from contextlib import contextmanager
 import six
 
 import numpy
@@ -54,6 +60,13 @@ class IndexedCorpus(interfaces.CorpusABC):
         except:
             self.index = None
         self.length = None
+        # statistics of the corpus file (number of documents, non-zeros, terms), if saved next to it
+        self.stats = utils.load_corpus_stats(fname)
+
+    # how many open file handles to keep around between `docbyoffset` calls
+    max_open_handles = 4
+    # how many documents to read at once when iterating over a sliced corpus
+    batchsize = 10000
 
     @classmethod
     def serialize(serializer, fname, corpus, id2word=None, index_fname=None, progress_cnt=None, labels=None, metadata=False):
@@ -76,6 +89,10 @@ class IndexedCorpus(interfaces.CorpusABC):
         >>> MmCorpus.serialize('test.mm', corpus)
         >>> mm = MmCorpus('test.mm') # `mm` document stream now has random access
         >>> print(mm[42]) # retrieve document no. 42, etc.
+
+        If `fname` ends with '.bgz', the corpus is stored block-compressed (see
+        `utils.BlockCompressedWriter`): the file is a valid gzip file, but unlike
+        with '.gz', random access only has to decompress a single small block.
         """
         if getattr(corpus, 'fname', None) == fname:
             raise ValueError("identical input vs. output corpus filename, refusing to serialize: %s" % fname)
@@ -83,6 +100,7 @@ class IndexedCorpus(interfaces.CorpusABC):
         if index_fname is None:
             index_fname = utils.smart_extension(fname, '.index')
 
+        corpus = CorpusStatsRecorder(corpus, metadata)
         if progress_cnt is not None:
             if labels is not None:
                 offsets = serializer.save_corpus(fname, corpus, id2word, labels=labels, progress_cnt=progress_cnt, metadata=metadata)
@@ -106,19 +124,34 @@ class IndexedCorpus(interfaces.CorpusABC):
         logger.info("saving %s index to %s" % (serializer.__name__, index_fname))
         utils.pickle(offsets, index_fname)
 
+        if corpus.num_docs == len(offsets) and isinstance(fname, six.string_types):
+            num_terms = corpus.num_terms if id2word is None else max(corpus.num_terms, len(id2word))
+            utils.save_corpus_stats(fname, corpus.num_docs, corpus.num_nnz, num_terms)
+
     def __len__(self):
         """
-        Return the index length if the corpus is indexed. Otherwise, make a pass
-        over self to calculate the corpus length and cache this number.
+        Return the index length if the corpus is indexed, or the number of documents
+        from the saved corpus statistics (see `utils.save_corpus_stats`). Otherwise,
+        make a pass over self to calculate the corpus length and cache this number
+        (in memory only: statistics are saved by `serialize` alone).
         """
         if self.index is not None:
             return len(self.index)
+        if self.length is None and getattr(self, 'stats', None) is not None:
+            self.length = self.stats['num_docs']
         if self.length is None:
             logger.info("caching corpus length")
             self.length = sum(1 for doc in self)
         return self.length
 
     def __getitem__(self, docno):
+        """
+        Return document `docno`, or, for a slice, list or numpy array of document
+        numbers, a (lazy) sliced corpus.
+
+        Documents of a sliced corpus are fetched in batches of `self.batchsize`
+        via `docbyoffsets`, in file order.
+        """
         if self.index is None:
             raise RuntimeError("cannot call corpus[docid] without an index")
 
@@ -129,6 +162,124 @@ class IndexedCorpus(interfaces.CorpusABC):
         else:
             raise ValueError('Unrecognised value for docno, use either a single integer, a slice or a numpy.ndarray')
 
+    def __getstate__(self):
+        result = self.__dict__.copy()
+        # open file handles can't be pickled
+        result.pop('_handles', None)
+        return result
+
+    @contextmanager
+    def open_handle(self):
+        """
+        Yield a file handle to `self.fname`, taken from a pool of handles kept
+        open between calls (the handle is returned to the pool afterwards).
+        """
+        if not isinstance(self.fname, six.string_types):
+            # corpus backed by an already open file-like object: there's nothing to pool
+            yield self.fname
+            return
+        handles = self.__dict__.setdefault('_handles', [])
+        try:
+            fin = handles.pop()  # list.pop() and append() are atomic => thread-safe
+        except IndexError:
+            fin = utils.smart_open(self.fname)
+        try:
+            yield fin
+        finally:
+            if len(handles) < self.max_open_handles:
+                handles.append(fin)
+            else:
+                fin.close()
+
+    def close(self):
+        """Close all pooled file handles (they're reopened on demand)."""
+        for fin in self.__dict__.pop('_handles', []):
+            fin.close()
+
+    def docbyoffset(self, offset):
+        """
+        Return the document stored at file position `offset`.
+
+        Subclasses either override this method directly, or implement
+        `_docbyoffset(fin, offset)`, which reads the document from an already
+        opened file `fin`, and get handle pooling and batching for free.
+        """
+        with self.open_handle() as fin:
+            return self._docbyoffset(fin, offset)
+
+    def docbyoffsets(self, offsets):
+        """
+        Return the list of documents stored at file positions `offsets`, in the
+        same order as `offsets`.
+
+        The documents are read in ascending offset order through a single file
+        handle (so that reads are sequential and, for compressed files, each part
+        of the file is decompressed at most once), and duplicates are read only once.
+        """
+        offsets = numpy.asarray(offsets)
+        if not hasattr(self, '_docbyoffset'):
+            # subclass only supports one document at a time
+            return [self.docbyoffset(offset) for offset in offsets]
 
+        docs = [None] * len(offsets)
+        prev_offset, doc = None, None
+        with self.open_handle() as fin:
+            for pos in numpy.argsort(offsets, kind='mergesort'):
+                offset = offsets[pos]
+                if offset != prev_offset:
+                    doc = self._docbyoffset(fin, offset)
+                    prev_offset = offset
+                    docs[pos] = doc
+                else:
+                    docs[pos] = list(doc)
+        return docs
+
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate over the `partno`-th of `num_partitions` contiguous ranges of
+        document numbers, reading the documents at their indexed offsets (in
+        batches, see `docbyoffsets`).
+        """
+        if self.index is None:
+            raise RuntimeError("cannot partition a corpus without an index")
+        start, end = utils.partition_range(len(self.index), partno, num_partitions)
+        return iter(utils.SlicedCorpus(self, slice(start, end)))
 
 # endclass IndexedCorpus
+
+
+class CorpusStatsRecorder(object):
+    """
+    Proxy for `corpus` that counts the documents, non-zero entries and terms (1 + the
+    highest term id) of the documents as they pass through its iteration.
+
+    All other attribute access is forwarded to `corpus`. If `metadata` is set, items
+    of `corpus` that come as `(document, metadata)` 2-tuples are recognized too.
+    """
+    def __init__(self, corpus, metadata=False):
+        self.__dict__.update(corpus=corpus, metadata_items=metadata, num_docs=0, num_nnz=0, num_terms=0)
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['corpus'], name)
+
+    def __setattr__(self, name, value):
+        # serializers switch attributes such as `metadata` of the corpus on and off
+        setattr(self.corpus, name, value)
+
+    def __len__(self):
+        return len(self.corpus)
+
+    def __iter__(self):
+        num_docs = num_nnz = num_terms = 0
+        for item in self.corpus:
+            doc = item
+            if self.metadata_items and isinstance(item, tuple) and len(item) == 2 and not isinstance(item[0], tuple):
+                doc = item[0]
+            num_docs += 1
+            num_nnz += len(doc)
+            for termid, _ in doc:
+                if termid >= num_terms:
+                    num_terms = termid + 1
+            yield item
+        self.__dict__.update(num_docs=num_docs, num_nnz=num_nnz, num_terms=num_terms)
+# endclass CorpusStatsRecorder
@@ -88,6 +88,8 @@ class LowCorpus(IndexedCorpus):
                      (self.num_docs, self.num_terms, fname))
 
     def _calculate_num_docs(self):
+        if self.stats is not None:
+            return self.stats['num_docs']
         # the first line in input data is the number of documents (integer). throws exception on bad input.
         with utils.smart_open(self.fname) as fin:
             try:
@@ -170,13 +172,12 @@ class LowCorpus(IndexedCorpus):
                             truncated)
         return offsets
 
-    def docbyoffset(self, offset):
+    def _docbyoffset(self, fin, offset):
         """
-        Return the document stored at file position `offset`.
+        Return the document stored at file position `offset` of the open file `fin`.
         """
-        with utils.smart_open(self.fname) as f:
-            f.seek(offset)
-            return self.line2doc(f.readline())
+        fin.seek(offset)
+        return self.line2doc(fin.readline())
 
     @property
     def id2word(self):
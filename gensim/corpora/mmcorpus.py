@@ -27,6 +27,11 @@ class MmCorpus(matutils.MmReader, IndexedCorpus):
         # avoid calling super(), too confusing
         IndexedCorpus.__init__(self, fname)
         matutils.MmReader.__init__(self, fname)
+        self.fname = fname
+
+    def docbyoffset(self, offset):
+        """Return document at file offset `offset` (in bytes), reusing pooled file handles."""
+        return IndexedCorpus.docbyoffset(self, offset)
 
     def __iter__(self):
         """
@@ -36,6 +41,14 @@ class MmCorpus(matutils.MmReader, IndexedCorpus):
         for doc_id, doc in super(MmCorpus, self).__iter__():
             yield doc  # get rid of doc id, return the sparse vector only
 
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate over the documents of the `partno`-th of `num_partitions` disjoint
+        byte ranges of the file (see `MmReader.iter_partition`).
+        """
+        for doc_id, doc in matutils.MmReader.iter_partition(self, partno, num_partitions):
+            yield doc
+
     @staticmethod
     def save_corpus(fname, corpus, id2word=None, progress_cnt=1000, metadata=False):
         """
@@ -22,6 +22,7 @@ from __future__ import print_function
 import logging
 import os
 import math
+from collections import OrderedDict
 import numpy
 import scipy.sparse as sparse
 import time
@@ -139,10 +140,22 @@ class ShardedCorpus(IndexedCorpus):
     currently open and on a `__getitem__` request, either returns an item from
     the current shard, or opens a new one. The shard size is constant, except
     for the last shard.
+
+    Recently used shards are kept in an LRU cache of `cache_shards` shards, so
+    that slices crossing shard boundaries and shuffled minibatches don't keep
+    reloading the same shards from disk. With `prefetch` set, the next shards
+    are loaded by a background thread during sequential access, so that a
+    consumer iterating over the data doesn't have to wait for the disk:
+
+    >>> corpus = ShardedCorpus(output_prefix, corpus, dim=1000, cache_shards=4, prefetch=2)
     """
+    #: Default cache/prefetch settings, for objects saved by older versions.
+    cache_shards = 1
+    prefetch = 0
+
     def __init__(self, output_prefix, corpus, dim=None,
                  shardsize=4096, overwrite=False, sparse_serialization=False,
-                 sparse_retrieval=False, gensim=False):
+                 sparse_retrieval=False, gensim=False, cache_shards=1, prefetch=0):
         """Initializes the dataset. If `output_prefix` is not found,
         builds the shards.
 
@@ -213,7 +226,20 @@ class ShardedCorpus(IndexedCorpus):
             sparse vectors (list of tuples (id, value)) to make it behave like
             any other gensim corpus. This **will** slow the dataset down.
 
+        :type cache_shards: int
+        :param cache_shards: How many shards to keep in memory at once (least
+            recently used shards are dropped first). Memory usage grows
+            linearly with this number.
+
+        :type prefetch: int
+        :param prefetch: How many shards ahead to load in a background thread
+            during sequential access. Prefetched shards don't count against
+            `cache_shards` until they are used. Set to 0 (default) to disable
+            prefetching.
+
         """
+        if cache_shards < 1:
+            raise ValueError('cache_shards must be at least 1, got {0}'.format(cache_shards))
         self.output_prefix = output_prefix
         self.shardsize = shardsize
 
@@ -235,6 +261,9 @@ class ShardedCorpus(IndexedCorpus):
         self.current_offset = None   # The index into the dataset which
                                      # corresponds to index 0 of current shard
 
+        self.cache_shards = cache_shards
+        self.prefetch = prefetch
+
         logger.info('Initializing sharded corpus with prefix '
                      '{0}'.format(output_prefix))
         if (not os.path.isfile(output_prefix)) or overwrite:
@@ -346,7 +375,12 @@ class ShardedCorpus(IndexedCorpus):
     def load_shard(self, n):
         """
         Load (unpickle) the n-th shard as the "live" part of the dataset
-        into the Dataset object."""
+        into the Dataset object.
+
+        The shard is taken from the shard cache or from a finished prefetch
+        if possible. When moving on to the next shard sequentially (or loading
+        the first one), also starts prefetching the following `prefetch` shards.
+        """
         #logger.debug('ShardedCorpus loading shard {0}, '
         #              'current shard: {1}'.format(n, self.current_shard_n))
 
@@ -354,23 +388,87 @@ class ShardedCorpus(IndexedCorpus):
         if self.current_shard_n == n:
             return
 
-        filename = self._shard_name(n)
-        if not os.path.isfile(filename):
-            raise ValueError('Attempting to load nonexistent shard no. {0}'.format(n))
-        shard = gensim.utils.unpickle(filename)
+        previous_n = self.current_shard_n
+        cache = self._shard_cache()
+        pending = self.__dict__.setdefault('_prefetched', {})
+        if n in cache:
+            shard = cache.pop(n)
+        elif n in pending:
+            shard = pending.pop(n).get()  # waits for the background thread, if necessary
+        else:
+            shard = self._read_shard(n)
+
+        cache[n] = shard  # (re)insert as the most recently used shard
+        while len(cache) > self.cache_shards:
+            cache.popitem(last=False)
 
         self.current_shard = shard
         self.current_shard_n = n
         self.current_offset = self.offsets[n]
 
+        if self.prefetch and (previous_n is None or n == previous_n + 1):
+            self._prefetch_shards(xrange(n + 1, min(n + 1 + self.prefetch, self.n_shards)))
+
+    def _read_shard(self, n):
+        """Unpickle the n-th shard from disk."""
+        filename = self._shard_name(n)
+        if not os.path.isfile(filename):
+            raise ValueError('Attempting to load nonexistent shard no. {0}'.format(n))
+        return gensim.utils.unpickle(filename)
+
+    def _shard_cache(self):
+        """Return the LRU cache of loaded shards (shard no. -> shard), oldest first."""
+        cache = self.__dict__.get('_cache')
+        if cache is None:
+            cache = self.__dict__['_cache'] = OrderedDict()
+        return cache
+
+    def _prefetch_shards(self, shard_ns):
+        """
+        Start loading the shards `shard_ns` in a background thread, forgetting
+        any other prefetches (those are no longer on the sequential path).
+        """
+        pending = self.__dict__.setdefault('_prefetched', {})
+        cache = self._shard_cache()
+        wanted = [shard_n for shard_n in shard_ns if shard_n not in cache]
+        for shard_n in list(pending):
+            if shard_n not in wanted:
+                del pending[shard_n]
+
+        pool = self.__dict__.get('_pool')
+        if pool is None:
+            from multiprocessing.pool import ThreadPool
+            pool = self.__dict__['_pool'] = ThreadPool(1)
+        for shard_n in wanted:
+            if shard_n not in pending:
+                pending[shard_n] = pool.apply_async(self._read_shard, (shard_n,))
+
     def reset(self):
         """
-        Reset to no shard at all. Used for saving.
+        Reset to no shard at all, dropping all cached and prefetched shards.
+        Used for saving.
 
         """
         self.current_shard = None
         self.current_shard_n = None
         self.current_offset = None
+        self.__dict__.pop('_cache', None)
+        self.__dict__.pop('_prefetched', None)
+
+    def close(self):
+        """Stop the prefetching thread and release all cached shards."""
+        pool = self.__dict__.pop('_pool', None)
+        if pool is not None:
+            pool.terminate()
+        self.reset()
+        super(ShardedCorpus, self).close()
+
+    def __getstate__(self):
+        result = super(ShardedCorpus, self).__getstate__()
+        # threads can't be pickled; cached shards are simply reloaded on demand
+        for attr in ('_pool', '_cache', '_prefetched'):
+            result.pop(attr, None)
+        return result
 
     def shard_by_offset(self, offset):
         """
@@ -415,7 +513,7 @@ class ShardedCorpus(IndexedCorpus):
         of smaller shards.
 
         """
-        if self.current_shard_n == self.n_shards:
+        if self.current_shard_n >= self.n_shards - 1:
             return False # There's no next shard.
         return (self.offsets[self.current_shard_n + 1] <= offset) \
                and (offset < self.offsets[self.current_shard_n + 2])
@@ -571,6 +669,38 @@ class ShardedCorpus(IndexedCorpus):
         result = self.current_shard[offset - self.current_offset]
         return result
 
+    def _get_by_offsets(self, offsets):
+        """
+        Retrieve the rows at `offsets` (a list of ints, in any order) as one
+        matrix in the serialized format.
+
+        The offsets are grouped by shard, so that every shard is visited only
+        once per call no matter how shuffled the offsets are.
+        """
+        if not len(offsets):
+            if self.sparse_serialization:
+                return sparse.csr_matrix((0, self.dim))
+            return numpy.zeros((0, self.dim))
+        for offset in (min(offsets), max(offsets)):
+            self.shard_by_offset(offset)  # raises ValueError when out of range
+        offsets = numpy.asarray(offsets)
+        order = numpy.argsort(offsets, kind='mergesort')
+        sorted_offsets = offsets[order]
+
+        parts = []
+        shard_ns = numpy.searchsorted(self.offsets, sorted_offsets, side='right') - 1
+        bounds = numpy.flatnonzero(numpy.diff(shard_ns)) + 1
+        for group in numpy.split(numpy.arange(len(sorted_offsets)), bounds):
+            self.load_shard(int(shard_ns[group[0]]))
+            parts.append(self.current_shard[sorted_offsets[group] - self.current_offset])
+
+        # undo the sorting, to return rows in the requested order
+        inverse = numpy.empty_like(order)
+        inverse[order] = numpy.arange(len(order))
+        if self.sparse_serialization:
+            return sparse.vstack(parts).tocsr()[inverse]
+        return numpy.concatenate(parts)[inverse]
+
     def __getitem__(self, offset):
         """
         Retrieve the given row of the dataset. Supports slice notation.
@@ -580,14 +710,13 @@ class ShardedCorpus(IndexedCorpus):
 
             # Handle all serialization & retrieval options.
             if self.sparse_serialization:
-                l_result = sparse.vstack([self.get_by_offset(i)
-                                          for i in offset])
+                l_result = self._get_by_offsets(offset)
                 if self.gensim:
                     l_result = self._getitem_sparse2gensim(l_result)
                 elif not self.sparse_retrieval:
                     l_result = numpy.array(l_result.todense())
             else:
-                l_result = numpy.array([self.get_by_offset(i) for i in offset])
+                l_result = self._get_by_offsets(offset)
                 if self.gensim:
                     l_result = self._getitem_dense2gensim(l_result)
                 elif self.sparse_retrieval:
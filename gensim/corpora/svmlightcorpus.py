@@ -99,13 +99,12 @@ class SvmLightCorpus(IndexedCorpus):
                 fout.write(utils.to_utf8(SvmLightCorpus.doc2line(doc, label)))
         return offsets
 
-    def docbyoffset(self, offset):
+    def _docbyoffset(self, fin, offset):
         """
-        Return the document stored at file position `offset`.
+        Return the document stored at file position `offset` of the open file `fin`.
         """
-        with utils.smart_open(self.fname) as f:
-            f.seek(offset)
-            return self.line2doc(f.readline())[0]
+        fin.seek(offset)
+        return self.line2doc(fin.readline())[0]
 
     def line2doc(self, line):
         """
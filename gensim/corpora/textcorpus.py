@@ -29,11 +29,20 @@ See the `gensim.test.test_miislita.CorpusMiislita` class for a simple example.
 
 from __future__ import with_statement
 
+import copy
+import hashlib
 import logging
+import multiprocessing
 import os
 import random
 import re
 import sys
+import types
+from collections import deque
+from functools import partial, wraps
+
+import numpy
+from six.moves import zip as izip
 
 from gensim import interfaces, utils
 from gensim.corpora.dictionary import Dictionary
@@ -63,6 +72,85 @@ def strip_multiple_whitespaces(s):
     return RE_WHITESPACE.sub(" ", s)
 
 
+_worker_corpus = None  # corpus whose `preprocess_text` is used inside a preprocessing worker process
+
+
+def _init_preprocess_worker(corpus):
+    """Set up a worker process of `TextCorpus` parallel preprocessing."""
+    global _worker_corpus
+    _worker_corpus = corpus
+
+
+def _preprocess_chunk(texts):
+    """Preprocess a chunk of documents inside a worker process."""
+    return [list(_worker_corpus.preprocess_text(text)) for text in texts]
+
+
+TEXTS_CACHE_VERSION = 1  # bump whenever the texts cache format changes
+
+
+def qualified_name(obj):
+    """Return a stable name of the function or class `obj`, for use in cache keys."""
+    name = getattr(obj, '__qualname__', None) or getattr(obj, '__name__', None) or type(obj).__name__
+    return '%s.%s' % (getattr(obj, '__module__', None), name)
+
+
+def _code_digest(code, digest):
+    """Feed the instructions, names and constants of the code object `code` into `digest`."""
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode('utf8'))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_digest(const, digest)
+        elif isinstance(const, frozenset):
+            digest.update(repr(sorted(repr(item) for item in const)).encode('utf8'))  # independent of hash order
+        else:
+            digest.update(repr(const).encode('utf8'))
+
+
+def function_key(func):
+    """Return a picklable value that identifies the preprocessing function `func` in cache keys:
+    its name, plus the digest of its code and its default arguments for Python functions, or
+    the wrapped function and bound arguments for a `functools.partial`.
+
+    Return None if `func` can't be identified reliably: lambdas, closures and other nested
+    functions, whose names don't tell them apart.
+    """
+    if isinstance(func, partial):
+        keywords = sorted((func.keywords or {}).items())
+        values = [func.func] + list(func.args) + [value for _, value in keywords]
+        keys = [function_key(value) if callable(value) else value for value in values]
+        if any(key is None for key in keys):
+            return None
+        return 'partial', keys, [name for name, _ in keywords]
+    if isinstance(func, types.MethodType) and func.__self__ is not None:
+        key = function_key(func.__func__)
+        return None if key is None else (key, qualified_name(type(func.__self__)))
+    if isinstance(func, types.FunctionType):
+        name = qualified_name(func)
+        if func.__name__ == '<lambda>' or '<locals>' in name or func.__closure__:
+            return None
+        defaults = [function_key(value) if callable(value) else value for value in func.__defaults__ or ()]
+        if any(value is None for value in defaults):
+            return None
+        digest = hashlib.md5()
+        _code_digest(func.__code__, digest)
+        return name, digest.hexdigest(), defaults
+    return qualified_name(func)
+
+
+def cache_texts(get_texts):
+    """Decorator for `get_texts` methods of `TextCorpus` subclasses, which serves the
+    texts from the corpus's tokenized texts cache, if enabled (see `TextCorpus.texts_cache`).
+    """
+    @wraps(get_texts)
+    def wrapper(self):
+        if getattr(self, 'texts_cache', None) is None:
+            return get_texts(self)
+        return self._cached_texts(get_texts)
+    return wrapper
+
+
 class TextCorpus(interfaces.CorpusABC):
     """Helper class to simplify the pipeline of getting bag-of-words vectors (= a
     gensim corpus) from plain text.
@@ -111,9 +199,15 @@ class TextCorpus(interfaces.CorpusABC):
     5.  remove words less than 3 characters long
     6.  remove stopwords; see `gensim.parsing.preprocessing` for the list of stopwords
 
+    Preprocessing can be spread over several worker processes with the `processes`
+    argument; documents are still yielded in their original order.
+
     """
+    #: Number of documents sent to a preprocessing worker process at a time.
+    chunksize = 256
+
     def __init__(self, input=None, dictionary=None, metadata=False, character_filters=None,
-                 tokenizer=None, token_filters=None):
+                 tokenizer=None, token_filters=None, processes=None, texts_cache=None):
         """
         Args:
             input (str): path to top-level directory to traverse for corpus documents.
@@ -135,9 +229,22 @@ class TextCorpus(interfaces.CorpusABC):
                 remove, or replace tokens, or do nothing at all. The default token filters
                 remove tokens less than 3 characters long and remove stopwords using the list
                 in `gensim.parsing.preprocessing.STOPWORDS`.
+            processes (int): number of worker processes to run `preprocess_text` in. The
+                default None (or 1) preprocesses all documents in the current process. On
+                platforms that don't fork (Windows), the preprocessing functions or your
+                `preprocess_text` override must be picklable to use more processes.
+            texts_cache (str): file name under which to cache the tokenized texts. The first
+                pass over the corpus stores the texts there (plus a `texts_cache.header` file),
+                all further passes read them back instead of re-reading and re-processing the
+                input. The cache is rebuilt automatically when the input files (their size
+                and modification time) or the preprocessing functions (their names, code and
+                bound arguments) change. Preprocessing with lambdas or closures isn't cached.
+                Default None means no caching.
         """
         self.input = input
         self.metadata = metadata
+        self.processes = processes
+        self.texts_cache = texts_cache
 
         self.character_filters = character_filters
         if self.character_filters is None:
@@ -200,6 +307,35 @@ class TextCorpus(interfaces.CorpusABC):
 
         self.length = num_texts
 
+    def getstream_partition(self, partno, num_partitions):
+        """Yield the documents of the `partno`-th of `num_partitions` disjoint parts of the
+        underlying plain text collection, reading only that part if possible (a byte
+        range of an uncompressed input file, see `utils.iter_lines_partition`).
+
+        Subclasses that override `getstream` must override this method, too.
+        """
+        if type(self).getstream != TextCorpus.getstream:
+            raise NotImplementedError(
+                "%s overrides getstream() but not getstream_partition(), so it can't be partitioned" %
+                type(self).__name__)
+        return utils.iter_lines_partition(self.input, partno, num_partitions)
+
+    def iter_partition(self, partno, num_partitions):
+        """Yield the sparse vectors of the documents in the `partno`-th of `num_partitions`
+        disjoint parts of the corpus (see `getstream_partition`), without any metadata.
+
+        This allows preprocessing the parts in separate processes, each reading its own
+        part of the input (the `partition` and `split` methods return such parts).
+
+        Subclasses that override `get_texts` must override this method, too.
+        """
+        if type(self).get_texts != TextCorpus.get_texts:
+            raise NotImplementedError(
+                "%s overrides get_texts() but not iter_partition(), so it can't be partitioned" %
+                type(self).__name__)
+        for text in self.getstream_partition(partno, num_partitions):
+            yield self.dictionary.doc2bow(self.preprocess_text(text), allow_update=False)
+
     def preprocess_text(self, text):
         """Apply preprocessing to a single text document. This should perform tokenization
         in addition to any other desired preprocessing steps.
@@ -234,6 +370,7 @@ class TextCorpus(interfaces.CorpusABC):
             tokens = token_filter(tokens)
             yield (token_filter, tokens)
 
+    @cache_texts
     def get_texts(self):
         """Iterate over the collection, yielding one document at a time. A document
         is a sequence of words (strings) that can be fed into `Dictionary.doc2bow`.
@@ -247,12 +384,150 @@ class TextCorpus(interfaces.CorpusABC):
             document from the corpus `input`.
         """
         lines = self.getstream()
+        if getattr(self, 'processes', None) is not None and self.processes > 1:
+            texts = self._preprocess_parallel(lines)
+        else:
+            texts = (self.preprocess_text(line) for line in lines)
+
         if self.metadata:
-            for lineno, line in enumerate(lines):
-                yield self.preprocess_text(line), (lineno,)
+            for lineno, text in enumerate(texts):
+                yield text, (lineno,)
         else:
-            for line in lines:
-                yield self.preprocess_text(line)
+            for text in texts:
+                yield text
+
+    def _preprocess_parallel(self, texts):
+        """Yield `preprocess_text` of each of `texts`, computed in a pool of
+        `self.processes` worker processes, in the original order.
+
+        The texts are sent to the workers in chunks of `self.chunksize` documents, with at
+        most two chunks per worker in flight, so memory use stays bounded no matter how
+        fast `texts` can be read.
+        """
+        # the workers only need the preprocessing setup, not the (possibly large) dictionary or an open input
+        worker_corpus = copy.copy(self)
+        worker_corpus.input = worker_corpus.dictionary = None
+        pool = multiprocessing.Pool(self.processes, _init_preprocess_worker, (worker_corpus,))
+        try:
+            pending = deque()
+            for chunk in utils.chunkize_serial(texts, self.chunksize):
+                pending.append(pool.apply_async(_preprocess_chunk, (chunk,)))
+                if len(pending) >= 2 * self.processes:
+                    for tokens in pending.popleft().get():
+                        yield tokens
+            while pending:
+                for tokens in pending.popleft().get():
+                    yield tokens
+        finally:
+            pool.terminate()
+
+    def source_files(self):
+        """Return the list of files the texts are read from, for validating `texts_cache`."""
+        if not isinstance(self.input, utils.string_types):
+            raise ValueError("texts_cache requires the corpus input to be a file name, not %r" % (self.input,))
+        return [self.input]
+
+    def preprocessing_params(self):
+        """Return a picklable description of the preprocessing, for validating `texts_cache`,
+        or None if the preprocessing can't be identified (see `function_key`).
+        Override in subclasses that add their own preprocessing parameters.
+        """
+        keys = [function_key(f) for f in list(self.character_filters) + [self.tokenizer] + list(self.token_filters)]
+        if any(key is None for key in keys):
+            return None  # some function can't be identified => no caching
+        num_filters = len(self.character_filters)
+        return keys[:num_filters], keys[num_filters], keys[num_filters + 1:]
+
+    def texts_cache_key(self):
+        """Return the value that identifies the current content of `texts_cache`; the cache
+        is only used if it was built with the same key. None means the texts can't be cached."""
+        params = self.preprocessing_params()
+        if params is None:
+            return None
+        sources = [(path, os.path.getsize(path), os.path.getmtime(path)) for path in self.source_files()]
+        return (
+            TEXTS_CACHE_VERSION, qualified_name(self.__class__), bool(self.metadata),
+            sources, params
+        )
+
+    def _cached_texts(self, get_texts):
+        """Serve the texts from `texts_cache` if it's valid, otherwise iterate over
+        `get_texts(self)` and build the cache along the way."""
+        key = self.texts_cache_key()
+        if key is None:
+            logger.warning(
+                "not caching texts in %s: preprocessing functions can't be identified "
+                "(use module-level functions instead of lambdas or closures)", self.texts_cache)
+            return get_texts(self)
+        header_fname = self.texts_cache + '.header'
+        if os.path.isfile(header_fname):
+            header = utils.unpickle(header_fname)
+            if header['key'] == key:
+                logger.info("reading %i cached texts from %s", len(header['lengths']), self.texts_cache)
+                self.length = len(header['lengths'])
+                return self._read_texts_cache(header)
+            logger.info("texts cache %s is out of date, rebuilding", self.texts_cache)
+            os.remove(header_fname)
+        return self._write_texts_cache(get_texts(self), key)
+
+    def _write_texts_cache(self, texts, key):
+        """Yield `texts`, storing them to `texts_cache` as they go.
+
+        Tokens are stored as uint32 ids into a vocabulary, which is saved together with the
+        document lengths and metadata in a header file. The header is only written once all
+        texts were seen, so that an interrupted pass leaves no (partially) valid cache behind.
+        """
+        token2id, vocab, lengths, metadata = {}, [], [], []
+        ids = []
+        with open(self.texts_cache, 'wb') as fout:
+            for text in texts:
+                if self.metadata:
+                    text, doc_metadata = text
+                    metadata.append(doc_metadata)
+                text = list(text)
+                for token in text:
+                    tokenid = token2id.get(token)
+                    if tokenid is None:
+                        tokenid = token2id[token] = len(vocab)
+                        vocab.append(token)
+                    ids.append(tokenid)
+                lengths.append(len(text))
+                if len(ids) >= 1000000:
+                    numpy.array(ids, dtype='<u4').tofile(fout)
+                    del ids[:]
+                yield (text, doc_metadata) if self.metadata else text
+            numpy.array(ids, dtype='<u4').tofile(fout)
+
+        header = {
+            'key': key, 'vocab': vocab, 'lengths': numpy.array(lengths, dtype=numpy.uint32),
+            'metadata': metadata if self.metadata else None,
+        }
+        utils.pickle(header, self.texts_cache + '.header')
+        logger.info("cached %i texts with %i unique tokens in %s", len(lengths), len(vocab), self.texts_cache)
+
+    def _read_texts_cache(self, header, blocksize=1000000):
+        """Yield the texts stored in `texts_cache`, reading about `blocksize` tokens at a time."""
+        vocab = numpy.empty(len(header['vocab']), dtype=object)
+        vocab[:] = header['vocab']
+        metadata = header['metadata']
+        bounds = numpy.zeros(len(header['lengths']) + 1, dtype=numpy.int64)
+        numpy.cumsum(header['lengths'], out=bounds[1:])
+        num_docs = len(bounds) - 1
+
+        with open(self.texts_cache, 'rb') as fin:
+            start = 0
+            while start < num_docs:
+                # a block of whole documents, with at least one document in it
+                stop = numpy.searchsorted(bounds, bounds[start] + blocksize, side='right') - 1
+                stop = min(max(stop, start + 1), num_docs)
+                tokens = vocab[numpy.fromfile(fin, dtype='<u4', count=bounds[stop] - bounds[start])].tolist()
+                positions = (bounds[start: stop + 1] - bounds[start]).tolist()
+                for docno, (doc_start, doc_end) in enumerate(izip(positions, positions[1:]), start):
+                    if metadata is None:
+                        yield tokens[doc_start: doc_end]
+                    else:
+                        yield tokens[doc_start: doc_end], metadata[docno]
+                start = stop
 
     def sample_texts(self, n, seed=None, length=None):
         """Yield n random documents from the corpus without replacement.
@@ -302,7 +577,26 @@ class TextCorpus(interfaces.CorpusABC):
             # and we were not able to sample enough documents before the stream ended.
             raise ValueError("length greater than number of documents in corpus")
 
+    def cached_length(self):
+        """Return the number of documents recorded in a valid `texts_cache`, or None if
+        there is no such cache (this avoids a full pass just to count the documents).
+        """
+        if getattr(self, 'texts_cache', None) is None:
+            return None
+        header_fname = self.texts_cache + '.header'
+        if not os.path.isfile(header_fname):
+            return None
+        key = self.texts_cache_key()
+        if key is None:
+            return None
+        header = utils.unpickle(header_fname)
+        if header['key'] != key:
+            return None
+        return len(header['lengths'])
+
     def __len__(self):
+        if self.length is None:
+            self.length = self.cached_length()
         if self.length is None:
             # cache the corpus length
             self.length = sum(1 for _ in self.getstream())
@@ -410,19 +704,32 @@ class TextDirectoryCorpus(TextCorpus):
         there will be one item per file, containing the entire contents of the file.
         """
         num_texts = 0
-        for path in self.iter_filepaths():
+        for text in self._iter_file_texts(self.iter_filepaths()):
+            yield text
+            num_texts += 1
+
+        self.length = num_texts
+
+    def getstream_partition(self, partno, num_partitions):
+        """Yield the documents from the `partno`-th of `num_partitions` contiguous ranges of
+        the file paths of the collection (as listed by `iter_filepaths`).
+        """
+        paths = list(self.iter_filepaths())
+        start, end = utils.partition_range(len(paths), partno, num_partitions)
+        return self._iter_file_texts(paths[start:end])
+
+    def _iter_file_texts(self, paths):
+        for path in paths:
             with open(path, 'rt') as f:
                 if self.lines_are_documents:
                     for line in f:
                         yield line.strip()
-                        num_texts += 1
                 else:
                     yield f.read().strip()
-                    num_texts += 1
-
-        self.length = num_texts
 
     def __len__(self):
+        if self.length is None:
+            self.length = self.cached_length()
         if self.length is None:
             self._cache_corpus_length()
         return self.length
@@ -432,6 +739,13 @@ class TextDirectoryCorpus(TextCorpus):
             self.length = sum(1 for _ in self.iter_filepaths())
         else:
             self.length = sum(1 for _ in self.getstream())
+
+    def source_files(self):
+        return list(self.iter_filepaths())
+
+    def preprocessing_params(self):
+        params = super(TextDirectoryCorpus, self).preprocessing_params()
+        return None if params is None else params + (self.lines_are_documents,)
 # endclass TextDirectoryCorpus
 
 
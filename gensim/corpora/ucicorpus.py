@@ -54,9 +54,8 @@ class UciReader(MmReader):
             (self.num_docs, self.num_terms, self.num_nnz))
 
     def skip_headers(self, input_file):
-        for lineno, _ in enumerate(input_file):
-            if lineno == 2:
-                break
+        for _ in range(3):
+            input_file.readline()
 
 # endclass UciReader
 
@@ -159,6 +158,10 @@ class UciCorpus(UciReader, IndexedCorpus):
 
         self.transposed = True
 
+    def docbyoffset(self, offset):
+        """Return document at file offset `offset` (in bytes), reusing pooled file handles."""
+        return IndexedCorpus.docbyoffset(self, offset)
+
     def __iter__(self):
         """
         Interpret a matrix in UCI bag-of-words format as a streamed gensim corpus
@@ -167,6 +170,14 @@ class UciCorpus(UciReader, IndexedCorpus):
         for docId, doc in super(UciCorpus, self).__iter__():
             yield doc # get rid of docId, return the sparse vector only
 
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate over the documents of the `partno`-th of `num_partitions` disjoint
+        byte ranges of the file (see `MmReader.iter_partition`).
+        """
+        for docId, doc in UciReader.iter_partition(self, partno, num_partitions):
+            yield doc
+
     def create_dictionary(self):
         """
         Utility method to generate gensim-style Dictionary directly from
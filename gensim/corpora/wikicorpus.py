@@ -15,6 +15,12 @@ tokenizer). The package is available at https://github.com/clips/pattern .
 
 See scripts/process_wiki.py for a canned (example) script based on this
 module.
+
+For "multistream" dumps (`*-pages-articles-multistream.xml.bz2`), pass the
+accompanying index file (`*-pages-articles-multistream-index.txt.bz2`) as
+`index_fname` to `WikiCorpus`: the independent bz2 streams are then
+decompressed and parsed by the worker processes too, instead of in the main
+process, so that processing scales with the number of cores.
 """
 
 
@@ -23,13 +29,15 @@ import logging
 import multiprocessing
 import re
 import signal
+from collections import deque
+from io import BytesIO
 from xml.etree.cElementTree import \
     iterparse  # LXML isn't faster, so let's go with the built-in solution
 
 from gensim import utils
 # cannot import whole gensim.corpora, because that imports wikicorpus...
 from gensim.corpora.dictionary import Dictionary
-from gensim.corpora.textcorpus import TextCorpus
+from gensim.corpora.textcorpus import TextCorpus, cache_texts
 
 logger = logging.getLogger(__name__)
 
@@ -250,6 +258,51 @@ def process_article(args):
     return result, title, pageid
 
 
+def read_multistream_index(fname):
+    """
+    Read the index file `fname` of a multistream MediaWiki dump, with lines in the
+    `offset:pageid:title` format.
+
+    Return the sorted list of distinct byte offsets of the bz2 streams containing pages
+    in the dump.
+    """
+    offsets = set()
+    with utils.smart_open(fname) as fin:
+        for line in fin:
+            line = line.strip()
+            if line:
+                offsets.add(int(line.split(b':', 1)[0]))
+    return sorted(offsets)
+
+
+def read_stream(fname, start, end=None):
+    """
+    Decompress the bz2 stream(s) stored between bytes `start` and `end` (exclusive;
+    None means until the end of file) of the file `fname`. Return the raw bytes.
+    """
+    with open(fname, 'rb') as fin:
+        fin.seek(start)
+        data = fin.read(-1 if end is None else end - start)
+    return bz2.decompress(data)
+
+
+def process_stream(args):
+    """
+    Decompress, parse and process all articles from a single bz2 stream of a
+    multistream MediaWiki dump.
+
+    `root_tag` is the opening `<mediawiki ...>` tag of the dump, needed to parse the
+    stream contents (a sequence of `<page>` elements) on their own.
+
+    Return a list of `process_article` results.
+    """
+    fname, start, end, root_tag, filter_namespaces, lemmatize = args
+    # the last stream also closes the root element, which is added here for every stream
+    content = read_stream(fname, start, end).replace(b'</mediawiki>', b'')
+    pages = extract_pages(BytesIO(root_tag + content + b'</mediawiki>'), filter_namespaces)
+    return [process_article((text, lemmatize, title, pageid)) for title, text, pageid in pages]
+
+
 def init_to_ignore_interrupt():
     """Should only be used when master is prepared to handle termination of child processes."""
     signal.signal(signal.SIGINT, signal.SIG_IGN)
@@ -265,9 +318,14 @@ class WikiCorpus(TextCorpus):
     >>> wiki = WikiCorpus('enwiki-20100622-pages-articles.xml.bz2') # create word->word_id mapping, takes almost 8h
     >>> MmCorpus.serialize('wiki_en_vocab200k.mm', wiki) # another 8h, creates a file in MatrixMarket format plus file with id->word
 
+    Multistream dumps are processed fully in parallel, given their index file:
+
+    >>> wiki = WikiCorpus('enwiki-latest-pages-articles-multistream.xml.bz2',
+    >>>                   index_fname='enwiki-latest-pages-articles-multistream-index.txt.bz2')
+
     """
     def __init__(self, fname, processes=None, lemmatize=utils.has_pattern(), dictionary=None,
-                 filter_namespaces=('0',)):
+                 filter_namespaces=('0',), index_fname=None, texts_cache=None):
         """
         Initialize the corpus. Unless a dictionary is provided, this scans the
         corpus once, to determine its vocabulary.
@@ -277,8 +335,17 @@ class WikiCorpus(TextCorpus):
         this automatic logic by forcing the `lemmatize` parameter explicitly.
         self.metadata if set to true will ensure that serialize will write out article titles to a pickle file.
 
+        If `fname` is a multistream dump, pass its index file as `index_fname` to have
+        the decompression and XML parsing done by the `processes` worker processes too.
+
+        Set `texts_cache` to a file name to store the tokenized articles there during the
+        first pass over the dump; later passes then skip all the decompression, parsing
+        and markup stripping (see `TextCorpus`).
+
         """
         self.fname = fname
+        self.index_fname = index_fname
+        self.texts_cache = texts_cache
         self.filter_namespaces = filter_namespaces
         self.metadata = False
         if processes is None:
@@ -290,6 +357,7 @@ class WikiCorpus(TextCorpus):
         else:
             self.dictionary = dictionary
 
+    @cache_texts
     def get_texts(self):
         """
         Iterate over the dump, returning text version of each article as a list
@@ -306,28 +374,25 @@ class WikiCorpus(TextCorpus):
         """
         articles, articles_all = 0, 0
         positions, positions_all = 0, 0
-        texts = \
-            ((text, self.lemmatize, title, pageid)
-             for title, text, pageid
-             in extract_pages(bz2.BZ2File(self.fname), self.filter_namespaces))
         pool = multiprocessing.Pool(self.processes, init_to_ignore_interrupt)
 
         try:
-            # process the corpus in smaller chunks of docs, because multiprocessing.Pool
-            # is dumb and would load the entire input into RAM at once...
-            for group in utils.chunkize(texts, chunksize=10 * self.processes, maxsize=1):
-                for tokens, title, pageid in pool.imap(process_article, group):
-                    articles_all += 1
-                    positions_all += len(tokens)
-                    # article redirects and short stubs are pruned here
-                    if len(tokens) < ARTICLE_MIN_WORDS or any(title.startswith(ignore + ':') for ignore in IGNORED_NAMESPACES):
-                        continue
-                    articles += 1
-                    positions += len(tokens)
-                    if self.metadata:
-                        yield (tokens, (pageid, title))
-                    else:
-                        yield tokens
+            if getattr(self, 'index_fname', None) is None:
+                processed = self._process_pages(pool)
+            else:
+                processed = self._process_streams(pool)
+            for tokens, title, pageid in processed:
+                articles_all += 1
+                positions_all += len(tokens)
+                # article redirects and short stubs are pruned here
+                if len(tokens) < ARTICLE_MIN_WORDS or any(title.startswith(ignore + ':') for ignore in IGNORED_NAMESPACES):
+                    continue
+                articles += 1
+                positions += len(tokens)
+                if self.metadata:
+                    yield (tokens, (pageid, title))
+                else:
+                    yield tokens
         except KeyboardInterrupt:
             logger.warn(
                 "user terminated iteration over Wikipedia corpus after %i documents with %i positions"
@@ -341,4 +406,77 @@ class WikiCorpus(TextCorpus):
             self.length = articles  # cache corpus length
         finally:
             pool.terminate()
+
+    def source_files(self):
+        return [self.fname]
+
+    def preprocessing_params(self):
+        return (bool(self.lemmatize), tuple(self.filter_namespaces or ()), ARTICLE_MIN_WORDS, IGNORED_NAMESPACES)
+
+    def _process_pages(self, pool):
+        """
+        Parse the dump in this process, yield `process_article` results computed by `pool`.
+        """
+        texts = \
+            ((text, self.lemmatize, title, pageid)
+             for title, text, pageid
+             in extract_pages(bz2.BZ2File(self.fname), self.filter_namespaces))
+        # process the corpus in smaller chunks of docs, because multiprocessing.Pool
+        # is dumb and would load the entire input into RAM at once...
+        for group in utils.chunkize(texts, chunksize=10 * self.processes, maxsize=1):
+            for result in pool.imap(process_article, group):
+                yield result
+
+    def _process_streams(self, pool):
+        """
+        Have `pool` decompress, parse and process the individual bz2 streams of a
+        multistream dump, yield `process_article` results in the dump order.
+        """
+        offsets = read_multistream_index(self.index_fname)
+        if not offsets:
+            return
+        root_tag = self._root_tag(offsets)
+        logger.info("processing %i bz2 streams of %s", len(offsets), self.fname)
+
+        # at most two streams per worker in flight, so that the results don't pile up in RAM
+        pending = deque()
+        for start, end in zip(offsets, offsets[1:] + [None]):
+            args = (self.fname, start, end, root_tag, self.filter_namespaces, self.lemmatize)
+            pending.append(pool.apply_async(process_stream, (args,)))
+            if len(pending) >= 2 * self.processes:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+
+    def _root_tag(self, offsets):
+        """Return the opening `<mediawiki ...>` tag of a multistream dump with stream `offsets`."""
+        # the first stream holds the <mediawiki> root element and <siteinfo>, but no pages
+        match = re.search(br'<mediawiki\b[^>]*>', read_stream(self.fname, 0, offsets[0]))
+        if match is None:
+            raise ValueError("%s is not a multistream MediaWiki dump with index %s" % (self.fname, self.index_fname))
+        return match.group(0)
+
+    def iter_partition(self, partno, num_partitions):
+        """
+        Yield the sparse vectors of the articles stored in the `partno`-th of
+        `num_partitions` contiguous ranges of bz2 streams of a multistream dump,
+        decompressed and processed in the current process.
+
+        Only available for multistream dumps opened with their `index_fname`.
+        """
+        if getattr(self, 'index_fname', None) is None:
+            raise NotImplementedError("partitioning a WikiCorpus requires a multistream dump and its index_fname")
+        offsets = read_multistream_index(self.index_fname)
+        if not offsets:
+            return
+        root_tag = self._root_tag(offsets)
+        start, end = utils.partition_range(len(offsets), partno, num_partitions)
+        for stream_start, stream_end in zip(offsets[start:end], (offsets + [None])[start + 1:end + 1]):
+            args = (self.fname, stream_start, stream_end, root_tag, self.filter_namespaces, self.lemmatize)
+            for tokens, title, pageid in process_stream(args):
+                if len(tokens) < ARTICLE_MIN_WORDS or any(title.startswith(ignore + ':') for ignore in IGNORED_NAMESPACES):
+                    continue
+                yield self.dictionary.doc2bow(tokens, allow_update=False)
 # endclass WikiCorpus
@@ -72,6 +72,39 @@ class CorpusABC(utils.SaveLoad):
 #        logger.warning("performing full corpus scan to determine its length; was this intended?")
 #        return sum(1 for doc in self) # sum(empty generator) == 0, so this works even for an empty corpus
 
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate over the `partno`-th of `num_partitions` disjoint parts of the
+        corpus, yielding one document at a time.
+
+        Corpora that can read a part of their documents without reading the
+        others (e.g. a byte range of the corpus file) should override this method,
+        to support `partition` and `split`.
+        """
+        raise NotImplementedError("%s doesn't support partitioning" % self.__class__.__name__)
+
+    def partition(self, partno, num_partitions):
+        """
+        Return the `partno`-th of `num_partitions` disjoint parts of the corpus, as a
+        corpus that reads its documents independently of the other parts (see
+        `iter_partition`).
+
+        The parts are small and picklable, so parallel consumers can send them to
+        worker processes, which then read the data themselves.
+        """
+        return utils.CorpusPartition(self, partno, num_partitions)
+
+    def split(self, num_partitions):
+        """
+        Return the list of all `num_partitions` disjoint parts of the corpus; see `partition`.
+
+        >>> parts = corpus.split(4)
+        >>> sum(len(list(part)) for part in parts) == len(corpus)
+        True
+
+        """
+        return [self.partition(partno, num_partitions) for partno in xrange(num_partitions)]
+
     @staticmethod
     def save_corpus(fname, corpus, id2word=None, metadata=False):
         """
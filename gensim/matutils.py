@@ -11,8 +11,10 @@ This module contains math helper functions.
 from __future__ import with_statement
 
 
+import itertools
 import logging
 import math
+import os
 
 from gensim import utils
 
@@ -21,7 +23,7 @@ import scipy.sparse
 from scipy.stats import entropy
 import scipy.linalg
 from scipy.linalg.lapack import get_lapack_funcs
-from scipy.special import psi  # gamma function utils
+from scipy.special import psi, entr  # gamma function utils
 
 from six import iteritems, itervalues, string_types
 from six.moves import xrange, zip as izip
@@ -42,6 +44,13 @@ except ImportError:
         a = triu(m, k)
         return np.where(a != 0)
 
+try:
+    # try to load the compiled Matrix Market parser
+    from gensim._matutils import parse_mm_block
+except ImportError:
+    # failed... fall back to block parsing with plain numpy (several times slower)
+    parse_mm_block = None
+
 blas = lambda name, ndarray: scipy.linalg.get_blas_funcs((name,), (ndarray,))[0]
 
 logger = logging.getLogger(__name__)
@@ -582,6 +591,72 @@ def jaccard_distance(set1, set2):
     return 1. - float(len(set1 & set2)) / float(union_cardinality)
 
 
+def kullback_leibler_matrix(mat1, mat2):
+    """
+    Return the matrix of Kullback-Leibler divergences between all rows of the dense
+    matrices `mat1` and `mat2`: `result[i, j] == kullback_leibler(mat1[i], mat2[j])`.
+
+    Like `kullback_leibler`, the rows are normalized to probability distributions
+    first. The entries of `mat2` must be positive. Computed as one matrix product
+    (the cross entropies), not row pair by row pair.
+    """
+    p = mat1 / np.sum(mat1, axis=1, dtype=np.float64)[:, None]
+    q = mat2 / np.sum(mat2, axis=1, dtype=np.float64)[:, None]
+    # KL(p || q) = sum(p * log(p)) - sum(p * log(q))
+    result = np.dot(p, np.log(q).T)
+    result *= -1
+    result -= entr(p).sum(axis=1)[:, None]
+    return np.maximum(result, 0.0)  # clip negative rounding errors
+
+
+def hellinger_matrix(mat1, mat2):
+    """
+    Return the matrix of Hellinger distances between all rows of the dense matrices
+    `mat1` and `mat2`: `result[i, j] == hellinger(mat1[i], mat2[j])`.
+
+    Computed from one matrix product of the square roots, not row pair by row pair:
+    sum((sqrt(a) - sqrt(b)) ** 2) = sum(a) + sum(b) - 2 * sqrt(a).sqrt(b).
+    """
+    sqrt1, sqrt2 = np.sqrt(mat1, dtype=np.float64), np.sqrt(mat2, dtype=np.float64)
+    sum1, sum2 = np.sum(sqrt1 ** 2, axis=1), np.sum(sqrt2 ** 2, axis=1)
+    total = sum1[:, None] + sum2[None, :]
+    squared = total - 2 * np.dot(sqrt1, sqrt2.T)
+    # the difference cancels out for (nearly) equal rows: compute those pairs directly
+    rows, cols = np.nonzero(squared <= 1e-6 * total)
+    step = max(1, 2 ** 20 // max(1, sqrt1.shape[1]))  # bound the memory of the gathered rows
+    for start in xrange(0, len(rows), step):
+        i, j = rows[start:start + step], cols[start:start + step]
+        squared[i, j] = np.sum((sqrt1[i] - sqrt2[j]) ** 2, axis=1)
+    return np.sqrt(0.5 * np.maximum(squared, 0.0))
+
+
+def jaccard_distance_matrix(sets1, sets2):
+    """
+    Return the matrix of Jaccard distances between all sets of the sequences `sets1`
+    and `sets2`: `result[i, j] == jaccard_distance(sets1[i], sets2[j])`.
+
+    The intersections are counted with one sparse matrix product, from the
+    incidence matrices of the sets.
+    """
+    index = {}
+    rows = []
+    for sets in (sets1, sets2):
+        indptr, indices = [0], []
+        for items in sets:
+            indices.extend(index.setdefault(item, len(index)) for item in items)
+            indptr.append(len(indices))
+        rows.append((indptr, indices))
+    incidence1, incidence2 = [
+        scipy.sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(indptr) - 1, len(index)))
+        for indptr, indices in rows]
+    intersection = incidence1.dot(incidence2.T).toarray()
+    sizes1, sizes2 = np.diff(incidence1.indptr), np.diff(incidence2.indptr)
+    union = sizes1[:, None] + sizes2[None, :] - intersection
+    result = 1.0 - intersection / np.maximum(union, 1)
+    result[union == 0] = 1.0  # both sets are empty
+    return result
+
+
 def dirichlet_expectation(alpha):
     """
     For a vector `theta~Dir(alpha)`, compute `E[log(theta)]`.
@@ -644,7 +719,11 @@ class MmWriter(object):
         self.fname = fname
         if fname.endswith(".gz") or fname.endswith('.bz2'):
             raise NotImplementedError("compressed output not supported with MmWriter")
-        self.fout = utils.smart_open(self.fname, 'wb+')  # open for both reading and writing
+        if fname.endswith(utils.BLOCK_COMPRESSED_EXT):
+            # write-only, but supports seeking back to rewrite the headers
+            self.fout = utils.smart_open(self.fname, 'wb')
+        else:
+            self.fout = utils.smart_open(self.fname, 'wb+')  # open for both reading and writing
         self.headers_written = False
 
     def write_headers(self, num_docs, num_terms, num_nnz):
@@ -771,6 +850,9 @@ class MmReader(object):
     matrix at once (unlike scipy.io.mmread). This allows us to process corpora
     which are larger than the available RAM.
     """
+    blocksize = 4 * 1024 * 1024  # how many bytes to read and parse at once during iteration
+    docbyoffset_blocksize = 4 * 1024  # read-ahead for random access to a single document
+
     def __init__(self, input, transposed=True):
         """
         Initialize the matrix reader.
@@ -816,11 +898,93 @@ class MmReader(object):
     def skip_headers(self, input_file):
         """
         Skip file headers that appear before the first document.
+
+        Uses `readline()` rather than iteration, so that the rest of the file
+        can be safely `read()` in bulk afterwards.
         """
-        for line in input_file:
-            if line.startswith(b'%'):
-                continue
-            break
+        line = input_file.readline()
+        while line.startswith(b'%'):
+            line = input_file.readline()
+
+    def _parse_block(self, data):
+        """
+        Parse a block of complete "docid termid value" lines (bytes) in bulk.
+
+        Return three numpy arrays: 0-based document ids, 0-based term ids and
+        values, one item per line.
+        """
+        if parse_mm_block is not None:
+            docids, termids, vals = parse_mm_block(data)
+        else:
+            triplets = np.fromstring(data, dtype=np.float64, sep=' ')
+            num_lines = data.count(b'\n') + (not data.endswith(b'\n'))
+            if len(triplets) != 3 * num_lines:
+                # blank lines or garbage in the input: fall back to line-by-line
+                # parsing, which also reports any malformed line properly
+                triplets = np.array(
+                    [[float(field) for field in line.split()] for line in data.splitlines() if line.strip()],
+                    dtype=np.float64).reshape(-1)
+                if len(triplets) % 3:
+                    raise ValueError("malformed Matrix Market data in %s" % self.input)
+            triplets = triplets.reshape(-1, 3)
+            docids, termids, vals = triplets[:, 0].astype(np.int64), triplets[:, 1].astype(np.int64), triplets[:, 2]
+        if not self.transposed:
+            termids, docids = docids, termids
+        # -1 because matrix market indexes are 1-based => convert to 0-based
+        return docids - 1, termids - 1, vals
+
+    def _iter_blocks(self, input_file, blocksize=None, size=None):
+        """
+        Read `input_file` from its current position in blocks of roughly `blocksize`
+        bytes, and yield each block parsed into numpy arrays by `_parse_block`.
+
+        If `size` is set, read only the next `size` bytes of `input_file`.
+        """
+        if blocksize is None:
+            blocksize = self.blocksize
+        remainder = b''
+        while True:
+            if size is not None:
+                block = input_file.read(min(blocksize, size))
+                size -= len(block)
+            else:
+                block = input_file.read(blocksize)
+            if block:
+                data = remainder + block
+                cut = data.rfind(b'\n') + 1  # only parse complete lines, keep the rest for the next block
+                data, remainder = data[:cut], data[cut:]
+            else:
+                data, remainder = remainder, b''
+            if data.strip():
+                yield self._parse_block(data)
+            if not block:
+                break
+
+    def _iter_documents(self, blocks):
+        """
+        Group the bulk-parsed `blocks` into documents, yielding (docid, document)
+        2-tuples where document is a list of (termid, value) 2-tuples.
+
+        Documents that are missing from the input (=empty documents) are not
+        yielded; the caller is responsible for filling the gaps.
+        """
+        previd, document = -1, []
+        for docids, termids, vals in blocks:
+            assert previd <= docids[0] and (docids[1:] >= docids[:-1]).all(), \
+                "matrix columns must come in ascending order"
+            boundaries = np.flatnonzero(docids[1:] != docids[:-1]) + 1
+            starts, ends = [0] + boundaries.tolist(), boundaries.tolist() + [len(docids)]
+            termids, vals = termids.tolist(), vals.tolist()
+            for start, end in izip(starts, ends):
+                docid = int(docids[start])
+                if docid != previd:
+                    # change of document: return the document read so far (its id is previd)
+                    if previd >= 0:
+                        yield previd, document
+                    previd, document = docid, []
+                document.extend(izip(termids[start:end], vals[start:end]))
+        if previd >= 0:
+            yield previd, document
 
     def __iter__(self):
         """
@@ -831,42 +995,113 @@ class MmReader(object):
         number of rows specified in the header; empty documents are inserted and
         yielded where appropriate, even if they are not explicitly stored in the
         Matrix Market file.
-        """
-        with utils.file_or_filename(self.input) as lines:
-            self.skip_headers(lines)
-
-            previd = -1
-            for line in lines:
-                docid, termid, val = utils.to_unicode(line).split()  # needed for python3
-                if not self.transposed:
-                    termid, docid = docid, termid
-                docid, termid, val = int(docid) - 1, int(termid) - 1, float(val)  # -1 because matrix market indexes are 1-based => convert to 0-based
-                assert previd <= docid, "matrix columns must come in ascending order"
-                if docid != previd:
-                    # change of document: return the document read so far (its id is prevId)
-                    if previd >= 0:
-                        yield previd, document
-
-                    # return implicit (empty) documents between previous id and new id
-                    # too, to keep consistent document numbering and corpus length
-                    for previd in xrange(previd + 1, docid):
-                        yield previd, []
-
-                    # from now on start adding fields to a new document, with a new id
-                    previd = docid
-                    document = []
 
-                document.append((termid, val,))  # add another field to the current document
-
-        # handle the last document, as a special case
-        if previd >= 0:
-            yield previd, document
+        The file is read and parsed in large blocks of `self.blocksize` bytes at
+        a time (vectorized with numpy), rather than line by line.
+        """
+        previd = -1
+        with utils.file_or_filename(self.input) as fin:
+            self.skip_headers(fin)
+            for docid, document in self._iter_documents(self._iter_blocks(fin)):
+                # return implicit (empty) documents between previous id and new id
+                # too, to keep consistent document numbering and corpus length
+                for previd in xrange(previd + 1, docid):
+                    yield previd, []
+                previd = docid
+                yield docid, document
 
         # return empty documents between the last explicit document and the number
         # of documents as specified in the header
         for previd in xrange(previd + 1, self.num_docs):
             yield previd, []
 
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iteratively yield the `(row_no, vector)` pairs of the `partno`-th of
+        `num_partitions` disjoint parts of the matrix, like `__iter__` does for the
+        whole matrix.
+
+        The parts are (roughly) equally sized byte ranges of the file, and only the
+        lines of the `partno`-th range are read and parsed (plus the remaining lines
+        of its last document). Each document belongs to the part in which its first
+        line starts, so the parts together yield exactly the vectors of `__iter__`,
+        in the same order, including the implicit empty documents.
+
+        Input that cannot be seeked cheaply (compressed files, file-like objects) is
+        read from the start instead, yielding the vectors of the `partno`-th of
+        `num_partitions` contiguous ranges of row numbers.
+        """
+        if not utils.is_plain_file(self.input):
+            start, end = utils.partition_range(self.num_docs, partno, num_partitions)
+            for docno, doc in itertools.islice(MmReader.__iter__(self), start, end):
+                yield docno, doc
+            return
+
+        with open(self.input, 'rb') as fin:
+            self.skip_headers(fin)
+            data_start = fin.tell()
+            start, end = utils.partition_range(os.path.getsize(self.input) - data_start, partno, num_partitions)
+            start, end = self._line_start(fin, data_start + start), self._line_start(fin, data_start + end)
+            # documents up to (and including) the one of the line preceding `start` belong to earlier parts
+            previd = lastid = self._docid_before(fin, start, data_start)
+            fin.seek(start)
+            for docid, document in self._iter_documents(self._iter_range_blocks(fin, end - start)):
+                if docid <= lastid:
+                    continue
+                for previd in xrange(previd + 1, docid):
+                    yield previd, []
+                previd = docid
+                yield docid, document
+
+        if partno == num_partitions - 1:
+            # the last part also gets the empty documents at the end of the matrix
+            for previd in xrange(previd + 1, self.num_docs):
+                yield previd, []
+
+    def _line_start(self, fin, offset):
+        """Return the offset of the first line that begins at or after byte `offset` of `fin`."""
+        if offset == 0:
+            return offset
+        fin.seek(offset - 1)
+        return offset - 1 + len(fin.readline())
+
+    def _docid_before(self, fin, offset, data_start):
+        """
+        Return the (0-based) document id of the last non-empty line before byte
+        `offset` of `fin`, or -1 if there is no such line after `data_start`.
+        """
+        window = 1024
+        while offset > data_start:
+            start = max(data_start, offset - window)
+            fin.seek(start)
+            data = fin.read(offset - start)
+            if start > data_start:
+                data = data[data.find(b'\n') + 1:]  # skip the partial line at the beginning of the window
+            if data.strip():
+                return int(self._parse_block(data)[0][-1])
+            if start == data_start:
+                break
+            window *= 2
+        return -1
+
+    def _iter_range_blocks(self, fin, size):
+        """
+        Yield the parsed blocks of the next `size` bytes of `fin` (which must end at
+        a line boundary), followed by the remaining lines of the last document.
+        """
+        lastid = None
+        for docids, termids, vals in self._iter_blocks(fin, size=size):
+            lastid = docids[-1]
+            yield docids, termids, vals
+        if lastid is None:
+            return
+        for docids, termids, vals in self._iter_blocks(fin, blocksize=self.docbyoffset_blocksize):
+            stop = np.searchsorted(docids, lastid, side='right')
+            if stop:
+                yield docids[:stop], termids[:stop], vals[:stop]
+            if stop < len(docids):
+                break
+
     def docbyoffset(self, offset):
         """Return document at file offset `offset` (in bytes)"""
         # empty documents are not stored explicitly in MM format, so the index marks
@@ -874,23 +1109,17 @@ class MmReader(object):
         if offset == -1:
             return []
         if isinstance(self.input, string_types):
-            fin = utils.smart_open(self.input)
-        else:
-            fin = self.input
+            with utils.smart_open(self.input) as fin:
+                return self._docbyoffset(fin, offset)
+        return self._docbyoffset(self.input, offset)
 
+    def _docbyoffset(self, fin, offset):
+        """Return document at file offset `offset` (in bytes) of the open file `fin`."""
+        if offset == -1:
+            return []
         fin.seek(offset)  # works for gzip/bz2 input, too
-        previd, document = -1, []
-        for line in fin:
-            docid, termid, val = line.split()
-            if not self.transposed:
-                termid, docid = docid, termid
-            docid, termid, val = int(docid) - 1, int(termid) - 1, float(val)  # -1 because matrix market indexes are 1-based => convert to 0-based
-            assert previd <= docid, "matrix columns must come in ascending order"
-            if docid != previd:
-                if previd >= 0:
-                    return document
-                previd = docid
-
-            document.append((termid, val,))  # add another field to the current document
-        return document
+        # documents are typically short: read ahead in small blocks only
+        for docid, document in self._iter_documents(self._iter_blocks(fin, blocksize=self.docbyoffset_blocksize)):
+            return document
+        return []
 #endclass MmReader
@@ -15,6 +15,7 @@ from .word2vec import Word2Vec
 from .doc2vec import Doc2Vec
 from .keyedvectors import KeyedVectors
 from .ldamulticore import LdaMulticore
+from .ldagibbs import LdaGibbs
 from .phrases import Phrases
 from .normmodel import NormModel
 from .atmodel import AuthorTopicModel
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+Latent Dirichlet Allocation (LDA) trained by collapsed Gibbs sampling, for models
+with many (thousands of) topics.
+
+The variational algorithm of :class:`gensim.models.ldamodel.LdaModel` costs O(num_topics)
+per token and iteration. This sampler resamples each token with a short
+Metropolis-Hastings chain over two proposals that are drawn in O(1) from alias
+tables [1]_, so the cost per token doesn't depend on the number of topics.
+Several threads sample disjoint ranges of documents at once, each against the
+shared (unsynchronized) topic counts, which are made exact again after every
+sweep (the approximate distributed LDA of [2]_).
+
+The trained topics convert to a regular `LdaModel` (for inference on new documents,
+`show_topics` etc.) with `to_ldamodel()`:
+
+>>> gibbs = LdaGibbs(corpus, id2word=dictionary, num_topics=1000, iterations=200, workers=4)
+>>> lda = gibbs.to_ldamodel()
+>>> print(lda[doc_bow])
+
+The training corpus is held in memory, as a topic assignment per token (8 bytes
+per token), next to the dense `num_terms x num_topics` matrix of topic counts.
+Term counts of the corpus are rounded to integers (so the input should be plain
+bag-of-words counts, not e.g. tf-idf weights).
+
+.. [1] Yuan et al.: LightLDA: Big Topic Models on Modest Compute Clusters, WWW 2015.
+.. [2] Newman et al.: Distributed Algorithms for Topic Models, JMLR 2009.
+"""
+
+import logging
+import threading
+
+import numpy as np
+from scipy.special import gammaln
+from six.moves import xrange
+
+from gensim import utils
+from gensim.models import basemodel
+from gensim.models.ldamodel import LdaModel, chunk2csr
+
+try:
+    from gensim.models.ldagibbs_inner import build_word_proposals, sample
+except ImportError:
+    # the sampler is only practical compiled; `LdaGibbs` raises an error on training
+    build_word_proposals = sample = None
+
+logger = logging.getLogger(__name__)
+
+
+class LdaGibbs(utils.SaveLoad, basemodel.BaseTopicModel):
+    """
+    LDA estimated by (Metropolis-Hastings accelerated) collapsed Gibbs sampling:
+
+    >>> gibbs = LdaGibbs(corpus, id2word=dictionary, num_topics=100)
+    >>> gibbs.print_topics()
+    >>> lda = gibbs.to_ldamodel()  # an equivalent `LdaModel`, for inference on new documents
+
+    The topic counts are kept in `nwk` (num_terms x num_topics) and `nk` (num_topics).
+    """
+    def __init__(self, corpus=None, num_topics=100, id2word=None, alpha=None, eta=0.01,
+                 iterations=100, mh_steps=2, workers=1, eval_every=10, chunksize=2000, random_state=None):
+        """
+        If given, train the model on `corpus` straight away (see `train`).
+
+        `num_topics` is the number of topics, `id2word` the mapping from word ids
+        to words (also determines the vocabulary size).
+
+        `alpha` and `eta` are the symmetric Dirichlet priors of the document-topic
+        and topic-word distributions; `alpha` defaults to `50.0 / num_topics`.
+
+        `iterations` is the number of Gibbs sweeps over the corpus. Each token is
+        resampled with `mh_steps` Metropolis-Hastings steps per sweep (alternating the
+        document and word proposals; use an even number).
+
+        `workers` is the number of threads that sample at the same time.
+
+        Log the log-likelihood of the corpus every `eval_every` sweeps (or never, if 0
+        or None). `chunksize` is the number of documents converted to tokens at once.
+
+        `random_state` can be a numpy.random.RandomState object or the seed for one.
+        """
+        self.id2word = id2word
+        if corpus is None and self.id2word is None:
+            raise ValueError("at least one of corpus/id2word must be specified, to establish input space dimensionality")
+        if self.id2word is None:
+            logger.warning("no word id mapping provided; initializing from corpus, assuming identity")
+            self.id2word = utils.dict_from_corpus(corpus)
+            self.num_terms = len(self.id2word)
+        elif len(self.id2word) > 0:
+            self.num_terms = 1 + max(self.id2word.keys())
+        else:
+            self.num_terms = 0
+        if self.num_terms == 0:
+            raise ValueError("cannot compute LDA over an empty collection (no terms)")
+
+        self.num_topics = int(num_topics)
+        self.alpha = 50.0 / self.num_topics if alpha is None else float(alpha)
+        self.eta = float(eta)
+        self.iterations = iterations
+        self.mh_steps = mh_steps
+        self.workers = max(1, workers)
+        self.eval_every = eval_every
+        self.chunksize = chunksize
+        self.random_state = utils.get_random_state(random_state)
+        self.num_docs = 0
+
+        self.nwk = np.zeros((self.num_terms, self.num_topics), dtype=np.int32)
+        self.nk = np.zeros(self.num_topics, dtype=np.int32)
+
+        if corpus is not None:
+            self.train(corpus)
+
+    def __str__(self):
+        return "LdaGibbs(num_terms=%s, num_topics=%s, alpha=%s, eta=%s)" % (
+            self.num_terms, self.num_topics, self.alpha, self.eta)
+
+    def corpus2tokens(self, corpus):
+        """
+        Return the tokens of `corpus` as a 2-tuple `(doc_ptr, words)`: the word id of
+        each token, the tokens of document `d` being `words[doc_ptr[d]:doc_ptr[d + 1]]`.
+        """
+        doc_ptr, words = [np.zeros(1, dtype=np.int64)], []
+        num_tokens = 0
+        for chunk in utils.grouper(corpus, self.chunksize):
+            indptr, termids, counts = chunk2csr(chunk)
+            if len(termids) and (termids.min() < 0 or termids.max() >= self.num_terms):
+                raise IndexError("term id out of range for a model with %i terms" % self.num_terms)
+            counts = np.rint(counts).astype(np.int64)
+            words.append(np.repeat(termids, counts).astype(np.int32))
+            # number of tokens per document = sum of its (rounded) counts
+            cumcounts = np.zeros(len(counts) + 1, dtype=np.int64)
+            np.cumsum(counts, out=cumcounts[1:])
+            doc_ptr.append(num_tokens + cumcounts[indptr[1:]])
+            num_tokens += cumcounts[-1]
+        return np.concatenate(doc_ptr), np.concatenate(words) if words else np.zeros(0, dtype=np.int32)
+
+    def train(self, corpus, iterations=None):
+        """
+        Estimate the topics from `corpus`, by `iterations` Gibbs sweeps (default:
+        `self.iterations`) from a random initial topic assignment. This replaces
+        any previously trained topics.
+        """
+        if sample is None:
+            raise RuntimeError("LdaGibbs needs the compiled gensim.models.ldagibbs_inner extension")
+        if iterations is None:
+            iterations = self.iterations
+
+        doc_ptr, words = self.corpus2tokens(corpus)
+        self.num_docs = len(doc_ptr) - 1
+        logger.info(
+            "running Gibbs-sampled LDA training, %i topics, %i sweeps over %i documents with %i tokens, "
+            "using %i threads", self.num_topics, iterations, self.num_docs, len(words), self.workers)
+
+        z = self.random_state.randint(0, self.num_topics, size=len(words)).astype(np.int32)
+        self.recount(words, z)
+
+        # split the documents into ranges with about the same number of tokens, one per thread
+        bounds = np.searchsorted(doc_ptr, np.linspace(0, len(words), self.workers + 1)[1:-1])
+        bounds = np.concatenate([[0], bounds, [self.num_docs]]).astype(np.int64)
+
+        for iteration in xrange(iterations):
+            proposals = self.word_proposals()
+            seeds = self.random_state.randint(0, 2 ** 31 - 1, size=self.workers)
+            accepted = [0] * self.workers
+
+            def sweep(part):
+                accepted[part] = sample(
+                    self.nwk, self.nk, words, z, doc_ptr, bounds[part], bounds[part + 1],
+                    *(proposals + (self.alpha, self.eta, self.mh_steps, int(seeds[part]))))
+
+            if self.workers == 1:
+                sweep(0)
+            else:
+                threads = [threading.Thread(target=sweep, args=(part,)) for part in xrange(self.workers)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                # the threads updated the shared counts without locking; make them exact again
+                self.recount(words, z)
+
+            logger.info(
+                "sweep #%i/%i: accepted %.1f%% of proposals", iteration + 1, iterations,
+                100.0 * sum(accepted) / max(1, len(words) * self.mh_steps))
+            if self.eval_every and ((iteration + 1) % self.eval_every == 0 or iteration + 1 == iterations):
+                logger.info("%.3f per-word log-likelihood", self.log_likelihood() / max(1, len(words)))
+
+    def recount(self, words, z):
+        """Set the topic counts `nwk` and `nk` to those of the token assignments `z`."""
+        nwk = np.bincount(
+            words.astype(np.int64) * self.num_topics + z, minlength=self.num_terms * self.num_topics)
+        self.nwk = nwk.reshape(self.num_terms, self.num_topics).astype(np.int32)
+        self.nk = self.nwk.sum(axis=0, dtype=np.int64).astype(np.int32)
+
+    def word_proposals(self):
+        """
+        Build the alias tables of the word proposal from the current counts; return
+        them as a tuple of the `sample` arguments after the document range.
+        """
+        ptr = np.zeros(self.num_terms + 1, dtype=np.int64)
+        np.cumsum(np.count_nonzero(self.nwk, axis=1), out=ptr[1:])
+        nnz = ptr[-1]
+        topics, counts = np.empty(nnz, dtype=np.int32), np.empty(nnz, dtype=np.int32)
+        prob, alias = np.empty(nnz), np.empty(nnz, dtype=np.int32)
+        mass = np.empty(self.num_terms)
+        dense_prob, dense_alias = np.empty(self.num_topics), np.empty(self.num_topics, dtype=np.int32)
+        dense_mass = build_word_proposals(
+            self.nwk, self.nk, self.eta, ptr, topics, counts, prob, alias, mass, dense_prob, dense_alias)
+        return (ptr, topics, counts, prob, alias, mass, dense_prob, dense_alias, dense_mass, self.nk.copy())
+
+    def log_likelihood(self):
+        """Return the log-likelihood of the training words, log p(w | z), given the topic assignments."""
+        V, eta = self.num_terms, self.eta
+        result = self.num_topics * (gammaln(V * eta) - V * gammaln(eta))
+        result += gammaln(self.nwk + eta).sum() - gammaln(self.nk + V * eta).sum()
+        return result
+
+    def get_topics(self):
+        """Return the `num_topics x num_terms` matrix of topic-word probabilities."""
+        topics = self.nwk.T + self.eta
+        return topics / topics.sum(axis=1)[:, None]
+
+    def show_topic(self, topicid, topn=10):
+        """Return the `topn` most probable words of topic `topicid`, as (word, probability) 2-tuples."""
+        topic = self.nwk[:, topicid] + self.eta
+        topic = topic / topic.sum()
+        bestn = np.argsort(-topic)[:topn]
+        return [(self.id2word[id], topic[id]) for id in bestn]
+
+    def show_topics(self, num_topics=10, num_words=10, log=False, formatted=True):
+        """
+        Return `num_topics` topics (all, if -1) with their `num_words` most probable
+        words, as formatted strings if `formatted` is set, or lists of (word, probability)
+        2-tuples otherwise. Log them if `log` is set.
+        """
+        if num_topics < 0 or num_topics >= self.num_topics:
+            chosen_topics = range(self.num_topics)
+        else:
+            # the most frequent topics
+            chosen_topics = np.argsort(-self.nk)[:num_topics]
+        shown = []
+        for i in chosen_topics:
+            if formatted:
+                topic = self.print_topic(i, topn=num_words)
+            else:
+                topic = self.show_topic(i, topn=num_words)
+            shown.append((int(i), topic))
+            if log:
+                logger.info("topic #%i: %s", i, topic)
+        return shown
+
+    def to_ldamodel(self, iterations=50, gamma_threshold=0.001, **kwargs):
+        """
+        Return an `LdaModel` with the topics of this model: its sufficient statistics
+        (expected topic-word counts) are the sampled counts `nwk`.
+
+        `iterations` and `gamma_threshold` are the inference settings of the new model;
+        other `LdaModel` constructor arguments can be given in `kwargs`.
+        """
+        model = LdaModel(
+            id2word=self.id2word, num_topics=self.num_topics, alpha=[self.alpha] * self.num_topics,
+            eta=self.eta, iterations=iterations, gamma_threshold=gamma_threshold, **kwargs)
+        model.state.sstats[...] = self.nwk.T
+        model.state.numdocs = self.num_docs
+        model.sync_state()
+        return model
+# endclass LdaGibbs
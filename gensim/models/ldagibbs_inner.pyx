@@ -0,0 +1,239 @@
+#!/usr/bin/env cython
+# cython: boundscheck=False
+# cython: wraparound=False
+# cython: cdivision=True
+# coding: utf-8
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+Optimized (compiled) collapsed Gibbs sampler for `gensim.models.ldagibbs`.
+
+Each token is resampled with a short Metropolis-Hastings chain that alternates
+between two cheap proposals (Yuan et al.: LightLDA: Big Topic Models on Modest
+Compute Clusters, WWW 2015):
+
+* the *doc proposal* picks the topic of a random token of the same document (or,
+  with probability proportional to `alpha`, a uniformly random topic), in O(1),
+* the *word proposal* draws from `(n_wk + eta) / (n_k + V * eta)`, with counts
+  frozen at the start of the sweep, in O(1) from alias tables: a sparse table per
+  word over its non-zero topics, plus one dense table for the `eta` smoothing.
+
+So the cost per token doesn't grow with the number of topics.
+"""
+
+import numpy as np
+
+from libc.stdlib cimport malloc, free
+from libc.string cimport memset
+
+
+cdef inline unsigned long long next_random(unsigned long long *state) nogil:
+    # xorshift64*
+    cdef unsigned long long x = state[0]
+    x ^= x >> 12
+    x ^= x << 25
+    x ^= x >> 27
+    state[0] = x
+    return x * 2685821657736338717ULL
+
+
+cdef inline double uniform(unsigned long long *state) nogil:
+    # uniform double in [0, 1), from the top 53 bits
+    return (next_random(state) >> 11) * (1.0 / 9007199254740992.0)
+
+
+cdef inline int randint(unsigned long long *state, long long n) nogil:
+    # uniform integer in [0, n)
+    cdef long long i = <long long>(uniform(state) * n)
+    return <int>(i if i < n else n - 1)
+
+
+cdef inline int alias_draw(const double *prob, const int *alias, int n, unsigned long long *state) nogil:
+    cdef int i = randint(state, n)
+    if uniform(state) < prob[i]:
+        return i
+    return alias[i]
+
+
+cdef int build_alias(const double *weights, double *prob, int *alias, int n, int *small, int *large) nogil:
+    # Vose's alias method for the distribution proportional to `weights[:n]`
+    cdef int i, s, l, num_small = 0, num_large = 0
+    cdef double total = 0.0
+    for i in range(n):
+        total += weights[i]
+    if total <= 0.0:
+        for i in range(n):
+            prob[i], alias[i] = 1.0, i
+        return 0
+    for i in range(n):
+        prob[i] = weights[i] * n / total
+        if prob[i] < 1.0:
+            small[num_small] = i
+            num_small += 1
+        else:
+            large[num_large] = i
+            num_large += 1
+    while num_small and num_large:
+        num_small -= 1
+        s = small[num_small]
+        l = large[num_large - 1]
+        alias[s] = l
+        prob[l] -= 1.0 - prob[s]
+        if prob[l] < 1.0:
+            num_large -= 1
+            small[num_small] = l
+            num_small += 1
+    while num_large:
+        num_large -= 1
+        prob[large[num_large]], alias[large[num_large]] = 1.0, large[num_large]
+    while num_small:
+        num_small -= 1
+        prob[small[num_small]], alias[small[num_small]] = 1.0, small[num_small]
+    return 0
+
+
+def build_word_proposals(const int[:, ::1] nwk, const int[::1] nk, double eta,
+                         long long[::1] ptr, int[::1] topics, int[::1] counts, double[::1] prob, int[::1] alias,
+                         double[::1] mass, double[::1] dense_prob, int[::1] dense_alias):
+    """
+    Build the alias tables of the word proposal from the current counts `nwk`
+    (num_terms x num_topics) and `nk` (num_topics).
+
+    The sparse table of word `w` occupies `ptr[w]:ptr[w + 1]` of `topics` (the non-zero
+    topics of `w`, ascending), `counts` (their counts), `prob` and `alias` (positions
+    within the table); `ptr` must have been filled in beforehand, with `np.count_nonzero`
+    per word. `mass[w]` receives the total weight of the sparse part of word `w`; the
+    dense smoothing part goes to `dense_prob`, `dense_alias`. Return the total weight
+    of the dense part.
+    """
+    cdef Py_ssize_t V = nwk.shape[0], K = nwk.shape[1], w, k
+    cdef long long start, n
+    cdef double Veta = V * eta, dense_mass = 0.0, total
+    cdef double *denom = <double *>malloc(max(1, K) * sizeof(double))
+    cdef double *weights = <double *>malloc(max(1, K) * sizeof(double))
+    cdef int *small = <int *>malloc(max(1, K) * sizeof(int))
+    cdef int *large = <int *>malloc(max(1, K) * sizeof(int))
+    try:
+        if not (denom and weights and small and large):
+            raise MemoryError("failed to allocate alias table buffers for %i topics" % K)
+        with nogil:
+            for k in range(K):
+                denom[k] = 1.0 / (nk[k] + Veta)
+                weights[k] = eta * denom[k]
+                dense_mass += weights[k]
+            build_alias(weights, &dense_prob[0], &dense_alias[0], K, small, large)
+            for w in range(V):
+                start, n, total = ptr[w], 0, 0.0
+                for k in range(K):
+                    if nwk[w, k] > 0:
+                        topics[start + n] = k
+                        counts[start + n] = nwk[w, k]
+                        weights[n] = nwk[w, k] * denom[k]
+                        total += weights[n]
+                        n += 1
+                mass[w] = total
+                if n:
+                    build_alias(weights, &prob[start], &alias[start], n, small, large)
+    finally:
+        free(denom)
+        free(weights)
+        free(small)
+        free(large)
+    return dense_mass
+
+
+cdef inline int stale_count(const int *topics, const int *counts, long long n, int k) nogil:
+    # count of topic `k` in a sparse table (binary search over its ascending topics)
+    cdef long long lo = 0, hi = n, mid
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if topics[mid] < k:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < n and topics[lo] == k:
+        return counts[lo]
+    return 0
+
+
+def sample(int[:, ::1] nwk, int[::1] nk, const int[::1] words, int[::1] z, const long long[::1] doc_ptr,
+           long long doc_start, long long doc_end,
+           const long long[::1] ptr, const int[::1] topics, const int[::1] counts, const double[::1] prob,
+           const int[::1] alias, const double[::1] mass, const double[::1] dense_prob, const int[::1] dense_alias,
+           double dense_mass, const int[::1] nk_stale, double alpha, double eta, int mh_steps,
+           unsigned long long seed):
+    """
+    Run one Gibbs sweep over the documents `doc_start:doc_end`: resample the topic
+    `z[i]` of every token `i` of these documents (whose word is `words[i]`; document
+    `d` consists of tokens `doc_ptr[d]:doc_ptr[d + 1]`), updating the counts `nwk`
+    and `nk` in place.
+
+    The word proposal tables come from `build_word_proposals`, built when the counts
+    were `nk_stale`. The GIL is released for the whole sweep, so several threads can
+    sweep over disjoint document ranges at once; their concurrent count updates are
+    not synchronized, so the counts should be recomputed from `z` afterwards.
+    Return the number of accepted proposals.
+    """
+    cdef Py_ssize_t K = nwk.shape[1]
+    cdef double Veta = nwk.shape[0] * eta, Kalpha = K * alpha
+    cdef long long d, i, start, end, length, wstart, wlen
+    cdef long long accepted = 0
+    cdef int w, s, t, step
+    cdef double p_s, p_t, q_s, q_t
+    cdef unsigned long long state = seed * 2 + 1  # xorshift must not start at zero
+    cdef int *ndk = <int *>malloc(max(1, K) * sizeof(int))
+    if not ndk:
+        raise MemoryError("failed to allocate document counts for %i topics" % K)
+    memset(ndk, 0, K * sizeof(int))
+    try:
+        with nogil:
+            for d in range(doc_start, doc_end):
+                start, end = doc_ptr[d], doc_ptr[d + 1]
+                length = end - start
+                for i in range(start, end):
+                    ndk[z[i]] += 1
+                for i in range(start, end):
+                    w, s = words[i], z[i]
+                    wstart, wlen = ptr[w], ptr[w + 1] - ptr[w]
+                    # take the token out of the counts: everything below is conditioned on the rest
+                    ndk[s] -= 1
+                    nwk[w, s] -= 1
+                    nk[s] -= 1
+                    for step in range(mh_steps):
+                        if step % 2 == 0:
+                            # doc proposal: q(k) ~ n_dk + alpha, counting the token itself (now at `s`)
+                            if uniform(&state) * (length + Kalpha) < length:
+                                t = z[start + randint(&state, length)]
+                            else:
+                                t = randint(&state, K)
+                            if t == s:
+                                continue
+                            q_s = ndk[s] + 1 + alpha
+                            q_t = ndk[t] + alpha
+                        else:
+                            # word proposal: q(k) ~ (n_wk + eta) / (n_k + V * eta), from the stale counts
+                            if uniform(&state) * (mass[w] + dense_mass) < mass[w]:
+                                t = topics[wstart + alias_draw(&prob[wstart], &alias[wstart], <int>wlen, &state)]
+                            else:
+                                t = alias_draw(&dense_prob[0], &dense_alias[0], <int>K, &state)
+                            if t == s:
+                                continue
+                            q_s = (stale_count(&topics[wstart], &counts[wstart], wlen, s) + eta) / (nk_stale[s] + Veta)
+                            q_t = (stale_count(&topics[wstart], &counts[wstart], wlen, t) + eta) / (nk_stale[t] + Veta)
+                        # the collapsed conditional p(k) ~ (n_dk + alpha) (n_wk + eta) / (n_k + V * eta)
+                        p_s = (ndk[s] + alpha) * (nwk[w, s] + eta) / (nk[s] + Veta)
+                        p_t = (ndk[t] + alpha) * (nwk[w, t] + eta) / (nk[t] + Veta)
+                        # accept with probability min(1, p(t) q(s) / (p(s) q(t)))
+                        if uniform(&state) * p_s * q_t <= p_t * q_s:
+                            s = t
+                            z[i] = s
+                            accepted += 1
+                    ndk[s] += 1
+                    nwk[w, s] += 1
+                    nk[s] += 1
+                for i in range(start, end):
+                    ndk[z[i]] -= 1
+    finally:
+        free(ndk)
+    return accepted
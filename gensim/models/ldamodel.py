@@ -33,32 +33,106 @@ The algorithm:
 import logging
 import numpy as np
 import numbers
-from random import sample
 import os
+import time
 
 from gensim import interfaces, utils, matutils
 from gensim.matutils import dirichlet_expectation
 from gensim.models import basemodel
-from gensim.matutils import kullback_leibler, hellinger, jaccard_distance
 
-from itertools import chain
+from itertools import chain, islice
 from scipy.special import gammaln, psi  # gamma function utils
-from scipy.special import polygamma
+from scipy.special import polygamma, ndtri
+import scipy.sparse
+from multiprocessing.pool import ThreadPool
 from six.moves import xrange
 import six
 
-# log(sum(exp(x))) that tries to avoid overflow
 try:
-    # try importing from here if older scipy is installed
-    from scipy.maxentropy import logsumexp
+    # try to load the compiled E-step, which processes a whole chunk at once
+    from gensim.models.ldamodel_inner import e_step
 except ImportError:
-    # maxentropy has been removed in recent releases, logsumexp now in misc
-    from scipy.misc import logsumexp
+    # failed... fall back to the per-document numpy loop (several times slower for short documents)
+    e_step = None
 
 
 logger = logging.getLogger('gensim.models.ldamodel')
 
 
+def chunk2csr(chunk):
+    """
+    Convert a chunk of documents, given either as a list of bag-of-words vectors
+    or as a `scipy.sparse` matrix with one row per document, to the 3-tuple of CSR
+    arrays `(indptr, termids, counts)` (int64, int64 and float64).
+    """
+    if scipy.sparse.issparse(chunk):
+        chunk = chunk.tocsr()
+        return (
+            chunk.indptr.astype(np.int64, copy=False), chunk.indices.astype(np.int64, copy=False),
+            chunk.data.astype(np.float64, copy=False))
+    indptr = np.zeros(len(chunk) + 1, dtype=np.int64)
+    np.cumsum([len(doc) for doc in chunk], out=indptr[1:])
+    # flatten all (termid, count) pairs at once, without a Python loop over the terms
+    pairs = np.fromiter(chain.from_iterable(chain.from_iterable(chunk)), dtype=np.float64, count=2 * indptr[-1])
+    pairs = pairs.reshape(-1, 2)
+    return indptr, pairs[:, 0].astype(np.int64), np.ascontiguousarray(pairs[:, 1])
+
+
+def inference_docs(expElogbeta, chunk, alpha, gamma, sstats, iterations, gamma_threshold):
+    """
+    Update `gamma` (and `sstats`, unless None) in place, one document of `chunk`
+    at a time, against the topics `expElogbeta` and prior `alpha`: the plain numpy
+    counterpart of the compiled `e_step`. Return the number of documents that converged.
+    """
+    Elogtheta = dirichlet_expectation(gamma)
+    expElogtheta = np.exp(Elogtheta)
+    collect_sstats = sstats is not None
+    converged = 0
+
+    # Now, for each document d update that document's gamma and phi
+    # Inference code copied from Hoffman's `onlineldavb.py` (esp. the
+    # Lee&Seung trick which speeds things up by an order of magnitude, compared
+    # to Blei's original LDA-C code, cool!).
+    for d, doc in enumerate(chunk):
+        if len(doc) > 0 and not isinstance(doc[0][0], six.integer_types + (np.integer,)):
+            # make sure the term IDs are ints, otherwise np will get upset
+            ids = [int(id) for id, _ in doc]
+        else:
+            ids = [id for id, _ in doc]
+        cts = np.array([cnt for _, cnt in doc])
+        gammad = gamma[d, :]
+        Elogthetad = Elogtheta[d, :]
+        expElogthetad = expElogtheta[d, :]
+        expElogbetad = expElogbeta[:, ids]
+
+        # The optimal phi_{dwk} is proportional to expElogthetad_k * expElogbetad_w.
+        # phinorm is the normalizer.
+        # TODO treat zeros explicitly, instead of adding 1e-100?
+        phinorm = np.dot(expElogthetad, expElogbetad) + 1e-100
+
+        # Iterate between gamma and phi until convergence
+        for _ in xrange(iterations):
+            lastgamma = gammad
+            # We represent phi implicitly to save memory and time.
+            # Substituting the value of the optimal phi back into
+            # the update for gamma gives this update. Cf. Lee&Seung 2001.
+            gammad = alpha + expElogthetad * np.dot(cts / phinorm, expElogbetad.T)
+            Elogthetad = dirichlet_expectation(gammad)
+            expElogthetad = np.exp(Elogthetad)
+            phinorm = np.dot(expElogthetad, expElogbetad) + 1e-100
+            # If gamma hasn't changed much, we're done.
+            meanchange = np.mean(abs(gammad - lastgamma))
+            if (meanchange < gamma_threshold):
+                converged += 1
+                break
+        gamma[d, :] = gammad
+        if collect_sstats:
+            # Contribution of document d to the expected sufficient
+            # statistics for the M step.
+            sstats[:, ids] += np.outer(expElogthetad.T, cts / phinorm)
+    return converged
+
+
 def update_dir_prior(prior, N, logphat, rho):
     """
     Updates a given prior using Newton's method, described in
@@ -83,6 +157,62 @@ def update_dir_prior(prior, N, logphat, rho):
     return prior
 
 
+def annotate_topic_pairs(fst_topics, snd_topics, n_ann_terms):
+    """
+    Return the annotation of `LdaModel.diff` for all pairs of the word sets
+    `fst_topics` and `snd_topics`: `annotation[i][j]` is a 2-item list of up to
+    `n_ann_terms` random words from the intersection and from the symmetric
+    difference of `fst_topics[i]` and `snd_topics[j]`.
+
+    The words are picked for a whole row `i` at once, with numpy masks over the
+    words of all topics, instead of with set operations pair by pair.
+    """
+    vocab = {}
+    fst_ids = [np.array([vocab.setdefault(word, len(vocab)) for word in words], dtype=np.int64) for words in fst_topics]
+    snd_ids = [np.array([vocab.setdefault(word, len(vocab)) for word in words], dtype=np.int64) for words in snd_topics]
+    words = np.empty(len(vocab) + 1, dtype=object)
+    for word, id in six.iteritems(vocab):
+        words[id] = word
+
+    # the words of all `snd_topics`, padded to the same length with a dummy word `len(vocab)`
+    width = max([len(ids) for ids in snd_ids] + [0])
+    snd_matrix = np.full((len(snd_ids), width), len(vocab), dtype=np.int64)
+    for topic2, ids in enumerate(snd_ids):
+        snd_matrix[topic2, :len(ids)] = ids
+    snd_valid = snd_matrix < len(vocab)
+    snd_incidence = np.zeros((len(snd_ids), len(vocab) + 1), dtype=bool)
+    snd_incidence[np.arange(len(snd_ids))[:, None], snd_matrix] = True
+    snd_incidence[:, len(vocab)] = False
+
+    def pick(candidates, mask):
+        """Up to `n_ann_terms` random words of each row of `candidates` where `mask` is set."""
+        if n_ann_terms <= 0:
+            return [[] for _ in candidates]
+        keys = np.random.random_sample(mask.shape)
+        keys[~mask] = 2.0  # sort the words that don't qualify last
+        rows = np.arange(len(candidates))[:, None]
+        if n_ann_terms < keys.shape[1]:
+            order = np.argpartition(keys, n_ann_terms - 1, axis=1)[:, :n_ann_terms]
+        else:
+            order = np.broadcast_to(np.arange(keys.shape[1]), keys.shape)
+        order = order[rows, np.argsort(keys[rows, order], axis=1)]
+        picked = words[candidates[rows, order]]
+        counts = np.minimum(mask.sum(axis=1), n_ann_terms)
+        return [row[:count].tolist() for row, count in zip(picked, counts)]
+
+    annotation = []
+    for ids in fst_ids:
+        in_snd = snd_incidence[:, ids]  # is word `ids[k]` in `snd_topics[topic2]`?
+        fst_mask = np.zeros(len(vocab) + 1, dtype=bool)
+        fst_mask[ids] = True
+        fst_words = np.broadcast_to(ids, in_snd.shape)
+        pos_tokens = pick(fst_words, in_snd)
+        neg_tokens = pick(
+            np.hstack([fst_words, snd_matrix]), np.hstack([~in_snd, snd_valid & ~fst_mask[snd_matrix]]))
+        annotation.append([[pos, neg] for pos, neg in zip(pos_tokens, neg_tokens)])
+    return annotation
+
+
 class LdaState(utils.SaveLoad):
     """
     Encapsulate information for distributed computation of LdaModel objects.
@@ -91,10 +221,11 @@ class LdaState(utils.SaveLoad):
     reduce traffic.
 
     """
-    def __init__(self, eta, shape):
+    def __init__(self, eta, shape, dtype=np.float64):
         self.eta = eta
-        self.sstats = np.zeros(shape)
+        self.sstats = np.zeros(shape, dtype=dtype)
         self.numdocs = 0
+        self.dtype = dtype
 
     def reset(self):
         """
@@ -170,6 +301,14 @@ class LdaState(utils.SaveLoad):
 
     def get_Elogbeta(self):
         return dirichlet_expectation(self.get_lambda())
+
+    @classmethod
+    def load(cls, fname, *args, **kwargs):
+        result = super(LdaState, cls).load(fname, *args, **kwargs)
+        # states saved before the `dtype` option were always float64
+        if not hasattr(result, 'dtype'):
+            result.dtype = np.float64
+        return result
 # endclass LdaState
 
 
@@ -195,7 +334,9 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                  alpha='symmetric', eta=None, decay=0.5, offset=1.0,
                  eval_every=10, iterations=50, gamma_threshold=0.001,
                  minimum_probability=0.01, random_state=None, ns_conf={},
-                 minimum_phi_value=0.01, per_word_topics=False):
+                 minimum_phi_value=0.01, per_word_topics=False, dtype=np.float64,
+                 eval_sample=None, stop_metric=None, stop_threshold=0.001, heldout_corpus=None,
+                 dispatcher=None):
         """
         If given, start training from the iterable `corpus` straight away. If not given,
         the model is left untrained (presumably because you want to call `update()` manually).
@@ -226,11 +367,31 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         (can not be learned from data).
 
         Turn on `distributed` to force distributed computing (see the `web tutorial <http://radimrehurek.com/gensim/distributed.html>`_
-        on how to set up a cluster of machines for gensim).
+        on how to set up a cluster of machines for gensim). Alternatively, pass a
+        `gensim.models.socket_dispatcher.SocketDispatcher` (with `LdaWorker` workers) as
+        `dispatcher`, to distribute the computation without Pyro.
 
         Calculate and log perplexity estimate from the latest mini-batch every
         `eval_every` model updates (setting this to 1 slows down training ~2x;
         default is 10 for better performance). Set to None to disable perplexity estimation.
+        If `eval_sample` is set, only a random sample of that many documents of the
+        mini-batch is evaluated, which makes the estimate (logged with its 95% confidence
+        interval) correspondingly cheaper.
+
+        By default, training runs all `passes`. To stop as soon as the model converges,
+        set `stop_metric`:
+
+        * `'perplexity'`: stop after the first pass that improved the per-word bound of
+          held-out documents by less than `stop_threshold` (relative to its previous
+          value). The held-out documents are `heldout_corpus` (or, if not given, the first
+          `chunksize` documents of the training corpus), restricted to a random sample of
+          `eval_sample` documents if set.
+        * `'diff'`: stop after the first pass that changed the topics (log-probabilities
+          of the words) by less than `stop_threshold` on average.
+
+        The metrics of each pass (time, the topic diff with `stop_metric='diff'`, and the
+        held-out bound and perplexity if evaluated) are recorded in `pass_metrics`, the
+        reason why training stopped in `stop_reason`.
 
         `decay` and `offset` parameters are the same as Kappa and Tau_0 in
         Hoffman et al, respectively.
@@ -239,6 +400,11 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
 
         `random_state` can be a np.random.RandomState object or the seed for one
 
+        `dtype` (`np.float64` or `np.float32`) is the data type of the large matrices:
+        the topics (`expElogbeta`, the sufficient statistics `state.sstats`, `eta`)
+        and the per-document `gamma`. `np.float32` halves their memory. The inference
+        of each document and the `alpha` prior still use float64.
+
         Example:
 
         >>> lda = LdaModel(corpus, num_topics=100)  # train model
@@ -251,6 +417,10 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         """
 
         # store user-supplied parameters
+        self.dtype = np.dtype(dtype).type
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError("dtype must be np.float32 or np.float64, not %s" % dtype)
+
         self.id2word = id2word
         if corpus is None and self.id2word is None:
             raise ValueError('at least one of corpus/id2word must be specified, to establish input space dimensionality')
@@ -278,6 +448,12 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         self.passes = passes
         self.update_every = update_every
         self.eval_every = eval_every
+        self.eval_sample = eval_sample
+        if stop_metric not in (None, 'perplexity', 'diff'):
+            raise ValueError("stop_metric must be None, 'perplexity' or 'diff', not %r" % (stop_metric,))
+        self.stop_metric = stop_metric
+        self.stop_threshold = stop_threshold
+        self.pass_metrics, self.stop_reason = [], None
         self.minimum_phi_value = minimum_phi_value
         self.per_word_topics = per_word_topics
 
@@ -290,6 +466,7 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                 raise ValueError("The 'asymmetric' option cannot be used for eta")
 
         self.eta, self.optimize_eta = self.init_dir_prior(eta, 'eta')
+        self.eta = self.eta.astype(self.dtype, copy=False)  # so that the topics (eta + sstats) keep `dtype`
 
         self.random_state = utils.get_random_state(random_state)
 
@@ -302,7 +479,17 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         self.gamma_threshold = gamma_threshold
 
         # set up distributed environment if necessary
-        if not distributed:
+        if dispatcher is not None:
+            if self.optimize_alpha:
+                raise NotImplementedError("auto-optimizing alpha not implemented in distributed LDA")
+            self.distributed = True
+            self.dispatcher = dispatcher
+            self.dispatcher.initialize(id2word=self.id2word, num_topics=self.num_topics,
+                                       chunksize=chunksize, alpha=alpha, eta=eta, distributed=False,
+                                       dtype=np.dtype(self.dtype).name)
+            self.numworkers = len(self.dispatcher.getworkers())
+            logger.info("using distributed version with %i workers", self.numworkers)
+        elif not distributed:
             logger.info("using serial LDA version on this node")
             self.dispatcher = None
             self.numworkers = 1
@@ -317,7 +504,8 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                     self.dispatcher = Pyro4.Proxy(ns.list(prefix=LDA_DISPATCHER_PREFIX)[LDA_DISPATCHER_PREFIX])
                     logger.debug("looking for dispatcher at %s" % str(self.dispatcher._pyroUri))
                     self.dispatcher.initialize(id2word=self.id2word, num_topics=self.num_topics,
-                                               chunksize=chunksize, alpha=alpha, eta=eta, distributed=False)
+                                               chunksize=chunksize, alpha=alpha, eta=eta, distributed=False,
+                                               dtype=np.dtype(self.dtype).name)
                     self.numworkers = len(self.dispatcher.getworkers())
                     logger.info("using distributed version with %i workers" % self.numworkers)
             except Exception as err:
@@ -325,14 +513,14 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                 raise RuntimeError("failed to initialize distributed LDA (%s)" % err)
 
         # Initialize the variational distribution q(beta|lambda)
-        self.state = LdaState(self.eta, (self.num_topics, self.num_terms))
-        self.state.sstats = self.random_state.gamma(100., 1. / 100., (self.num_topics, self.num_terms))
+        self.state = LdaState(self.eta, (self.num_topics, self.num_terms), dtype=self.dtype)
+        self.state.sstats[...] = self.random_state.gamma(100., 1. / 100., (self.num_topics, self.num_terms))
         self.expElogbeta = np.exp(dirichlet_expectation(self.state.sstats))
 
         # if a training corpus was provided, start estimating the model right away
         if corpus is not None:
-            use_numpy = self.dispatcher is not None
-            self.update(corpus, chunks_as_numpy=use_numpy)
+            use_numpy = self.dispatcher is not None and dispatcher is None  # numpy chunks for Pyro only
+            self.update(corpus, chunks_as_numpy=use_numpy, heldout_corpus=heldout_corpus)
 
     def init_dir_prior(self, prior, name):
         if prior is None:
@@ -392,7 +580,12 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
 
         This function does not modify the model (=is read-only aka const). The
         whole input chunk of document is assumed to fit in RAM; chunking of a
-        large corpus must be done earlier in the pipeline.
+        large corpus must be done earlier in the pipeline. The chunk may also be
+        a `scipy.sparse` matrix with one row per document.
+
+        If the compiled extension `ldamodel_inner` is available, the whole chunk is
+        processed in one call to its E-step (without the GIL); otherwise documents
+        are processed one by one with numpy.
 
         If `collect_sstats` is True, also collect sufficient statistics needed
         to update the model's topic-word distributions, and return a 2-tuple
@@ -403,69 +596,34 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         optimization presented in **Lee, Seung: Algorithms for non-negative matrix factorization, NIPS 2001**.
 
         """
-        try:
-            _ = len(chunk)
-        except:
-            # convert iterators/generators to plain list, so we have len() etc.
-            chunk = list(chunk)
-        if len(chunk) > 1:
-            logger.debug("performing inference on a chunk of %i documents", len(chunk))
+        if not scipy.sparse.issparse(chunk):
+            try:
+                _ = len(chunk)
+            except:
+                # convert iterators/generators to plain list, so we have len() etc.
+                chunk = list(chunk)
+        num_docs = chunk.shape[0] if scipy.sparse.issparse(chunk) else len(chunk)
+        if num_docs > 1:
+            logger.debug("performing inference on a chunk of %i documents", num_docs)
 
         # Initialize the variational distribution q(theta|gamma) for the chunk
-        gamma = self.random_state.gamma(100., 1. / 100., (len(chunk), self.num_topics))
-        Elogtheta = dirichlet_expectation(gamma)
-        expElogtheta = np.exp(Elogtheta)
+        gamma = self.random_state.gamma(100., 1. / 100., (num_docs, self.num_topics))
+        gamma = gamma.astype(self.expElogbeta.dtype, copy=False)
         if collect_sstats:
             sstats = np.zeros_like(self.expElogbeta)
         else:
             sstats = None
-        converged = 0
-
-        # Now, for each document d update that document's gamma and phi
-        # Inference code copied from Hoffman's `onlineldavb.py` (esp. the
-        # Lee&Seung trick which speeds things up by an order of magnitude, compared
-        # to Blei's original LDA-C code, cool!).
-        for d, doc in enumerate(chunk):
-            if len(doc) > 0 and not isinstance(doc[0][0], six.integer_types + (np.integer,)):
-                # make sure the term IDs are ints, otherwise np will get upset
-                ids = [int(id) for id, _ in doc]
-            else:
-                ids = [id for id, _ in doc]
-            cts = np.array([cnt for _, cnt in doc])
-            gammad = gamma[d, :]
-            Elogthetad = Elogtheta[d, :]
-            expElogthetad = expElogtheta[d, :]
-            expElogbetad = self.expElogbeta[:, ids]
-
-            # The optimal phi_{dwk} is proportional to expElogthetad_k * expElogbetad_w.
-            # phinorm is the normalizer.
-            # TODO treat zeros explicitly, instead of adding 1e-100?
-            phinorm = np.dot(expElogthetad, expElogbetad) + 1e-100
 
-            # Iterate between gamma and phi until convergence
-            for _ in xrange(self.iterations):
-                lastgamma = gammad
-                # We represent phi implicitly to save memory and time.
-                # Substituting the value of the optimal phi back into
-                # the update for gamma gives this update. Cf. Lee&Seung 2001.
-                gammad = self.alpha + expElogthetad * np.dot(cts / phinorm, expElogbetad.T)
-                Elogthetad = dirichlet_expectation(gammad)
-                expElogthetad = np.exp(Elogthetad)
-                phinorm = np.dot(expElogthetad, expElogbetad) + 1e-100
-                # If gamma hasn't changed much, we're done.
-                meanchange = np.mean(abs(gammad - lastgamma))
-                if (meanchange < self.gamma_threshold):
-                    converged += 1
-                    break
-            gamma[d, :] = gammad
-            if collect_sstats:
-                # Contribution of document d to the expected sufficient
-                # statistics for the M step.
-                sstats[:, ids] += np.outer(expElogthetad.T, cts / phinorm)
-
-        if len(chunk) > 1:
+        if e_step is not None:
+            converged = self._inference_chunk(chunk, gamma, sstats)
+        else:
+            if scipy.sparse.issparse(chunk):
+                chunk = list(matutils.Sparse2Corpus(chunk, documents_columns=False))
+            converged = self._inference_docs(chunk, gamma, sstats)
+
+        if num_docs > 1:
             logger.debug("%i/%i documents converged within %i iterations",
-                         converged, len(chunk), self.iterations)
+                         converged, num_docs, self.iterations)
 
         if collect_sstats:
             # This step finishes computing the sufficient statistics for the
@@ -475,6 +633,33 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
             sstats *= self.expElogbeta
         return gamma, sstats
 
+    def _inference_chunk(self, chunk, gamma, sstats):
+        """
+        Update `gamma` (and `sstats`, unless None) in place for all documents of
+        `chunk` at once, with the compiled E-step. Return the number of documents
+        that converged.
+        """
+        indptr, termids, counts = chunk2csr(chunk)
+        if len(termids) and (termids.min() < 0 or termids.max() >= self.num_terms):
+            raise IndexError("term id out of range for a model with %i terms" % self.num_terms)
+        expElogbeta = np.ascontiguousarray(self.expElogbeta)
+        if sstats is None:
+            sstats_buf, collect_sstats = np.zeros((0, 0), dtype=expElogbeta.dtype), False
+        else:
+            sstats_buf, collect_sstats = sstats, True
+        alpha = np.ascontiguousarray(self.alpha, dtype=np.float64)
+        return e_step(
+            expElogbeta, indptr, termids, counts, alpha, gamma, sstats_buf, collect_sstats,
+            self.iterations, self.gamma_threshold)
+
+    def _inference_docs(self, chunk, gamma, sstats):
+        """
+        Update `gamma` (and `sstats`, unless None) in place, one document of `chunk`
+        at a time. Return the number of documents that converged.
+        """
+        return inference_docs(
+            self.expElogbeta, chunk, self.alpha, gamma, sstats, self.iterations, self.gamma_threshold)
+
     def do_estep(self, chunk, state=None):
         """
         Perform inference on a chunk of documents, and accumulate the collected
@@ -513,25 +698,70 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
 
         return self.eta
 
-    def log_perplexity(self, chunk, total_docs=None):
+    def log_perplexity(self, chunk, total_docs=None, sample_size=None, confidence=0.95):
         """
         Calculate and return per-word likelihood bound, using the `chunk` of
         documents as evaluation corpus. Also output the calculated statistics. incl.
         perplexity=2^(-bound), to log at INFO level.
 
+        If `sample_size` is given, only a random sample of that many documents of
+        `chunk` is evaluated. The logged statistics include the `confidence`
+        interval of the estimate; see `per_word_bound`.
+
+        """
+        perwordbound, lower, upper = self.per_word_bound(
+            chunk, total_docs=total_docs, sample_size=sample_size, confidence=confidence)
+        logger.info("%.3f per-word bound (%g%% confidence interval %.3f to %.3f), %.1f perplexity estimate "
+                    "based on a held-out corpus of %i documents",
+                    perwordbound, 100 * confidence, lower, upper, np.exp2(-perwordbound),
+                    len(chunk) if sample_size is None else min(sample_size, len(chunk)))
+        return perwordbound
+
+    def per_word_bound(self, chunk, total_docs=None, sample_size=None, confidence=0.95):
+        """
+        Estimate the per-word likelihood bound of a corpus of `total_docs` documents
+        (default: `len(chunk)`) from the documents of `chunk`, or from a random sample
+        of `sample_size` of them.
+
+        Return a 3-tuple `(perwordbound, lower, upper)`, where `lower` and `upper`
+        delimit the `confidence` interval of the estimate: the bounds of the evaluated
+        documents relative to their lengths are a ratio estimate of those of the whole
+        corpus, which is exact (`lower == upper`) if all `total_docs` documents are evaluated.
+
         """
+        chunk = list(chunk)
         if total_docs is None:
             total_docs = len(chunk)
-        corpus_words = sum(cnt for document in chunk for _, cnt in document)
-        subsample_ratio = 1.0 * total_docs / len(chunk)
-        perwordbound = self.bound(chunk, subsample_ratio=subsample_ratio) / (subsample_ratio * corpus_words)
-        logger.info("%.3f per-word bound, %.1f perplexity estimate based on a held-out corpus of %i documents with %i words" %
-                    (perwordbound, np.exp2(-perwordbound), len(chunk), corpus_words))
-        return perwordbound
+        if sample_size is not None and sample_size < len(chunk):
+            chunk = [chunk[d] for d in sorted(self.random_state.choice(len(chunk), sample_size, replace=False))]
+        num_docs = len(chunk)
+        if not num_docs:
+            raise ValueError("cannot estimate the bound from an empty chunk")
+
+        _lambda = self.state.get_lambda()
+        Elogbeta = dirichlet_expectation(_lambda)
+        docbounds = self.doc_bounds(chunk, Elogbeta=Elogbeta)
+        indptr, _, counts = chunk2csr(chunk)
+        cumcounts = np.zeros(len(counts) + 1)
+        np.cumsum(counts, out=cumcounts[1:])
+        doclengths = cumcounts[indptr[1:]] - cumcounts[indptr[:-1]]
+        corpus_words = doclengths.sum()
+
+        # the topic part of the bound is known exactly; only the documents' part is estimated
+        subsample_ratio = 1.0 * total_docs / num_docs
+        ratio = docbounds.sum() / corpus_words
+        perwordbound = ratio + self.topic_bound(_lambda, Elogbeta) / (subsample_ratio * corpus_words)
+        if num_docs > 1 and num_docs < total_docs:
+            residuals = docbounds - ratio * doclengths
+            stderr = np.sqrt(np.sum(residuals ** 2) / (num_docs - 1) / num_docs * (1.0 - 1.0 * num_docs / total_docs))
+            halfwidth = ndtri(0.5 + confidence / 2.0) * stderr / doclengths.mean()
+        else:
+            halfwidth = 0.0
+        return perwordbound, perwordbound - halfwidth, perwordbound + halfwidth
 
     def update(self, corpus, chunksize=None, decay=None, offset=None,
                passes=None, update_every=None, eval_every=None, iterations=None,
-               gamma_threshold=None, chunks_as_numpy=False):
+               gamma_threshold=None, chunks_as_numpy=False, heldout_corpus=None):
         """
         Train the model with new documents, by EM-iterating over `corpus` until
         the topics converge (or until the maximum number of allowed iterations
@@ -560,6 +790,9 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                 computing it may be desirable to keep the chunks as np
                 arrays.
 
+            heldout_corpus (gensim corpus): Documents to evaluate after every pass, for
+                early stopping (see `stop_metric` in the constructor).
+
         For other parameter settings, see :class:`LdaModel` constructor.
 
         """
@@ -579,11 +812,7 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         if gamma_threshold is None:
             gamma_threshold = self.gamma_threshold
 
-        try:
-            lencorpus = len(corpus)
-        except:
-            logger.warning("input corpus stream has no len(); counting documents")
-            lencorpus = sum(1 for _ in corpus)
+        lencorpus = utils.corpus_length(corpus)
         if lencorpus == 0:
             logger.warning("LdaModel.update() called with an empty corpus")
             return
@@ -626,12 +855,14 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         def rho():
             return pow(offset + pass_ + (self.num_updates / chunksize), -decay)
 
+        heldout = self._start_passes(corpus, heldout_corpus, chunksize)
         for pass_ in xrange(passes):
+            pass_start, previous = time.time(), self._pass_topics()
             if self.dispatcher:
                 logger.info('initializing %s workers' % self.numworkers)
                 self.dispatcher.reset(self.state)
             else:
-                other = LdaState(self.eta, self.state.sstats.shape)
+                other = LdaState(self.eta, self.state.sstats.shape, self.dtype)
             dirty = False
 
             reallen = 0
@@ -639,7 +870,7 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                 reallen += len(chunk)  # keep track of how many documents we've processed so far
 
                 if eval_every and ((reallen == lencorpus) or ((chunk_no + 1) % (eval_every * self.numworkers) == 0)):
-                    self.log_perplexity(chunk, total_docs=lencorpus)
+                    self.log_perplexity(chunk, total_docs=lencorpus, sample_size=self.eval_sample)
 
                 if self.dispatcher:
                     # add the chunk to dispatcher's job queue, so workers can munch on it
@@ -671,7 +902,7 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                         logger.info('initializing workers')
                         self.dispatcher.reset(self.state)
                     else:
-                        other = LdaState(self.eta, self.state.sstats.shape)
+                        other = LdaState(self.eta, self.state.sstats.shape, self.dtype)
                     dirty = False
             # endfor single corpus iteration
             if reallen != lencorpus:
@@ -686,8 +917,72 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                 self.do_mstep(rho(), other, pass_ > 0)
                 del other
                 dirty = False
+
+            if self._end_pass(pass_, passes, pass_start, previous, heldout):
+                break
         # endfor entire corpus update
 
+    def _start_passes(self, corpus, heldout_corpus, chunksize):
+        """
+        Reset the recorded metrics before the training passes over `corpus`. Return
+        the held-out documents to evaluate after each pass, or None.
+
+        """
+        self.pass_metrics, self.stop_reason = [], None
+        if heldout_corpus is None and self.stop_metric == 'perplexity':
+            heldout_corpus = islice(corpus, chunksize)
+        if heldout_corpus is None:
+            return None
+        heldout = list(heldout_corpus)
+        if self.eval_sample is not None and self.eval_sample < len(heldout):
+            # the same sample for every pass, so that the passes are comparable
+            sample_docs = self.random_state.choice(len(heldout), self.eval_sample, replace=False)
+            heldout = [heldout[d] for d in sorted(sample_docs)]
+        return heldout
+
+    def _pass_topics(self):
+        """
+        Return the topics at the start of a pass, to compute the topic diff at its end
+        (see `_end_pass`), or None if the diff isn't needed.
+
+        """
+        if self.stop_metric != 'diff':
+            return None
+        return self.state.get_Elogbeta()  # finite, unlike the log of `expElogbeta`, which may underflow
+
+    def _end_pass(self, pass_, passes, pass_start, previous, heldout):
+        """
+        Record the metrics of pass `pass_` (out of `passes`), which started at time
+        `pass_start` from the topics `previous` (see `_pass_topics`). Return True
+        if training should stop early.
+
+        """
+        metrics = {'pass': pass_, 'seconds': time.time() - pass_start}
+        if previous is not None:
+            metrics['diff'] = np.mean(np.abs(self.state.get_Elogbeta() - previous), dtype=np.float64)
+        if heldout is not None:
+            metrics['per_word_bound'] = self.per_word_bound(heldout)[0]
+            metrics['perplexity'] = np.exp2(-metrics['per_word_bound'])
+        self.pass_metrics.append(metrics)
+        logger.info("pass %i finished in %.1fs: %s", pass_, metrics['seconds'],
+                    ", ".join("%s=%f" % (key, metrics[key]) for key in ('diff', 'per_word_bound', 'perplexity') if key in metrics))
+
+        if self.stop_metric == 'diff':
+            change, what = metrics['diff'], "topic diff"
+        elif self.stop_metric == 'perplexity' and len(self.pass_metrics) > 1:
+            last = self.pass_metrics[-2]['per_word_bound']
+            change, what = (metrics['per_word_bound'] - last) / abs(last), "relative improvement of the per-word bound"
+        else:
+            change = None
+        if pass_ + 1 == passes:
+            self.stop_reason = "completed all %i passes" % passes
+        elif change is not None and change < self.stop_threshold:
+            self.stop_reason = "converged after %i of %i passes: %s %f below stop_threshold %f" % (
+                pass_ + 1, passes, what, change, self.stop_threshold)
+            logger.info("stopping early, %s", self.stop_reason)
+            return True
+        return False
+
     def do_mstep(self, rho, other, extra_pass=False):
         """
         M step: use linear interpolation between the existing topics and
@@ -722,43 +1017,91 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         document (=2d matrix=what comes out of `inference()`).
         If not supplied, will be inferred from the model.
 
+        The corpus is streamed in chunks of `chunksize` documents, each inferred
+        and scored at once (see `doc_bounds`).
+
         """
         score = 0.0
         _lambda = self.state.get_lambda()
         Elogbeta = dirichlet_expectation(_lambda)
 
-        for d, doc in enumerate(corpus):  # stream the input doc-by-doc, in case it's too large to fit in RAM
-            if d % self.chunksize == 0:
-                logger.debug("bound: at document #%i", d)
-            if gamma is None:
-                gammad, _ = self.inference([doc])
-            else:
-                gammad = gamma[d]
-            Elogthetad = dirichlet_expectation(gammad)
-
-            # E[log p(doc | theta, beta)]
-            score += np.sum(cnt * logsumexp(Elogthetad + Elogbeta[:, int(id)]) for id, cnt in doc)
-
-            # E[log p(theta | alpha) - log q(theta | gamma)]; assumes alpha is a vector
-            score += np.sum((self.alpha - gammad) * Elogthetad)
-            score += np.sum(gammaln(gammad) - gammaln(self.alpha))
-            score += gammaln(np.sum(self.alpha)) - gammaln(np.sum(gammad))
+        start = 0
+        for chunk in utils.grouper(corpus, self.chunksize):  # stream the input, in case it's too large to fit in RAM
+            logger.debug("bound: at document #%i", start)
+            chunk_gamma = None if gamma is None else gamma[start:start + len(chunk)]
+            score += np.sum(self.doc_bounds(chunk, chunk_gamma, Elogbeta))
+            start += len(chunk)
 
         # Compensate likelihood for when `corpus` above is only a sample of the whole corpus. This ensures
         # that the likelihood is always rougly on the same scale.
         score *= subsample_ratio
 
-        # E[log p(beta | eta) - log q (beta | lambda)]; assumes eta is a scalar
-        score += np.sum((self.eta - _lambda) * Elogbeta)
-        score += np.sum(gammaln(_lambda) - gammaln(self.eta))
+        return score + self.topic_bound(_lambda, Elogbeta)
+
+    def doc_bounds(self, chunk, gamma=None, Elogbeta=None):
+        """
+        Return the terms of the variational bound that belong to the individual
+        documents of `chunk`, as a numpy array with one value per document:
+        E_q[log p(doc | theta, beta) + log p(theta | alpha) - log q(theta | gamma)].
+
+        `gamma` and `Elogbeta` are inferred and computed from the model, unless given.
+        All documents are scored at once, with numpy (no Python loop over words or documents).
+
+        """
+        if Elogbeta is None:
+            Elogbeta = dirichlet_expectation(self.state.get_lambda())
+        if gamma is None:
+            gamma, _ = self.inference(chunk)
+        gamma = np.asarray(gamma, dtype=np.float64)
+        Elogtheta = dirichlet_expectation(gamma)
+        indptr, termids, counts = chunk2csr(chunk)
+        num_docs = len(indptr) - 1
+
+        # E[log p(doc | theta, beta)]: cnt * logsumexp(Elogtheta_d + Elogbeta[:, id]) summed over the document's
+        # words, i.e. the log of a dot product of exponentials (shifted by their maxima, so that they don't underflow)
+        words, inverse = np.unique(termids, return_inverse=True)
+        Elogbetaw = Elogbeta[:, words].astype(np.float64)
+        betamax = Elogbetaw.max(axis=0)
+        expbeta = np.ascontiguousarray(np.exp(Elogbetaw - betamax).T)
+        thetamax = Elogtheta.max(axis=1)
+        exptheta = np.exp(Elogtheta - thetamax[:, None])
+        docids = np.repeat(np.arange(num_docs), np.diff(indptr))
+        phinorm = np.empty(len(termids))
+        step = max(1, 2 ** 20 // self.num_topics)  # bound the memory of the gathered rows
+        for start in xrange(0, len(termids), step):
+            block = slice(start, start + step)
+            phinorm[block] = np.einsum('ij,ij->i', exptheta[docids[block]], expbeta[inverse[block]])
+        wordbounds = counts * (np.log(phinorm) + thetamax[docids] + betamax[inverse])
+        score = np.bincount(docids, weights=wordbounds, minlength=num_docs).astype(np.float64)  # int64 if no words
+
+        # E[log p(theta | alpha) - log q(theta | gamma)]; assumes alpha is a vector
+        score += np.sum((self.alpha - gamma) * Elogtheta, axis=1)
+        score += np.sum(gammaln(gamma) - gammaln(self.alpha), axis=1)
+        score += gammaln(np.sum(self.alpha)) - gammaln(np.sum(gamma, axis=1))
+        return score
+
+    def topic_bound(self, _lambda=None, Elogbeta=None):
+        """
+        Return the term of the variational bound that belongs to the topics:
+        E_q[log p(beta | eta) - log q(beta | lambda)].
+
+        """
+        if _lambda is None:
+            _lambda = self.state.get_lambda()
+        if Elogbeta is None:
+            Elogbeta = dirichlet_expectation(_lambda)
+
+        # assumes eta is a scalar
+        # (accumulate in float64 even for float32 models: these are sums over the whole topic matrix)
+        score = np.sum((self.eta - _lambda) * Elogbeta, dtype=np.float64)
+        score += np.sum(gammaln(_lambda) - gammaln(self.eta), dtype=np.float64)
 
         if np.ndim(self.eta) == 0:
             sum_eta = self.eta * self.num_terms
         else:
-            sum_eta = np.sum(self.eta)
-
-        score += np.sum(gammaln(sum_eta) - gammaln(np.sum(_lambda, 1)))
+            sum_eta = np.sum(self.eta, dtype=np.float64)
 
+        score += np.sum(gammaln(sum_eta) - gammaln(np.sum(_lambda, 1, dtype=np.float64)))
         return score
 
     def show_topics(self, num_topics=10, num_words=10, log=False, formatted=True):
@@ -971,7 +1314,7 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
 
         return values
 
-    def diff(self, other, distance="kullback_leibler", num_words=100, n_ann_terms=10, normed=True):
+    def diff(self, other, distance="kullback_leibler", num_words=100, n_ann_terms=10, normed=True, annotate=True):
         """
         Calculate difference topic2topic between two Lda models
         `other` instances of `LdaMulticore` or `LdaModel`
@@ -988,6 +1331,10 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
             `diff_l` is word from symmetric difference of `topic_i` and `topic_j`
             `normed` is a flag. If `true`, matrix Z will be normalized
 
+        The distances of all topic pairs are computed at once, with matrix operations
+        (see `matutils.kullback_leibler_matrix` etc.). The annotation is the slower part for
+        many topics; if `annotate` is False, it's skipped and None is returned instead.
+
         Example:
 
         >>> m1, m2 = LdaMulticore.load(path_1), LdaMulticore.load(path_2)
@@ -998,9 +1345,9 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         """
 
         distances = {
-            "kullback_leibler": kullback_leibler,
-            "hellinger": hellinger,
-            "jaccard": jaccard_distance,
+            "kullback_leibler": matutils.kullback_leibler_matrix,
+            "hellinger": matutils.hellinger_matrix,
+            "jaccard": matutils.jaccard_distance_matrix,
         }
 
         if distance not in distances:
@@ -1008,38 +1355,29 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
             raise ValueError("Incorrect distance, valid only {}".format(valid_keys))
 
         if not isinstance(other, self.__class__):
-            raise ValueError("The parameter `other` must be of type `{}`".format(self.__name__))
+            raise ValueError("The parameter `other` must be of type `{}`".format(self.__class__.__name__))
 
         distance_func = distances[distance]
         d1, d2 = self.state.get_lambda(), other.state.get_lambda()
-        t1_size, t2_size = d1.shape[0], d2.shape[0]
 
-        fst_topics = [{w for (w, _) in self.show_topic(topic, topn=num_words)} for topic in xrange(t1_size)]
-        snd_topics = [{w for (w, _) in other.show_topic(topic, topn=num_words)} for topic in xrange(t2_size)]
+        # the most probable words of each topic, as in `show_topic` (but without recomputing lambda per topic)
+        fst_topics = [{self.id2word[id] for id in matutils.argsort(topic, num_words, reverse=True)} for topic in d1]
+        snd_topics = [{other.id2word[id] for id in matutils.argsort(topic, num_words, reverse=True)} for topic in d2]
 
         if distance == "jaccard":
             d1, d2 = fst_topics, snd_topics
 
-        z = np.zeros((t1_size, t2_size))
-        for topic1 in range(t1_size):
-            for topic2 in range(t2_size):
-                z[topic1][topic2] = distance_func(d1[topic1], d2[topic2])
+        # all topic pairs at once, with matrix operations
+        z = distance_func(d1, d2)
 
         if normed:
             if np.abs(np.max(z)) > 1e-8:
                 z /= np.max(z)
 
-        annotation = [[None] * t1_size for _ in range(t2_size)]
+        if not annotate:
+            return z, None
 
-        for topic1 in range(t1_size):
-            for topic2 in range(t2_size):
-                pos_tokens = fst_topics[topic1] & snd_topics[topic2]
-                neg_tokens = fst_topics[topic1].symmetric_difference(snd_topics[topic2])
-
-                pos_tokens = sample(pos_tokens, min(len(pos_tokens), n_ann_terms))
-                neg_tokens = sample(neg_tokens, min(len(neg_tokens), n_ann_terms))
-
-                annotation[topic1][topic2] = [pos_tokens, neg_tokens]
+        annotation = annotate_topic_pairs(fst_topics, snd_topics, n_ann_terms)
 
         return z, annotation
 
@@ -1135,9 +1473,18 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
             result.random_state = utils.get_random_state(None)  # using default value `get_random_state(None)`
             logging.warning("random_state not set so using default value")
 
+        # models saved before the `dtype` option were always float64
+        if not hasattr(result, 'dtype'):
+            result.dtype = np.float64
+        if not hasattr(result, 'eval_sample'):
+            result.eval_sample = None
+        if not hasattr(result, 'stop_metric'):
+            result.stop_metric, result.stop_threshold = None, 0.001
+            result.pass_metrics, result.stop_reason = [], None
+
         state_fname = utils.smart_extension(fname, '.state')
         try:
-            result.state = super(LdaModel, cls).load(state_fname, *args, **kwargs)
+            result.state = LdaState.load(state_fname, *args, **kwargs)
         except Exception as e:
             logging.warning("failed to load state from %s: %s", state_fname, e)
 
@@ -1152,3 +1499,114 @@ class LdaModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
                 logging.warning("failed to load id2word dictionary from %s: %s", id2word_fname, e)
         return result
 # endclass LdaModel
+
+
+class LdaInference(object):
+    """
+    Batch inference of document topic distributions with a trained `LdaModel`,
+    meant for serving (e.g. tagging many incoming documents with topics):
+
+    >>> inferencer = LdaInference(lda, threads=4)
+    >>> theta = inferencer.infer(bows)  # `len(bows) x lda.num_topics` numpy array
+    >>> inferencer.close()
+
+    The documents, bag-of-words vectors or a `scipy.sparse` matrix with one row per
+    document, are inferred in one call of the compiled E-step (see `LdaModel.inference`),
+    split over `threads` threads if given (the E-step releases the GIL).
+
+    Unlike `LdaModel.inference`, which draws the initial variational parameters
+    at random, the initial `gamma` of a document is `alpha + document length / num_topics`,
+    so the same document always gets the same topics. The model's topics are
+    copied once, on construction; call `refresh()` after the model is updated.
+    """
+    def __init__(self, model, threads=None, normalize=True):
+        """
+        `model` is the trained `LdaModel`. Spread the inference of large batches over
+        `threads` threads, or run it in the calling thread if `threads` is None.
+
+        If `normalize` is set, `infer` returns topic probabilities (each row sums to
+        one); otherwise it returns the unnormalized `gamma` parameters.
+        """
+        self.model = model
+        self.threads = threads
+        self.normalize = normalize
+        self.pool = None
+        self.refresh()
+
+    def refresh(self):
+        """Copy the (current) topics and inference settings of the model."""
+        model = self.model
+        self.num_topics, self.num_terms = model.num_topics, model.num_terms
+        self.expElogbeta = np.array(model.expElogbeta, order='C')
+        self.alpha = np.array(model.alpha, dtype=np.float64)
+        self.iterations, self.gamma_threshold = model.iterations, model.gamma_threshold
+        # sufficient statistics are never collected, but the E-step needs an array
+        self.no_sstats = np.zeros((0, 0), dtype=self.expElogbeta.dtype)
+
+    def close(self):
+        """Shut down the thread pool (it's restarted on demand)."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def infer(self, docs, out=None):
+        """
+        Return the topic distributions of `docs` (a list of bag-of-words vectors or a
+        `scipy.sparse` matrix, one row per document), as a `len(docs) x num_topics`
+        numpy array.
+
+        The result is written to `out` if given: a C-contiguous array of that shape
+        and of the model's dtype, which can be reused between calls.
+        """
+        indptr, termids, counts = chunk2csr(docs)
+        num_docs = len(indptr) - 1
+        if len(termids) and (termids.min() < 0 or termids.max() >= self.num_terms):
+            raise IndexError("term id out of range for a model with %i terms" % self.num_terms)
+
+        shape = (num_docs, self.num_topics)
+        if out is None:
+            gamma = np.empty(shape, dtype=self.expElogbeta.dtype)
+        elif out.shape != shape or out.dtype != self.expElogbeta.dtype or not out.flags.c_contiguous:
+            raise ValueError("out must be a C-contiguous %s array of shape %s" % (self.expElogbeta.dtype, shape))
+        else:
+            gamma = out
+
+        # deterministic initialization: spread the document length evenly over the topics
+        cumcounts = np.zeros(len(counts) + 1)
+        np.cumsum(counts, out=cumcounts[1:])
+        doclengths = cumcounts[indptr[1:]] - cumcounts[indptr[:-1]]
+        gamma[...] = self.alpha + (doclengths / self.num_topics)[:, None]
+
+        if e_step is None:
+            # no compiled E-step: run the plain numpy loop of the model, without threads
+            docs = [list(zip(termids[start:end], counts[start:end])) for start, end in zip(indptr[:-1], indptr[1:])]
+            inference_docs(self.expElogbeta, docs, self.alpha, gamma, None, self.iterations, self.gamma_threshold)
+        else:
+            threads = min(self.threads or 1, num_docs)
+            if threads <= 1:
+                self._e_step(indptr, termids, counts, gamma)
+            else:
+                if self.pool is None:
+                    self.pool = ThreadPool(self.threads)
+                # give each thread a contiguous range of documents with about the same number of terms
+                bounds = np.searchsorted(indptr, np.linspace(0, indptr[-1], threads + 1)[1:-1])
+                bounds = np.unique(np.concatenate([[0], bounds, [num_docs]]))
+
+                def e_step_range(docrange):
+                    start, end = docrange
+                    self._e_step(indptr[start:end + 1], termids, counts, gamma[start:end])
+
+                self.pool.map(e_step_range, list(zip(bounds[:-1], bounds[1:])))
+
+        if self.normalize:
+            gamma /= gamma.sum(axis=1)[:, None]
+        return gamma
+
+    def _e_step(self, indptr, termids, counts, gamma):
+        """Run the compiled E-step on the documents `indptr` (a slice of the CSR `indptr` array) into `gamma`."""
+        start, end = indptr[0], indptr[-1]
+        return e_step(
+            self.expElogbeta, indptr - start, termids[start:end], counts[start:end], self.alpha, gamma,
+            self.no_sstats, False, self.iterations, self.gamma_threshold)
+# endclass LdaInference
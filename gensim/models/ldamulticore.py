@@ -47,14 +47,22 @@ The core estimation code is based on the `onlineldavb.py` script by M. Hoffman [
 .. [1] http://www.cs.princeton.edu/~mdhoffma
 """
 
+import copy
+import ctypes
 import logging
+from math import ceil
+import time
+
+import numpy as np
 
 from gensim import utils
+from gensim.interfaces import CorpusABC
 from gensim.models.ldamodel import LdaModel, LdaState
 
 import six
 from six.moves import queue, xrange
 from multiprocessing import Pool, Queue, cpu_count
+from multiprocessing.sharedctypes import RawArray
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +89,8 @@ class LdaMulticore(LdaModel):
                  chunksize=2000, passes=1, batch=False, alpha='symmetric',
                  eta=None, decay=0.5, offset=1.0, eval_every=10, iterations=50,
                  gamma_threshold=0.001, random_state=None, minimum_probability=0.01,
-                 minimum_phi_value=0.01, per_word_topics=False):
+                 minimum_phi_value=0.01, per_word_topics=False, read_in_workers=False, dtype=np.float64,
+                 eval_sample=None, stop_metric=None, stop_threshold=0.001, heldout_corpus=None):
         """
         If given, start training from the iterable `corpus` straight away. If not given,
         the model is left untrained (presumably because you want to call `update()` manually).
@@ -122,12 +131,25 @@ class LdaMulticore(LdaModel):
         Calculate and log perplexity estimate from the latest mini-batch once every
         `eval_every` documents. Set to `None` to disable perplexity estimation (faster),
         or to `0` to only evaluate perplexity once, at the end of each corpus pass.
+        If `eval_sample` is set, only a random sample of that many documents of the
+        mini-batch is evaluated.
+
+        `stop_metric`, `stop_threshold` and `heldout_corpus` stop training early, once
+        the model converges; see `LdaModel`.
 
         `decay` and `offset` parameters are the same as Kappa and Tau_0 in
         Hoffman et al, respectively.
         
         `random_state` can be a numpy.random.RandomState object or the seed for one
 
+        If `read_in_workers` is set and the training corpus can be partitioned (see
+        `interfaces.CorpusABC.partition`; e.g. `MmCorpus`), the worker processes read and
+        parse their chunks of documents themselves: each job only names a partition of
+        about `chunksize` documents, so the input isn't bottlenecked by a single reader.
+
+        `dtype` (`np.float64` or `np.float32`) is the data type of the topic matrices,
+        also the ones shared with and sent back by the workers; see `LdaModel`.
+
         Example:
 
         >>> lda = LdaMulticore(corpus, id2word=id2word, num_topics=100)  # train model
@@ -138,6 +160,7 @@ class LdaMulticore(LdaModel):
         """
         self.workers = max(1, cpu_count() - 1) if workers is None else workers
         self.batch = batch
+        self.read_in_workers = read_in_workers
 
         if isinstance(alpha, six.string_types) and alpha == 'auto':
             raise NotImplementedError("auto-tuning alpha not implemented in multicore LDA; use plain LdaModel.")
@@ -146,10 +169,12 @@ class LdaMulticore(LdaModel):
             id2word=id2word, chunksize=chunksize, passes=passes, alpha=alpha, eta=eta,
             decay=decay, offset=offset, eval_every=eval_every, iterations=iterations,
             gamma_threshold=gamma_threshold, random_state=random_state, minimum_probability= minimum_probability,
-            minimum_phi_value=minimum_phi_value, per_word_topics=per_word_topics)
+            minimum_phi_value=minimum_phi_value, per_word_topics=per_word_topics, dtype=dtype,
+            eval_sample=eval_sample, stop_metric=stop_metric, stop_threshold=stop_threshold,
+            heldout_corpus=heldout_corpus)
 
 
-    def update(self, corpus, chunks_as_numpy=False):
+    def update(self, corpus, chunks_as_numpy=False, heldout_corpus=None):
         """
         Train the model with new documents, by EM-iterating over `corpus` until
         the topics converge (or until the maximum number of allowed iterations
@@ -166,12 +191,12 @@ class LdaMulticore(LdaModel):
         this equals the online update of Hoffman et al. and is guaranteed to
         converge for any `decay` in (0.5, 1.0>.
 
+        With `read_in_workers` (see the constructor), `corpus` is split into partitions
+        that the workers read on their own. `heldout_corpus` is evaluated after every
+        pass, for early stopping (see `stop_metric` in the constructor).
+
         """
-        try:
-            lencorpus = len(corpus)
-        except:
-            logger.warning("input corpus stream has no len(); counting documents")
-            lencorpus = sum(1 for _ in corpus)
+        lencorpus = utils.corpus_length(corpus)
         if lencorpus == 0:
             logger.warning("LdaMulticore.update() called with an empty corpus")
             return
@@ -193,6 +218,14 @@ class LdaMulticore(LdaModel):
             updatetype, self.num_topics, self.passes, lencorpus, updateafter, evalafter,
             self.iterations, self.gamma_threshold)
 
+        read_in_workers = getattr(self, 'read_in_workers', False)
+        if read_in_workers and not can_partition(corpus):
+            logger.warning("%s doesn't support partitioning, reading the corpus in the master process",
+                type(corpus).__name__)
+            read_in_workers = False
+        if read_in_workers:
+            num_parts = max(1, int(ceil(1.0 * lencorpus / self.chunksize)))
+
         if updates_per_pass * self.passes < 10:
             logger.warning("too few updates, training might not converge; consider "
                 "increasing the number of passes or iterations to improve accuracy")
@@ -206,77 +239,195 @@ class LdaMulticore(LdaModel):
         def rho():
             return pow(self.offset + pass_ + (self.num_updates / self.chunksize), -self.decay)
 
+        # the workers read `expElogbeta` from one of two shared memory buffers (each job names
+        # its buffer), so the model is sent to them only once, not pickled into every job.
+        # after an M-step, the new topics are published into the buffer no queued job reads.
+        shared = [SharedArray(self.expElogbeta.shape, self.expElogbeta.dtype) for _ in range(2)]
+        shared[0].array[...] = self.expElogbeta
+        current, stale = [0], [False]
+        outstanding = [0, 0]  # number of unfinished jobs reading from each buffer
+
+        # each worker process takes its own random seed, so that they don't all draw the
+        # same initial gammas from copies of one random state
+        seeds = Queue()
+        for seed in self.random_state.randint(0, 2 ** 31 - 1, size=self.workers):
+            seeds.put(int(seed))
+
         logger.info("training LDA model using %i processes", self.workers)
-        pool = Pool(self.workers, worker_e_step, (job_queue, result_queue,))
-        for pass_ in xrange(self.passes):
-            queue_size, reallen = [0], 0
-            other = LdaState(self.eta, self.state.sstats.shape)
-
-            def process_result_queue(force=False):
-                """
-                Clear the result queue, merging all intermediate results, and update the
-                LDA model if necessary.
-
-                """
-                merged_new = False
-                while not result_queue.empty():
-                    other.merge(result_queue.get())
-                    queue_size[0] -= 1
-                    merged_new = True
-                if (force and merged_new and queue_size[0] == 0) or (not self.batch and (other.numdocs >= updateafter)):
-                    self.do_mstep(rho(), other, pass_ > 0)
-                    other.reset()
-                    if self.eval_every is not None and ((force and queue_size[0] == 0) or (self.eval_every != 0 and (self.num_updates / updateafter) % self.eval_every == 0)):
-                        self.log_perplexity(chunk, total_docs=lencorpus)
-
-            chunk_stream = utils.grouper(corpus, self.chunksize, as_numpy=chunks_as_numpy)
-            for chunk_no, chunk in enumerate(chunk_stream):
-                reallen += len(chunk)  # keep track of how many documents we've processed so far
-
-                # put the chunk into the workers' input job queue
-                chunk_put = False
-                while not chunk_put:
-                    try:
-                        job_queue.put((chunk_no, chunk, self), block=False, timeout=0.1)
-                        chunk_put = True
-                        queue_size[0] += 1
-                        logger.info('PROGRESS: pass %i, dispatched chunk #%i = '
-                            'documents up to #%i/%i, outstanding queue size %i',
-                            pass_, chunk_no, chunk_no * self.chunksize + len(chunk), lencorpus, queue_size[0])
-                    except queue.Full:
-                        # in case the input job queue is full, keep clearing the
-                        # result queue, to make sure we don't deadlock
-                        process_result_queue()
-
-                process_result_queue()
-            #endfor single corpus pass
-
-            # wait for all outstanding jobs to finish
-            while queue_size[0] > 0:
+        pool = Pool(self.workers, worker_e_step, (job_queue, result_queue, self._worker_model(), shared,
+            corpus if read_in_workers else None, seeds))
+        heldout = self._start_passes(corpus, heldout_corpus, self.chunksize)
+        try:
+            for pass_ in xrange(self.passes):
+                pass_start, previous = time.time(), self._pass_topics()
+                queue_size, reallen = [0], [0]
+                other = LdaState(self.eta, self.state.sstats.shape, self.dtype)
+
+                def process_result_queue(force=False, wait=False):
+                    """
+                    Clear the result queue, merging all intermediate results, and update the
+                    LDA model if necessary. If `wait` is set, block until at least one
+                    result arrives.
+
+                    """
+                    while wait or not result_queue.empty():
+                        buffer_no, state = result_queue.get()
+                        if isinstance(state, Exception):
+                            raise state  # the worker failed to read or process its job
+                        other.merge(state)
+                        reallen[0] += state.numdocs
+                        outstanding[buffer_no] -= 1
+                        queue_size[0] -= 1
+                        wait = False
+                    if (force and other.numdocs > 0 and queue_size[0] == 0) or (not self.batch and (other.numdocs >= updateafter)):
+                        self.do_mstep(rho(), other, pass_ > 0)
+                        other.reset()
+                        stale[0] = True
+                        if self.eval_every is not None and ((force and queue_size[0] == 0) or (self.eval_every != 0 and (self.num_updates / updateafter) % self.eval_every == 0)):
+                            if read_in_workers:
+                                # evaluate on the partition dispatched last
+                                self.log_perplexity(
+                                    list(corpus.iter_partition(*chunk)), total_docs=lencorpus, sample_size=self.eval_sample)
+                            else:
+                                self.log_perplexity(chunk, total_docs=lencorpus, sample_size=self.eval_sample)
+
+                def publish_model():
+                    """Make the topics of the last M-step visible to the jobs dispatched from now on."""
+                    if not stale[0]:
+                        return
+                    target = 1 - current[0]
+                    while outstanding[target] > 0:
+                        process_result_queue(wait=True)
+                    shared[target].array[...] = self.expElogbeta
+                    current[0], stale[0] = target, False
+
+                if read_in_workers:
+                    # a job is just a (partno, num_parts) partition of the corpus, read by the worker
+                    chunk_stream = ((partno, num_parts) for partno in xrange(num_parts))
+                else:
+                    chunk_stream = utils.grouper(corpus, self.chunksize, as_numpy=chunks_as_numpy)
+                for chunk_no, chunk in enumerate(chunk_stream):
+                    publish_model()
+
+                    # put the chunk into the workers' input job queue
+                    chunk_put = False
+                    while not chunk_put:
+                        try:
+                            job_queue.put((chunk_no, chunk, current[0]), block=False, timeout=0.1)
+                            chunk_put = True
+                            queue_size[0] += 1
+                            outstanding[current[0]] += 1
+                            if read_in_workers:
+                                logger.info('PROGRESS: pass %i, dispatched partition #%i/%i, outstanding queue size %i',
+                                    pass_, chunk_no, num_parts, queue_size[0])
+                            else:
+                                logger.info('PROGRESS: pass %i, dispatched chunk #%i = '
+                                    'documents up to #%i/%i, outstanding queue size %i',
+                                    pass_, chunk_no, chunk_no * self.chunksize + len(chunk), lencorpus, queue_size[0])
+                        except queue.Full:
+                            # in case the input job queue is full, keep clearing the
+                            # result queue, to make sure we don't deadlock; the workers
+                            # are all busy, so block until one of them finishes a job
+                            process_result_queue(wait=True)
+
+                    process_result_queue()
+                #endfor single corpus pass
+
+                # wait for all outstanding jobs to finish
+                while queue_size[0] > 0:
+                    process_result_queue(force=True, wait=True)
+                # results merged during the pass but not applied yet (the last jobs may have
+                # finished before the wait above) still need their M-step
                 process_result_queue(force=True)
 
-            if reallen != lencorpus:
-                raise RuntimeError("input corpus size changed during training (don't use generators as input)")
-        #endfor entire update
+                if reallen[0] != lencorpus:
+                    raise RuntimeError("input corpus size changed during training (don't use generators as input)")
+
+                if self._end_pass(pass_, self.passes, pass_start, previous, heldout):
+                    break
+            #endfor entire update
+        finally:
+            pool.terminate()
 
-        pool.terminate()
+    def _worker_model(self):
+        """
+        Return a shallow copy of this model for the worker processes, without the
+        (large) topic matrices: the workers only need the priors and inference settings.
+
+        """
+        worker_lda = copy.copy(self)
+        worker_lda.state, worker_lda.expElogbeta = None, None
+        worker_lda.id2word, worker_lda.dispatcher = None, None
+        return worker_lda
 
 
-def worker_e_step(input_queue, result_queue):
+class SharedArray(object):
     """
-    Perform E-step for each (chunk_no, chunk, model) 3-tuple from the
-    input queue, placing the resulting state into the result queue.
+    A numpy array of `shape` and `dtype` in shared memory, which processes forked
+    (or spawned) with this object as an argument see without copying. The array is
+    exposed as `self.array`.
+
+    """
+    def __init__(self, shape, dtype):
+        self.shape, self.dtype = tuple(shape), np.dtype(dtype)
+        self.buffer = RawArray(ctypes.c_char, max(1, int(np.prod(self.shape)) * self.dtype.itemsize))
+        self.array = self._view()
+
+    def _view(self):
+        return np.frombuffer(self.buffer, dtype=self.dtype, count=int(np.prod(self.shape))).reshape(self.shape)
+
+    def __getstate__(self):
+        return {'shape': self.shape, 'dtype': self.dtype, 'buffer': self.buffer}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.array = self._view()
+
+
+def can_partition(corpus):
+    """Can `corpus` read its partitions independently (see `interfaces.CorpusABC.partition`)?"""
+    iter_partition = getattr(type(corpus), 'iter_partition', None)
+    if iter_partition is None:
+        return False
+    return six.get_unbound_function(iter_partition) is not six.get_unbound_function(CorpusABC.iter_partition)
+
+
+def worker_e_step(input_queue, result_queue, worker_lda, shared, corpus=None, seeds=None):
+    """
+    Perform E-step for each (chunk_no, chunk, buffer_no) 3-tuple from the
+    input queue, against the topics in the shared array `shared[buffer_no]`,
+    placing the resulting `(buffer_no, state)` into the result queue.
+
+    If `corpus` is given, each `chunk` is a `(partno, num_parts)` 2-tuple instead
+    of documents, and the worker reads that partition of `corpus` itself. Errors
+    are then sent to the result queue in place of the state.
+
+    If `seeds` is given, the worker takes the seed of its random state from that queue.
 
     """
     logger.debug("worker process entering E-step loop")
+    if seeds is not None:
+        worker_lda.random_state = utils.get_random_state(seeds.get())
+    if corpus is not None and hasattr(corpus, 'close'):
+        corpus.close()  # don't share file handles (positions) inherited from the master process
     while True:
         logger.debug("getting a new job")
-        chunk_no, chunk, worker_lda = input_queue.get()
-        logger.debug("processing chunk #%i of %i documents", chunk_no, len(chunk))
-        worker_lda.state.reset()
-        worker_lda.do_estep(chunk)  # TODO: auto-tune alpha?
+        chunk_no, chunk, buffer_no = input_queue.get()
+        try:
+            if corpus is not None:
+                chunk = list(corpus.iter_partition(*chunk))
+            logger.debug("processing chunk #%i of %i documents", chunk_no, len(chunk))
+            worker_lda.expElogbeta = shared[buffer_no].array
+            # a fresh state for every job: the queue pickles it asynchronously after put()
+            state = LdaState(worker_lda.eta, shared[buffer_no].shape, shared[buffer_no].dtype)
+            worker_lda.do_estep(chunk, state)  # TODO: auto-tune alpha?
+        except Exception as err:
+            if corpus is None:
+                raise
+            logger.exception("failed to process chunk #%i", chunk_no)
+            state = err
         del chunk
         logger.debug("processed chunk, queuing the result")
-        result_queue.put(worker_lda.state)
-        del worker_lda  # free up some memory
+        result_queue.put((buffer_no, state))
+        del state  # free up some memory
         logger.debug("result put")
@@ -246,7 +246,7 @@ class LsiModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
     """
     def __init__(self, corpus=None, num_topics=200, id2word=None, chunksize=20000,
                  decay=1.0, distributed=False, onepass=True,
-                 power_iters=P2_EXTRA_ITERS, extra_samples=P2_EXTRA_DIMS):
+                 power_iters=P2_EXTRA_ITERS, extra_samples=P2_EXTRA_DIMS, dispatcher=None):
         """
         `num_topics` is the number of requested factors (latent dimensions).
 
@@ -267,7 +267,9 @@ class LsiModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         power iterations improves accuracy, but lowers performance. See [3]_ for
         some hard numbers.
 
-        Turn on `distributed` to enable distributed computing.
+        Turn on `distributed` to enable distributed computing. Alternatively, pass a
+        `gensim.models.socket_dispatcher.SocketDispatcher` (with `LsiWorker` workers) as
+        `dispatcher`, to distribute the computation without Pyro.
 
         Example:
 
@@ -283,7 +285,7 @@ class LsiModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         self.num_topics = int(num_topics)
         self.chunksize = int(chunksize)
         self.decay = float(decay)
-        if distributed:
+        if distributed or dispatcher is not None:
             if not onepass:
                 logger.warning("forcing the one-pass algorithm for distributed LSA")
                 onepass = True
@@ -304,7 +306,15 @@ class LsiModel(interfaces.TransformationABC, basemodel.BaseTopicModel):
         self.projection = Projection(self.num_terms, self.num_topics, power_iters=self.power_iters, extra_dims=self.extra_samples)
 
         self.numworkers = 1
-        if not distributed:
+        if dispatcher is not None:
+            dispatcher.initialize(id2word=self.id2word, num_topics=num_topics,
+                                  chunksize=chunksize, decay=decay,
+                                  power_iters=self.power_iters, extra_samples=self.extra_samples,
+                                  distributed=False, onepass=onepass)
+            self.dispatcher = dispatcher
+            self.numworkers = len(dispatcher.getworkers())
+            logger.info("using distributed version with %i workers", self.numworkers)
+        elif not distributed:
             logger.info("using serial LSI version on this node")
             self.dispatcher = None
         else:
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+USAGE: %(program)s --port PORT --authkey KEY
+
+    Worker server for distributed LDA and LSI without Pyro: run this script on every \
+remote machine, then connect to the servers with a `SocketDispatcher`.
+
+Example: python -m gensim.models.socket_dispatcher --port 5000 --authkey secret
+
+Distributed training (see :mod:`gensim.models.lda_dispatcher` and :mod:`gensim.models.lsi_dispatcher`)
+without Pyro4 or a name server. The `SocketDispatcher` either starts its worker processes
+itself, on the local machine:
+
+>>> with SocketDispatcher(LdaWorker, workers=4) as dispatcher:
+...     lda = LdaModel(corpus, id2word=dictionary, num_topics=100, dispatcher=dispatcher)
+
+or connects to worker servers already running (started with this script) by their address:
+
+>>> dispatcher = SocketDispatcher(LsiWorker, addresses=[('node1', 5000), ('node2', 5000)], authkey=b'secret')
+>>> lsi = LsiModel(corpus, id2word=dictionary, num_topics=200, dispatcher=dispatcher)
+>>> dispatcher.close()
+
+The dispatcher talks to each worker over a `multiprocessing.connection` (a socket or pipe,
+authenticated by `authkey`). Large numpy arrays in the messages -- the model states, and the
+jobs as `scipy.sparse` matrices -- are not pickled: they're sent as raw bytes, in frames of
+their own, next to a small pickled message that describes them (see `send_message`).
+
+"""
+
+from __future__ import with_statement
+
+import argparse
+import logging
+import pickle
+import sys
+import threading
+from io import BytesIO
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+import scipy.sparse
+from six.moves import queue, xrange
+
+from gensim.models import ldamodel, lsimodel
+
+logger = logging.getLogger(__name__)
+
+
+# How many jobs (=chunks of N documents) to keep "pre-fetched" in a queue? (same as in the Pyro dispatchers)
+MAX_JOBS_QUEUE = 10
+
+# numpy arrays of at least this many bytes are sent as raw frames; smaller ones are simply pickled
+MIN_FRAME_BYTES = 4096
+
+
+class _FramePickler(pickle.Pickler):
+    """Pickler that leaves out large numpy arrays, collecting them in `arrays` instead."""
+    def __init__(self, file, arrays):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.arrays = arrays
+
+    def persistent_id(self, obj):
+        if type(obj) in (np.ndarray, np.memmap) and obj.dtype != object and obj.nbytes >= MIN_FRAME_BYTES:
+            fortran = obj.flags.f_contiguous and not obj.flags.c_contiguous
+            self.arrays.append(obj.T if fortran else obj)
+            return obj.dtype.str, obj.shape, fortran
+        return None
+
+
+class _FrameUnpickler(pickle.Unpickler):
+    """Unpickler that receives the arrays left out by `_FramePickler` from `conn`, in order."""
+    def __init__(self, file, conn):
+        pickle.Unpickler.__init__(self, file)
+        self.conn = conn
+
+    def persistent_load(self, pid):
+        dtype, shape, fortran = pid
+        result = np.empty(shape, dtype=dtype, order='F' if fortran else 'C')
+        frame = result.T if fortran else result  # C-contiguous either way
+        self.conn.recv_bytes_into(frame.reshape(-1).view(np.uint8))
+        return result
+
+
+def send_message(conn, obj):
+    """
+    Send the (picklable) object `obj` over the `multiprocessing.connection` `conn`:
+    first `obj` pickled without its large numpy arrays, then the raw bytes of each
+    of those arrays.
+    """
+    arrays = []
+    header = BytesIO()
+    _FramePickler(header, arrays).dump(obj)
+    conn.send_bytes(header.getvalue())
+    for array in arrays:
+        # a uint8 view of the C-contiguous data, so the connection sends it without copying
+        conn.send_bytes(np.ascontiguousarray(array).reshape(-1).view(np.uint8))
+
+
+def recv_message(conn):
+    """Receive an object sent by `send_message` from `conn`. The arrays are received into fresh, writable arrays."""
+    return _FrameUnpickler(BytesIO(conn.recv_bytes()), conn).load()
+
+
+class LdaWorker(object):
+    """Worker of distributed `LdaModel` training: runs the E-step on the jobs it receives."""
+    def __init__(self, **model_params):
+        self.model = ldamodel.LdaModel(**model_params)
+
+    @staticmethod
+    def prepare_job(job):
+        """Convert a chunk of documents to a `scipy.sparse` matrix before it's sent to a worker."""
+        indptr, termids, counts = ldamodel.chunk2csr(job)
+        num_terms = termids.max() + 1 if len(termids) else 0
+        return scipy.sparse.csr_matrix((counts, termids, indptr), shape=(len(indptr) - 1, num_terms))
+
+    def processjob(self, job):
+        self.model.do_estep(job)
+
+    def reset(self, state):
+        self.model.state = state
+        self.model.sync_state()
+        self.model.state.reset()
+
+    def getstate(self):
+        result = self.model.state
+        self.model.clear()  # free up mem in-between two EM cycles
+        return result
+
+
+class LsiWorker(object):
+    """Worker of distributed `LsiModel` training: decomposes the jobs it receives, into its own projection."""
+    def __init__(self, **model_params):
+        self.model = lsimodel.LsiModel(**model_params)
+
+    @staticmethod
+    def prepare_job(job):
+        return job  # already a sparse matrix
+
+    def processjob(self, job):
+        self.model.add_documents(job)
+
+    def reset(self):
+        self.model.projection = self.model.projection.empty_like()
+
+    def getstate(self):
+        return self.model.projection
+
+
+def serve_connection(conn):
+    """
+    Serve the requests of one dispatcher, received over the connection `conn`, until
+    it sends `exit` or disconnects.
+    """
+    worker = None
+    while True:
+        try:
+            command, args = recv_message(conn)
+        except EOFError:
+            break
+        try:
+            if command == 'initialize':
+                worker_class, model_params = args
+                worker, result = worker_class(**model_params), None
+            elif command in ('processjob', 'reset', 'getstate'):
+                if worker is None:
+                    raise RuntimeError("worker must be initialized before receiving jobs")
+                result = getattr(worker, command)(*args)
+            elif command == 'exit':
+                send_message(conn, ('ok', None))
+                break
+            else:
+                raise ValueError("unknown command %r" % (command,))
+        except Exception as err:
+            logger.exception("failed to %s", command)
+            send_message(conn, ('error', RuntimeError("worker failed to %s: %r" % (command, err))))
+        else:
+            send_message(conn, ('ok', result))
+    conn.close()
+
+
+def serve(listener):
+    """Serve dispatchers that connect to the `multiprocessing.connection.Listener` `listener`, one at a time."""
+    while True:
+        conn = listener.accept()
+        logger.info("dispatcher connected from %s", listener.last_accepted)
+        serve_connection(conn)
+        logger.info("dispatcher disconnected")
+
+
+class SocketDispatcher(object):
+    """
+    Dispatcher of distributed LDA or LSI training, to worker processes on this machine
+    or to remote worker servers. It can be passed as the `dispatcher` of an `LdaModel`
+    (with `LdaWorker` workers) or an `LsiModel` (with `LsiWorker` workers).
+
+    Unlike the Pyro dispatchers, this one runs in the process of the model, and needs no
+    name server: the workers are either started here or found by their address.
+    """
+    def __init__(self, worker_class, workers=None, addresses=None, authkey=None, maxsize=MAX_JOBS_QUEUE):
+        """
+        `worker_class` is `LdaWorker` or `LsiWorker`.
+
+        Start `workers` worker processes on this machine, or connect to worker servers
+        (see `serve`) at `addresses`, a list of `(host, port)` 2-tuples, authenticating
+        with the `authkey` bytes they were started with.
+
+        At most `maxsize` jobs wait in the queue for a worker; `putjob()` blocks beyond that.
+        """
+        if (workers is None) == (addresses is None):
+            raise ValueError("specify either the number of local `workers` or the `addresses` of worker servers")
+        self.worker_class = worker_class
+        self.maxsize = maxsize
+        self.processes, self.connections = [], []
+        if workers is not None:
+            for _ in xrange(workers):
+                conn, child_conn = Pipe()
+                process = Process(target=serve_connection, args=(child_conn,))
+                process.daemon = True
+                process.start()
+                child_conn.close()
+                self.processes.append(process)
+                self.connections.append(conn)
+            self.names = ["local process %i" % process.pid for process in self.processes]
+        else:
+            for address in addresses:
+                logger.info("connecting to worker at %s", address)
+                self.connections.append(Client(tuple(address), authkey=authkey))
+            self.names = ["%s:%s" % tuple(address) for address in addresses]
+        if not self.connections:
+            raise RuntimeError("no workers to dispatch to")
+        self.locks = [threading.Lock() for _ in self.connections]
+        self.jobs = queue.Queue(maxsize=self.maxsize)
+        self.error = None
+        self.closed = False
+        self.feeders = []
+        for workerid in xrange(len(self.connections)):
+            feeder = threading.Thread(target=self._feed, args=(workerid,))
+            feeder.daemon = True
+            feeder.start()
+            self.feeders.append(feeder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _broadcast(self, command, *args):
+        """Send `command` to all workers at once; return the list of their results."""
+        self._check_open()
+        acquired, sent, results = [], [], []
+        try:
+            try:
+                for lock, conn in zip(self.locks, self.connections):
+                    lock.acquire()
+                    acquired.append(lock)
+                    send_message(conn, (command, args))
+                    sent.append(conn)
+            finally:
+                # even if a send failed, read the replies of the workers reached, so none is left unread
+                for conn in sent:
+                    results.append(recv_message(conn))
+        finally:
+            for lock in acquired:
+                lock.release()
+        for status, result in results:
+            if status == 'error':
+                raise result
+        return [result for _, result in results]
+
+    def _feed(self, workerid):
+        """Send queued jobs to worker `workerid` one by one, as soon as it's done with the previous one."""
+        conn = self.connections[workerid]
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    break
+                with self.locks[workerid]:
+                    send_message(conn, ('processjob', (job,)))
+                    status, result = recv_message(conn)
+                if status == 'error':
+                    self.error = result
+            except Exception as err:
+                self.error = err
+            finally:
+                self.jobs.task_done()
+
+    def _check_open(self):
+        if self.closed:
+            raise RuntimeError("dispatcher is closed; create a new one to continue training")
+
+    def _check_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def initialize(self, **model_params):
+        """Initialize all workers with a model built from `model_params`."""
+        logger.info("initializing %i workers", len(self.connections))
+        self._broadcast('initialize', self.worker_class, model_params)
+
+    def getworkers(self):
+        """Return the descriptions (process ids or addresses) of all workers."""
+        return list(self.names)
+
+    def putjob(self, job):
+        """Queue `job` for the next free worker; blocks while `maxsize` jobs are queued already."""
+        self._check_open()
+        self._check_error()
+        self.jobs.put(self.worker_class.prepare_job(job))
+
+    def getstate(self):
+        """Wait for all queued jobs to finish, then merge the states from across all workers and return the result."""
+        self._check_open()
+        logger.info("end of input, waiting for all remaining jobs")
+        self.jobs.join()
+        self._check_error()
+        logger.info("merging states from %i workers", len(self.connections))
+        states = self._broadcast('getstate')
+        result = states[0]
+        for state in states[1:]:
+            result.merge(state)
+        return result
+
+    def reset(self, *args):
+        """Reset all workers for a new EM iteration (LDA, from the model state in `args`) or decomposition (LSI)."""
+        self._check_open()
+        self.jobs.join()
+        self._broadcast('reset', *args)
+
+    def close(self):
+        """Stop all workers (or disconnect from the worker servers). The dispatcher can't be used afterwards."""
+        if self.closed:
+            return
+        self.closed = True
+        for _ in self.feeders:
+            self.jobs.put(None)
+        for feeder in self.feeders:
+            feeder.join()
+        self.feeders = []
+        for conn in self.connections:
+            try:
+                send_message(conn, ('exit', ()))
+                recv_message(conn)
+            except (EOFError, IOError):
+                pass  # already gone
+            conn.close()
+        for process in self.processes:
+            process.join()
+        self.connections, self.processes = [], []
+# endclass SocketDispatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--host", help="Interface to listen on (default: %(default)s)", default='0.0.0.0')
+    parser.add_argument("--port", help="Port to listen on", type=int, required=True)
+    parser.add_argument("--authkey", help="Key the dispatcher must authenticate with", required=True)
+    parser.add_argument('-v', '--verbose', help='Verbose flag', action='store_const', dest="loglevel",
+                        const=logging.INFO, default=logging.WARNING)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=args.loglevel)
+    logger.info("running %s", " ".join(sys.argv))
+
+    listener = Listener((args.host, args.port), authkey=args.authkey.encode('utf8'))
+    serve(listener)
+
+
+if __name__ == '__main__':
+    main()
@@ -1553,6 +1553,36 @@ class LineSentence(object):
                         yield line[i:i + self.max_sentence_length]
                         i += self.max_sentence_length
 
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate through the lines of the `partno`-th of `num_partitions` disjoint
+        parts of the source (byte ranges of an uncompressed file, see
+        `utils.iter_lines_partition`).
+        """
+        for line in utils.iter_lines_partition(self.source, partno, num_partitions, self.limit):
+            line = utils.to_unicode(line).split()
+            i = 0
+            while i < len(line):
+                yield line[i:i + self.max_sentence_length]
+                i += self.max_sentence_length
+
+    def partition(self, partno, num_partitions):
+        """
+        Return the `partno`-th of `num_partitions` disjoint parts of the sentences,
+        as an iterable that reads only its own part of the source.
+
+        Example::
+
+            parts = LineSentence('myfile.txt').split(4)
+            # send the parts to 4 worker processes, each reads its own sentences
+
+        """
+        return utils.CorpusPartition(self, partno, num_partitions)
+
+    def split(self, num_partitions):
+        """Return the list of all `num_partitions` disjoint parts of the sentences, see `partition`."""
+        return [self.partition(partno, num_partitions) for partno in xrange(num_partitions)]
+
 
 class PathLineSentences(object):
     """
@@ -1603,6 +1633,51 @@ class PathLineSentences(object):
                         yield line[i:i + self.max_sentence_length]
                         i += self.max_sentence_length
 
+    def iter_partition(self, partno, num_partitions):
+        """
+        Iterate through the lines of the `partno`-th of `num_partitions` disjoint
+        parts of the input files.
+
+        If all files are uncompressed and no `limit` is set, the files are treated as
+        one concatenated byte range, split into equally sized parts (a part may end in
+        the middle of one file and continue with the next one). Otherwise each part
+        reads a contiguous range of whole files.
+        """
+        for line in self._iter_partition_lines(partno, num_partitions):
+            line = utils.to_unicode(line).split()
+            i = 0
+            while i < len(line):
+                yield line[i:i + self.max_sentence_length]
+                i += self.max_sentence_length
+
+    def _iter_partition_lines(self, partno, num_partitions):
+        if self.limit is None and all(utils.is_plain_file(file_name) for file_name in self.input_files):
+            sizes = [os.path.getsize(file_name) for file_name in self.input_files]
+            start, end = utils.partition_range(sum(sizes), partno, num_partitions)
+            offset = 0
+            for file_name, size in zip(self.input_files, sizes):
+                if offset < end and start < offset + size:
+                    for line in utils.iter_lines_range(file_name, max(0, start - offset), end - offset):
+                        yield line
+                offset += size
+        else:
+            start, end = utils.partition_range(len(self.input_files), partno, num_partitions)
+            for file_name in self.input_files[start:end]:
+                with utils.smart_open(file_name) as fin:
+                    for line in itertools.islice(fin, self.limit):
+                        yield line
+
+    def partition(self, partno, num_partitions):
+        """
+        Return the `partno`-th of `num_partitions` disjoint parts of the sentences,
+        as an iterable that reads only its own part of the input files.
+        """
+        return utils.CorpusPartition(self, partno, num_partitions)
+
+    def split(self, num_partitions):
+        """Return the list of all `num_partitions` disjoint parts of the sentences, see `partition`."""
+        return [self.partition(partno, num_partitions) for partno in xrange(num_partitions)]
+
 
 # Example: ./word2vec.py -train data.txt -output vec.txt -size 200 -window 5 -sample 1e-4 -negative 5 -hs 0 -binary 0 -cbow 1 -iter 3
 if __name__ == "__main__":
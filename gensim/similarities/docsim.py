@@ -47,6 +47,12 @@ uses the faster, batch queries internally and **is ideal for all-vs-all pairwise
 >>> for similarities in index: # yield similarities of the 1st indexed document, then 2nd...
 >>>     ...
 
+A sharded index can also be stored into a single, relocatable file, which is
+mmap'ed back in one go (fast even for indexes with hundreds of shards):
+
+>>> index.save_packed('/tmp/tst.packed')
+>>> index = Similarity.load_packed('/tmp/tst.packed')
+
 """
 
 
@@ -54,6 +60,8 @@ import logging
 import itertools
 import os
 import heapq
+import json
+import struct
 
 import numpy
 import scipy.sparse
@@ -131,6 +139,107 @@ class Shard(utils.SaveLoad):
         return index[query]
 
 
+class PackedShard(Shard):
+    """
+    A shard stored inside a single-file packed index (see `Similarity.save_packed`).
+
+    Unlike `Shard`, nothing is written to disk on construction: the shard only
+    remembers its position within the packed file, and its (Sparse)MatrixSimilarity
+    is mmap'ed straight out of that file on request.
+
+    """
+    def __init__(self, fname, shard_no, length, cls, num_nnz, index=None):
+        self.dirname, self.fname = os.path.split(fname)
+        self.shard_no = shard_no
+        self.length = length
+        self.cls = cls
+        self.num_nnz = num_nnz
+        if index is not None:
+            self.index = index
+
+    def __str__(self):
+        return ("%s PackedShard(#%i, %i documents in %s)" %
+                (self.cls.__name__, self.shard_no, len(self), self.fullname()))
+
+    def get_index(self):
+        if not hasattr(self, 'index'):
+            logger.debug("mmaping packed shard #%i from %s", self.shard_no, self.fullname())
+            header, buf = _open_packed(self.fullname(), mmap='r')
+            self.index = _packed_shard_index(header['shards'][self.shard_no], buf)
+        return self.index
+
+
+# layout of a packed index file: fixed-size preamble, followed by the raw shard
+# arrays (each aligned to PACKED_ALIGN bytes), followed by a JSON header that
+# describes the index and records the offset/dtype/shape of every array
+PACKED_MAGIC = b'GSIMPACK'
+PACKED_VERSION = 1
+PACKED_ALIGN = 64
+PACKED_PREAMBLE = struct.Struct('<8sIIQQ')  # magic, version, flags, header offset, header length
+
+
+def _packed_pad(fout):
+    """Pad the (binary, seekable) file `fout` with zeros up to the next PACKED_ALIGN boundary."""
+    pos = fout.tell()
+    if pos % PACKED_ALIGN:
+        fout.write(b'\0' * (PACKED_ALIGN - pos % PACKED_ALIGN))
+    return fout.tell()
+
+
+def _packed_write_array(fout, arr):
+    """Append numpy array `arr` to `fout`, returning its description for the packed header."""
+    offset = _packed_pad(fout)
+    arr = numpy.ascontiguousarray(arr)
+    arr.tofile(fout)
+    return {'offset': offset, 'dtype': arr.dtype.str, 'shape': list(arr.shape)}
+
+
+def _packed_read_array(buf, desc):
+    """Return a view into the packed file buffer `buf`, described by `desc` (no copying)."""
+    dtype = numpy.dtype(desc['dtype'])
+    size = int(numpy.prod(desc['shape'])) * dtype.itemsize
+    start = desc['offset']
+    return buf[start: start + size].view(dtype).reshape(desc['shape'])
+
+
+def _open_packed(fname, mmap='r'):
+    """
+    Open the packed index `fname`, returning its header (dict) and the whole file
+    as a flat uint8 array: mmap'ed if `mmap` is set, loaded into RAM otherwise.
+    """
+    with open(fname, 'rb') as fin:
+        magic, version, _, header_offset, header_len = PACKED_PREAMBLE.unpack(fin.read(PACKED_PREAMBLE.size))
+        if magic != PACKED_MAGIC:
+            raise ValueError("%s is not a packed similarity index" % fname)
+        if version > PACKED_VERSION:
+            raise ValueError("unsupported packed index version %i in %s" % (version, fname))
+        fin.seek(header_offset)
+        header = json.loads(fin.read(header_len).decode('utf8'))
+    if mmap is None:
+        buf = numpy.fromfile(fname, dtype=numpy.uint8)
+    else:
+        buf = numpy.memmap(fname, dtype=numpy.uint8, mode=mmap)
+    return header, buf
+
+
+def _packed_shard_index(desc, buf):
+    """Reconstruct the (Sparse)MatrixSimilarity of a single shard from its header entry `desc`."""
+    arrays = dict((name, _packed_read_array(buf, array_desc)) for name, array_desc in desc['arrays'].items())
+    if desc['kind'] == 'sparse':
+        index = SparseMatrixSimilarity(
+            None, num_best=desc['num_best'], chunksize=desc['chunksize'],
+            maintain_sparsity=desc['maintain_sparsity'])
+        index.index = scipy.sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(desc['shape']), copy=False)
+    else:
+        index = MatrixSimilarity(
+            None, num_best=desc['num_best'], num_features=desc['shape'][1],
+            chunksize=desc['chunksize'], corpus_len=desc['shape'][0])
+        index.index = arrays['index']
+    index.normalize = desc['normalize']
+    return index
+
+
 def query_shard(args):
     query, shard = args  # simulate starmap (not part of multiprocessing in older Pythons)
     logger.debug("querying shard %s num_best=%s in process %s", shard, shard.num_best, os.getpid())
@@ -446,6 +555,91 @@ class Similarity(interfaces.SimilarityABC):
             fname = self.output_prefix
         super(Similarity, self).save(fname, *args, **kwargs)
 
+    def save_packed(self, fname=None):
+        """
+        Store the entire index (all shards) into a single, self-describing file
+        `fname` (default: `output_prefix + '.packed'`), see `load_packed`.
+
+        The file contains a small header, a table of shard offsets and the raw
+        dense (or CSR) shard arrays laid out contiguously, so that the whole index
+        can be mmap'ed back from one file, without unpickling individual shards.
+        The file contains no absolute paths and can be freely copied or moved.
+
+        Calls `close_shard` internally to spill any unfinished shards first.
+
+        """
+        self.close_shard()
+        if fname is None:
+            fname = self.output_prefix + '.packed'
+        logger.info("saving packed %s to %s", self, fname)
+
+        shard_descs = []
+        with open(fname, 'wb') as fout:
+            fout.write(PACKED_PREAMBLE.pack(PACKED_MAGIC, PACKED_VERSION, 0, 0, 0))
+            for shard in self.shards:
+                index = shard.get_index()
+                desc = {
+                    'num_docs': len(shard),
+                    'num_nnz': int(shard.num_nnz),
+                    'num_best': index.num_best,
+                    'chunksize': index.chunksize,
+                    'normalize': index.normalize,
+                    'shape': list(index.index.shape),
+                }
+                if isinstance(index, SparseMatrixSimilarity):
+                    matrix = index.index.tocsr()
+                    desc['kind'] = 'sparse'
+                    desc['maintain_sparsity'] = index.maintain_sparsity
+                    desc['arrays'] = {
+                        'data': _packed_write_array(fout, matrix.data),
+                        'indices': _packed_write_array(fout, matrix.indices),
+                        'indptr': _packed_write_array(fout, matrix.indptr),
+                    }
+                else:
+                    desc['kind'] = 'dense'
+                    desc['arrays'] = {'index': _packed_write_array(fout, index.index)}
+                shard_descs.append(desc)
+
+            header = {
+                'num_features': self.num_features,
+                'num_best': self.num_best,
+                'norm': self.norm,
+                'chunksize': self.chunksize,
+                'shardsize': self.shardsize,
+                'shards': shard_descs,
+            }
+            header = json.dumps(header).encode('utf8')
+            header_offset = _packed_pad(fout)
+            fout.write(header)
+            fout.seek(0)
+            fout.write(PACKED_PREAMBLE.pack(PACKED_MAGIC, PACKED_VERSION, 0, header_offset, len(header)))
+
+    @classmethod
+    def load_packed(cls, fname, mmap='r'):
+        """
+        Load an index previously stored with `save_packed`.
+
+        With `mmap='r'` (default), all shards are memory-mapped from the single
+        file `fname`, so opening even a very large index is instant. Use
+        `mmap=None` to read the whole index into RAM instead.
+
+        The returned index uses `fname` as its `output_prefix`: if you add new
+        documents, their shards are stored as regular `fname.N` shard files.
+
+        """
+        logger.info("loading packed %s object from %s", cls.__name__, fname)
+        header, buf = _open_packed(fname, mmap=mmap)
+        result = cls(
+            fname, None, num_features=header['num_features'], num_best=header['num_best'],
+            chunksize=header['chunksize'], shardsize=header['shardsize'], norm=header['norm'])
+        for shard_no, desc in enumerate(header['shards']):
+            index = _packed_shard_index(desc, buf)
+            shard = PackedShard(fname, shard_no, desc['num_docs'], index.__class__, desc['num_nnz'], index=index)
+            shard.num_best = result.num_best
+            result.shards.append(shard)
+        logger.info("loaded %s", result)
+        return result
+
     def destroy(self):
         """
         Delete all files under self.output_prefix. Object is not usable after calling
@@ -669,9 +863,13 @@ class SparseMatrixSimilarity(interfaces.SimilarityABC):
                 num_terms, num_docs, num_nnz = corpus.num_terms, corpus.num_docs, corpus.num_nnz
                 logger.debug("using efficient sparse index creation")
             except AttributeError:
-                # no MmCorpus, use the slower version (or maybe user supplied the
+                stats = getattr(corpus, 'stats', None)
+                if stats is not None and stats.get('num_nnz') is not None:
+                    # the shape is known from the statistics saved along with an indexed corpus
+                    num_terms, num_docs, num_nnz = stats['num_terms'], stats['num_docs'], stats['num_nnz']
+                    logger.debug("using efficient sparse index creation, from saved corpus statistics")
+                # otherwise no MmCorpus, use the slower version (or maybe user supplied the
                 # num_* params in constructor)
-                pass
             if num_features is not None:
                 # num_terms is just an alias for num_features, for compatibility with MatrixSimilarity
                 num_terms = num_features
@@ -208,6 +208,7 @@ class TestAuthorTopicModel(unittest.TestCase, basetests.TestBaseTopicModel):
 
         # Delete the MmCorpus used for serialization inside the author-topic model.
         remove(datapath('testcorpus_serialization.mm'))
+        remove(datapath('testcorpus_serialization.mm.stats'))
 
     def testTransformSerialized(self):
         # Same as testTransform, using serialized corpora.
@@ -233,6 +234,7 @@ class TestAuthorTopicModel(unittest.TestCase, basetests.TestBaseTopicModel):
 
             # Delete the MmCorpus used for serialization inside the author-topic model.
             remove(datapath('testcorpus_serialization.mm'))
+            remove(datapath('testcorpus_serialization.mm.stats'))
             if passed:
                 break
             logging.warning("Author-topic model failed to converge on attempt %i (got %s, expected %s)" %
@@ -11,16 +11,20 @@ Automated tests for checking corpus I/O formats (the corpora package).
 from __future__ import unicode_literals
 
 import codecs
+import gzip
 import itertools
 import logging
 import os.path
+import pickle
 import tempfile
 import unittest
+from functools import partial
 
 import numpy as np
 
 from gensim.corpora import (bleicorpus, mmcorpus, lowcorpus, svmlightcorpus,
-                            ucicorpus, malletcorpus, textcorpus, indexedcorpus)
+                            ucicorpus, malletcorpus, textcorpus, indexedcorpus, csrcorpus)
+from gensim import matutils, utils
 from gensim.interfaces import TransformedCorpus
 from gensim.utils import to_unicode
 
@@ -62,12 +66,18 @@ class CorpusTestCase(unittest.TestCase):
     def tearDown(self):
         # remove all temporary test files
         fname = testfile()
-        extensions = ['', '', '.bz2', '.gz', '.index', '.vocab']
+        extensions = ['', '', '.bz2', '.gz', '.bgz', '.index', '.vocab', '.stats']
         for ext in itertools.permutations(extensions, 2):
             try:
                 os.remove(fname + ext[0] + ext[1])
             except OSError:
                 pass
+        # statistics saved by a counting pass over the test data
+        if self.file_extension is not None:
+            try:
+                os.remove(datapath('testcorpus.' + self.file_extension.lstrip('.') + '.stats'))
+            except OSError:
+                pass
 
     def test_load(self):
         fname = datapath('testcorpus.' + self.file_extension.lstrip('.'))
@@ -91,6 +101,8 @@ class CorpusTestCase(unittest.TestCase):
             corpus.index = None
 
         self.assertEqual(len(corpus), 9)
+        # counting the documents doesn't write anything next to the input corpus
+        self.assertFalse(os.path.exists(utils.smart_extension(fname, utils.CORPUS_STATS_EXT)))
 
     def test_empty_input(self):
         with open(testfile(), 'w') as f:
@@ -151,6 +163,44 @@ class CorpusTestCase(unittest.TestCase):
             for i in range(len(corpus)):
                 self.assertEqual(corpus[i], corpus2[i])
 
+    def test_serialize_block_compressed(self):
+        if not issubclass(self.corpus_class, indexedcorpus.IndexedCorpus):
+            return
+        corpus = self.TEST_CORPUS
+        fname = testfile() + '.bgz'
+        self.corpus_class.serialize(fname, corpus)
+
+        # the result is a valid gzip file, too
+        with gzip.open(fname) as fin:
+            self.assertTrue(len(fin.read()) > 0)
+
+        corpus2 = self.corpus_class(fname)
+        self.assertEqual(corpus, list(corpus2))
+        for i in range(len(corpus)):
+            self.assertEqual(corpus[i], corpus2[i])
+        self.assertEqual([corpus[i] for i in [3, 0, 2]], list(corpus2[[3, 0, 2]]))
+
+    def test_stats(self):
+        self.corpus_class.serialize(testfile(), self.TEST_CORPUS)
+        corpus = self.corpus_class(testfile())
+        stats = utils.load_corpus_stats(testfile())
+        self.assertEqual((stats['num_docs'], stats['num_nnz']), (4, 3))
+        self.assertTrue(stats['num_terms'] >= 3)
+        self.assertEqual(corpus.stats, stats)
+
+        # the length comes from the statistics, without a pass over the corpus
+        corpus.index = None
+        corpus.__class__ = type('NoIterCorpus', (self.corpus_class,), {'__iter__': None})
+        self.assertEqual(len(corpus), 4)
+
+    def test_partition(self):
+        self.corpus_class.serialize(testfile(), self.TEST_CORPUS)
+        corpus = self.corpus_class(testfile())
+        for num_partitions in (1, 2, 3, 6):
+            parts = corpus.split(num_partitions)
+            self.assertEqual(len(parts), num_partitions)
+            self.assertEqual([doc for part in parts for doc in part], self.TEST_CORPUS)
+
     def test_switch_id2word(self):
         fname = datapath('testcorpus.' + self.file_extension.lstrip('.'))
         corpus = self.corpus_class(fname)
@@ -168,6 +218,33 @@ class CorpusTestCase(unittest.TestCase):
             testdoc2 = set((to_unicode(corpus.id2word[x]), y) for x, y in firstdoc2)
             self.assertEqual(testdoc2, {('computer', 1), ('human', 1), ('interface', 1)})
 
+    def test_batch_indexing(self):
+        fname = datapath('testcorpus.' + self.file_extension.lstrip('.'))
+        corpus = self.corpus_class(fname)
+        if not isinstance(corpus, indexedcorpus.IndexedCorpus):
+            return
+        docs = list(corpus)
+
+        # unsorted, with duplicates; results must come back in the requested order
+        idx = [5, 1, 5, 8, 0, 2]
+        expected = [docs[i] for i in idx]
+        self.assertEqual(corpus.docbyoffsets(corpus.index[idx]), expected)
+        self.assertEqual(list(corpus[idx]), expected)
+        self.assertEqual(list(corpus[np.asarray(idx)]), expected)
+
+        corpus.batchsize = 2
+        self.assertEqual(list(corpus[idx]), expected)
+        self.assertEqual(list(corpus[::-1]), docs[::-1])
+
+        # file handles are reused between lookups, but never pickled
+        if hasattr(corpus, '_docbyoffset'):
+            self.assertEqual(len(corpus._handles), 1)
+        corpus.save(testfile())
+        corpus2 = self.corpus_class.load(testfile())
+        self.assertEqual(list(corpus2[idx]), expected)
+        corpus.close()
+        self.assertEqual(corpus[idx[0]], expected[0])
+
     def test_indexing(self):
         fname = datapath('testcorpus.' + self.file_extension.lstrip('.'))
         corpus = self.corpus_class(fname)
@@ -238,6 +315,100 @@ class TestMmCorpus(CorpusTestCase):
         self.assertEqual(self.corpus.num_nnz, 28)
         self.assertEqual(tuple(self.corpus.index), (97, 121, 169, 201, 225, 249, 258, 276, 303))
 
+    def test_block_parsing(self):
+        expected = list(self.corpus)
+        self.assertEqual(expected[0], [(0, 1.0), (1, 1.0), (2, 1.0)])
+
+        # documents split across many tiny read blocks must come out the same
+        corpus = self.corpus_class(datapath('testcorpus.mm'))
+        corpus.blocksize = corpus.docbyoffset_blocksize = 7
+        self.assertEqual(list(corpus), expected)
+        self.assertEqual([corpus[i] for i in range(len(corpus))], expected)
+
+        # pure numpy parser, in case the compiled one is not available
+        parse_mm_block, matutils.parse_mm_block = matutils.parse_mm_block, None
+        try:
+            self.assertEqual(list(corpus), expected)
+        finally:
+            matutils.parse_mm_block = parse_mm_block
+
+    def test_malformed_input(self):
+        with open(testfile(), 'w') as f:
+            f.write('%%MatrixMarket matrix coordinate real general\n2 3 3\n1 1 1.0\n1 2\n2 3 2.0\n')
+        corpus = self.corpus_class(testfile())
+        self.assertRaises(ValueError, list, corpus)
+
+    def test_partition_byte_ranges(self):
+        # long documents spanning several parts, gaps of empty documents, empty documents at the end
+        rnd = np.random.RandomState(0)
+        corpus = [[(termid, 1.0) for termid in range(rnd.randint(50))] if docno % 5 else [] for docno in range(40)]
+        corpus += [[(termid, 2.0) for termid in range(500)], [], []]
+        self.corpus_class.serialize(testfile(), corpus)
+        mm = self.corpus_class(testfile())
+        mm.index = None  # partitioning must not rely on the index
+        for num_partitions in (1, 2, 5, 13, 100):
+            parts = mm.split(num_partitions)
+            self.assertEqual([doc for part in parts for doc in part], corpus)
+            # parts read only their own byte range, even from tiny blocks
+            mm.blocksize = mm.docbyoffset_blocksize = 7
+            self.assertEqual([doc for part in parts for doc in part], corpus)
+            mm.blocksize, mm.docbyoffset_blocksize = self.corpus_class.blocksize, self.corpus_class.docbyoffset_blocksize
+
+        # parts are picklable, to be read in other processes
+        part = pickle.loads(pickle.dumps(mm.partition(1, 3)))
+        self.assertEqual(list(part), list(mm.partition(1, 3)))
+
+        # compressed input can't be seeked: the parts are ranges of document ids instead
+        with open(testfile(), 'rb') as fin, gzip.GzipFile(testfile() + '.gz', 'wb') as fout:
+            fout.write(fin.read())
+        mm = self.corpus_class(testfile() + '.gz')
+        self.assertEqual([len(list(part)) for part in mm.split(3)], [14, 14, 15])
+        self.assertEqual([doc for part in mm.split(3) for doc in part], corpus)
+
+
+class TestCsrCorpus(CorpusTestCase):
+    def setUp(self):
+        self.corpus_class = csrcorpus.CsrCorpus
+        self.file_extension = '.csr'
+
+    def test_serialize_compressed(self):
+        # CsrCorpus is meant to be mmap'ed => doesn't support compressed output
+        pass
+
+    def test_serialize_block_compressed(self):
+        pass
+
+    def test_stats(self):
+        # CsrCorpus keeps its shape and number of non-zeros in the file header
+        self.corpus_class.serialize(testfile(), self.TEST_CORPUS)
+        corpus = self.corpus_class(testfile())
+        self.assertEqual((corpus.num_docs, corpus.num_nnz), (4, 3))
+
+    def test_iter_chunks(self):
+        corpus = self.corpus_class(datapath('testcorpus.csr'))
+        docs = list(mmcorpus.MmCorpus(datapath('testcorpus.mm')))
+        self.assertEqual(list(corpus), docs)
+
+        chunks = list(corpus.iter_chunks(chunksize=4))
+        self.assertEqual([chunk.shape for chunk in chunks], [(4, 12), (4, 12), (1, 12)])
+        for chunk in chunks:
+            # chunks are views into the mmap'ed file, not copies
+            self.assertTrue(np.may_share_memory(chunk.data, corpus.data))
+            self.assertTrue(np.may_share_memory(chunk.indices, corpus.indices))
+        dense = np.vstack([chunk.toarray() for chunk in chunks])
+        self.assertTrue(np.allclose(dense, matutils.corpus2dense(docs, 12).T))
+        self.assertEqual(corpus.get_chunk(7, 100).shape, (2, 12))
+
+    def test_dtype_and_pickle(self):
+        corpus = self.TEST_CORPUS
+        self.corpus_class.save_corpus(testfile(), corpus, dtype=np.float32)
+        corpus2 = self.corpus_class(testfile(), mmap=None)
+        self.assertEqual(corpus2.data.dtype, np.float32)
+        self.assertEqual(corpus, list(corpus2))
+        corpus2.save(testfile() + '.pkl')
+        self.assertEqual(corpus, list(self.corpus_class.load(testfile() + '.pkl')))
+        os.remove(testfile() + '.pkl')
+
 
 class TestSvmLightCorpus(CorpusTestCase):
     def setUp(self):
@@ -386,6 +557,76 @@ class TestTextCorpus(CorpusTestCase):
         self.assertEqual(sample2[0], ["document0"])
         self.assertEqual(sample2[1], ["document1"])
 
+    def test_parallel_preprocessing(self):
+        lines = ["Document number %d, with some words in it" % i for i in range(100)]
+        fpath = self.corpus_from_lines(lines).input
+        serial = self.corpus_class(fpath, metadata=True)
+        parallel = self.corpus_class(fpath, metadata=True, processes=2)
+        parallel.chunksize = 7
+        self.assertEqual(list(serial.get_texts()), list(parallel.get_texts()))
+        self.assertEqual(serial.dictionary.token2id, parallel.dictionary.token2id)
+        self.assertEqual(len(parallel), 100)
+
+    def test_texts_cache(self):
+        lines = ["Document number %d, with some words in it" % i for i in range(100)]
+        fpath = self.corpus_from_lines(lines).input
+        cache_fname = testfile()
+        expected = list(self.corpus_class(fpath, metadata=True).get_texts())
+
+        corpus = self.corpus_class(fpath, metadata=True, texts_cache=cache_fname)
+        self.assertEqual(expected, list(corpus.get_texts()))  # builds the cache
+        corpus.getstream = None  # the input is not needed any more
+        self.assertEqual(expected, list(corpus.get_texts()))
+        self.assertEqual(len(corpus), 100)
+
+        # changed preprocessing invalidates the cache
+        corpus = self.corpus_class(fpath, metadata=True, texts_cache=cache_fname, token_filters=[])
+        texts = list(corpus.get_texts())
+        self.assertEqual(expected[0][1], texts[0][1])
+        self.assertIn('in', texts[0][0])
+
+        # so does changed input
+        corpus.token_filters = textcorpus.TextCorpus(fpath).token_filters
+        list(corpus.get_texts())
+        with open(fpath, 'a') as fout:
+            fout.write('\nadditional tokens')
+        texts = list(corpus.get_texts())
+        self.assertEqual(expected, texts[:-1])
+        self.assertEqual(['additional', 'tokens'], texts[-1][0])
+        os.remove(cache_fname)
+        os.remove(cache_fname + '.header')
+
+        # the arguments of partials are part of the key; lambdas aren't cached at all
+        short = partial(textcorpus.remove_short, minsize=3)
+        corpus = self.corpus_class(fpath, texts_cache=cache_fname, token_filters=[short])
+        key = corpus.texts_cache_key()
+        corpus.token_filters = [partial(textcorpus.remove_short, minsize=4)]
+        self.assertNotEqual(key, corpus.texts_cache_key())
+        corpus.token_filters = [lambda tokens: tokens]
+        self.assertEqual(None, corpus.texts_cache_key())
+        os.remove(cache_fname + '.header')
+        os.remove(cache_fname)
+        self.assertTrue(list(corpus.get_texts()))
+        self.assertFalse(os.path.exists(cache_fname + '.header'))
+        self.assertEqual(None, corpus.cached_length())
+
+    def test_function_key(self):
+        def tokenize(text):
+            return text.split()
+
+        def tokenize_lower(text):
+            return text.lower().split()
+
+        # a changed function body changes the key, even under the same name
+        tokenize_lower.__name__ = tokenize.__name__
+        if hasattr(tokenize, '__qualname__'):
+            tokenize_lower.__qualname__ = tokenize.__qualname__ = 'tokenize'
+        self.assertNotEqual(textcorpus.function_key(tokenize), textcorpus.function_key(tokenize_lower))
+        self.assertEqual(
+            textcorpus.function_key(textcorpus.remove_short), textcorpus.function_key(textcorpus.remove_short))
+        x = 3
+        self.assertEqual(None, textcorpus.function_key(lambda tokens: tokens[:x]))
+
     def test_sample_text_seed(self):
         lines = ["document%d" % i for i in range(10)]
         corpus = self.corpus_from_lines(lines)
@@ -400,6 +641,41 @@ class TestTextCorpus(CorpusTestCase):
     def test_serialize(self):
         pass
 
+    def test_stats(self):
+        # text corpora get their length from a valid texts cache
+        fname = datapath('testcorpus.' + self.file_extension.lstrip('.'))
+        corpus = self.corpus_class(fname, texts_cache=testfile())
+        self.assertEqual(corpus.cached_length(), 9)
+        self.assertEqual(self.corpus_class(fname, dictionary=corpus.dictionary, texts_cache=testfile()).cached_length(), 9)
+        self.assertEqual(self.corpus_class(fname, dictionary=corpus.dictionary).cached_length(), None)
+        os.remove(testfile() + '.header')
+
+    def test_partition(self):
+        fname = datapath('testcorpus.' + self.file_extension.lstrip('.'))
+        corpus = self.corpus_class(fname)
+        expected = list(corpus)
+        for num_partitions in (1, 2, 4, 20):
+            self.assertEqual([doc for part in corpus.split(num_partitions) for doc in part], expected)
+
+    def test_partition_custom_stream(self):
+        class UpperCorpus(self.corpus_class):
+            def getstream(self):
+                for line in super(UpperCorpus, self).getstream():
+                    yield line.upper()
+
+        corpus = UpperCorpus(datapath('testcorpus.' + self.file_extension.lstrip('.')))
+        # the input file alone doesn't give the documents of the overridden stream
+        self.assertRaises(NotImplementedError, list, corpus.partition(0, 2))
+
+        class SplitCorpus(self.corpus_class):
+            def get_texts(self):
+                for line in self.getstream():
+                    yield to_unicode(line).split()
+
+        corpus = SplitCorpus(datapath('testcorpus.' + self.file_extension.lstrip('.')))
+        # nor do the preprocessed lines give the documents of overridden texts
+        self.assertRaises(NotImplementedError, list, corpus.partition(0, 2))
+
     def test_serialize_compressed(self):
         pass
 
@@ -471,6 +747,19 @@ class TestTextDirectoryCorpus(unittest.TestCase):
         filenames = list(corpus.iter_filepaths())
         self.assertEqual(expected, filenames)
 
+    def test_parallel_preprocessing(self):
+        dirpath = self.write_one_level(*['doc%d' % i for i in range(10)])
+        serial = textcorpus.TextDirectoryCorpus(dirpath)
+        parallel = textcorpus.TextDirectoryCorpus(dirpath, processes=2)
+        self.assertEqual(list(serial), list(parallel))
+
+    def test_partition(self):
+        dirpath, next_level = self.write_two_levels()
+        corpus = textcorpus.TextDirectoryCorpus(dirpath)
+        parts = corpus.split(3)
+        self.assertEqual([len(list(part)) for part in parts], [1, 1, 2])
+        self.assertEqual([doc for part in parts for doc in part], list(corpus))
+
     def test_lines_are_documents(self):
         dirpath = tempfile.mkdtemp()
         lines = ['doc%d text' % i for i in range(5)]
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+Unit tests for the `corpora.CompactDictionary` class.
+"""
+
+
+import logging
+import tempfile
+import unittest
+import os
+
+import numpy
+
+from gensim.corpora import Dictionary, CompactDictionary
+
+
+def get_tmpfile(suffix):
+    return os.path.join(tempfile.gettempdir(), suffix)
+
+
+class TestCompactDictionary(unittest.TestCase):
+    def setUp(self):
+        self.texts = [
+                ['human', 'interface', 'computer'],
+                ['survey', 'user', 'computer', 'system', 'response', 'time'],
+                ['eps', 'user', 'interface', 'system'],
+                ['system', 'human', 'system', 'eps'],
+                ['user', 'response', 'time'],
+                ['trees'],
+                ['graph', 'trees'],
+                ['graph', 'minors', 'trees'],
+                ['graph', 'minors', 'survey'],
+                [u'žluťoučký', 'kůň']]
+        self.dictionary = Dictionary(self.texts)
+
+    def assertSameDictionary(self, d1, d2):
+        self.assertEqual(dict(d1.token2id), dict(d2.token2id))
+        self.assertEqual(d1.dfs, d2.dfs)
+        self.assertEqual((d1.num_docs, d1.num_pos, d1.num_nnz), (d2.num_docs, d2.num_pos, d2.num_nnz))
+
+    def testConversion(self):
+        d = CompactDictionary(self.dictionary)
+        self.assertEqual(len(self.dictionary), len(d))
+        self.assertSameDictionary(self.dictionary, d)
+        self.assertSameDictionary(self.dictionary, d.to_dictionary())
+        for tokenid in self.dictionary:
+            self.assertEqual(self.dictionary[tokenid], d[tokenid])
+        self.assertEqual(self.dictionary.token2id['kůň'], d.token2id[u'kůň'])
+        self.assertEqual(self.dictionary.token2id['kůň'], d.token2id[u'kůň'.encode('utf8')])
+        self.assertNotIn('unknown', d.token2id)
+        self.assertRaises(KeyError, lambda: d[len(d)])
+        self.assertRaises(KeyError, lambda: d['a'])
+        for key in ('a', u'a', b'a', None):
+            self.assertEqual(key in self.dictionary, key in d)
+        self.assertIn(numpy.int64(0), d)
+        self.assertEqual(0, len(CompactDictionary()))
+
+    def testDoc2bow(self):
+        d = CompactDictionary(self.dictionary)
+        texts = self.texts + [['human', 'unknown', 'human'], []]
+        for text in texts:
+            self.assertEqual(self.dictionary.doc2bow(text), d.doc2bow(text))
+        self.assertEqual(([], {'unknown': 1}), d.doc2bow(['unknown'], return_missing=True))
+        self.assertEqual(self.dictionary.doc2bow_batch(texts, return_csr=False), d.doc2bow_batch(texts, return_csr=False))
+        self.assertEqual(0, (self.dictionary.doc2bow_batch(texts) != d.doc2bow_batch(texts)).nnz)
+        self.assertRaises(TypeError, d.doc2bow, "human")
+        self.assertRaises(ValueError, d.doc2bow, ["human"], allow_update=True)
+
+    def testFilter(self):
+        d = CompactDictionary(self.dictionary)
+        d.filter_extremes(no_below=2, no_above=1.0, keep_n=4)
+        self.assertEqual(4, len(d))
+        self.assertEqual([0, 1, 2, 3], sorted(d.keys()))
+        expected = Dictionary(self.texts)
+        expected.filter_extremes(no_below=2, no_above=1.0, keep_n=4)
+        self.assertEqual(set(expected.token2id), set(d.token2id))
+        self.assertEqual(sorted(expected.dfs.values()), sorted(d.dfs.values()))
+
+        d = CompactDictionary(self.dictionary)
+        d.filter_tokens(bad_ids=[self.dictionary.token2id['human']])
+        self.assertNotIn('human', d.token2id)
+        self.assertEqual(list(range(len(self.dictionary) - 1)), sorted(d.keys()))
+        for token, tokenid in d.token2id.items():
+            self.assertEqual(token, d[tokenid])
+
+        max_df = max(d.dfs.values())
+        num_max = sum(df == max_df for df in d.dfs.values())
+        d.filter_n_most_frequent(1)
+        self.assertEqual(len(self.dictionary) - 2, len(d))
+        self.assertEqual(num_max - 1, sum(df == max_df for df in d.dfs.values()))
+
+    def testSaveLoad(self):
+        fname = get_tmpfile('gensim_compactdictionary.tst')
+        d = CompactDictionary(self.dictionary)
+        d.save(fname)
+        try:
+            for mmap in (None, 'r'):
+                loaded = CompactDictionary.load(fname, mmap=mmap)
+                self.assertSameDictionary(d, loaded)
+                loaded.filter_extremes(no_below=2, no_above=1.0, keep_n=None)
+                self.assertEqual(len(loaded), sum(1 for df in self.dictionary.dfs.values() if df >= 2))
+        finally:
+            for name in os.listdir(tempfile.gettempdir()):
+                if name.startswith('gensim_compactdictionary.tst'):
+                    os.remove(os.path.join(tempfile.gettempdir(), name))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    unittest.main()
@@ -10,6 +10,7 @@ Unit tests for the `corpora.Dictionary` class.
 
 from collections import Mapping
 import logging
+import random
 import tempfile
 import unittest
 import codecs
@@ -180,6 +181,52 @@ class TestDictionary(unittest.TestCase):
         # unicode must be converted to utf8
         self.assertEqual(d.doc2bow([u'\u017elu\u0165ou\u010dk\xfd']), [(0, 1)])
 
+    def test_doc2bow_batch(self):
+        d = Dictionary(self.texts[:5])
+        texts = self.texts + [[], ['human', b'human', 'unknown']]
+        expected = [d.doc2bow(text) for text in texts]
+        self.assertEqual(expected, d.doc2bow_batch(texts, return_csr=False))
+
+        csr = d.doc2bow_batch(texts)
+        self.assertEqual((len(texts), len(d)), csr.shape)
+        self.assertEqual(expected, [list(zip(row.indices, row.data)) for row in csr])
+        self.assertRaises(TypeError, d.doc2bow_batch, ["human interface"])
+
+        # updating in bulk gives the same dictionary as updating document by document
+        d2 = Dictionary(self.texts[:5])
+        for text in texts:
+            d.doc2bow(text, allow_update=True)
+        d2.doc2bow_batch(texts, allow_update=True)
+        self.assertEqual(d.token2id, d2.token2id)
+        self.assertEqual(d.dfs, d2.dfs)
+        self.assertEqual((d.num_docs, d.num_pos, d.num_nnz), (d2.num_docs, d2.num_pos, d2.num_nnz))
+
+    def test_doc2bow_batch_gapped_ids(self):
+        d = Dictionary()
+        d.token2id = {'a': 0, 'b': 5}
+        texts = [['b'], [], ['a']]
+        self.assertEqual([[(5, 1)], [], [(0, 1)]], d.doc2bow_batch(texts, return_csr=False))
+        self.assertEqual((3, 6), d.doc2bow_batch(texts).shape)
+        self.assertEqual((1, 0), Dictionary().doc2bow_batch([['a']]).shape)
+
+    def test_parallel_build(self):
+        rnd = random.Random(42)
+        words = ['word%i' % i for i in range(3000)]
+        texts = [[rnd.choice(words[:rnd.randint(1, 3000)]) for _ in range(5)] for _ in range(25000)]
+        for prune_at in (None, 1000):
+            expected = Dictionary(texts, prune_at=prune_at)
+            d = Dictionary(texts, prune_at=prune_at, processes=2)
+            self.assertEqual(expected.token2id, d.token2id)
+            self.assertEqual(expected.dfs, d.dfs)
+            self.assertEqual((expected.num_docs, expected.num_pos, expected.num_nnz), (d.num_docs, d.num_pos, d.num_nnz))
+
+        # merging partial dictionaries of consecutive shards = one dictionary over all of them
+        d = Dictionary(self.texts[:4])
+        d.merge_partial(Dictionary(self.texts[4:]))
+        expected = Dictionary(self.texts)
+        self.assertEqual(expected.token2id, d.token2id)
+        self.assertEqual(expected.dfs, d.dfs)
+
     def test_saveAsText(self):
         """`Dictionary` can be saved as textfile. """
         tmpf = get_tmpfile('save_dict_test.txt')
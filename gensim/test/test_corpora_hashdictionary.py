@@ -14,7 +14,7 @@ import unittest
 import os
 import zlib
 
-from gensim.corpora.hashdictionary import HashDictionary
+from gensim.corpora.hashdictionary import HashDictionary, adler32_batch
 
 
 # sample data files are located in the same folder
@@ -122,6 +122,42 @@ class TestHashDictionary(unittest.TestCase):
         self.assertEqual(d.token2id, token2id)
 
 
+    def test_doc2bow_batch(self):
+        texts = self.texts + [[], ['human', 'human']]
+        d = HashDictionary(debug=True)
+        expected = [d.doc2bow(text) for text in texts]
+
+        d2 = HashDictionary(debug=True)
+        self.assertEqual(expected, d2.doc2bow_batch(texts, return_csr=False))
+        csr = d2.doc2bow_batch(texts)
+        self.assertEqual((len(texts), d2.id_range), csr.shape)
+        self.assertEqual(expected, [list(zip(row.indices, row.data)) for row in csr])
+
+        d.doc2bow_batch(texts)
+        self.assertEqual(d.dfs, d2.dfs)
+        self.assertEqual(d.dfs_debug, d2.dfs_debug)
+        self.assertEqual(d.token2id, d2.token2id)
+        self.assertEqual((d.num_docs, d.num_pos, d.num_nnz), (d2.num_docs, d2.num_pos, d2.num_nnz))
+
+    def test_adler32_batch(self):
+        tokens = [b'', b'a', b'human', u'žluťoučký kůň'.encode('utf8'), b'\xff' * 100000]
+        expected = [zlib.adler32(token) & 0xffffffff for token in tokens]
+        self.assertEqual(expected, adler32_batch(tokens).tolist())
+
+    def test_production_mode(self):
+        texts = self.texts + [[u'žluťoučký', 'kůň'], []]
+        expected = HashDictionary(debug=True)
+        expected_bows = [expected.doc2bow(text) for text in texts]
+
+        d = HashDictionary(debug=False)
+        self.assertEqual(expected_bows, d.doc2bow_batch(texts, return_csr=False))
+        self.assertEqual(({}, {}, {}, {}), (d.token2id, d.id2token, d.dfs, d.dfs_debug))
+        self.assertEqual((expected.num_docs, expected.num_pos, expected.num_nnz), (d.num_docs, d.num_pos, d.num_nnz))
+
+        # a custom hash function is applied token by token
+        d = HashDictionary(myhash=lambda token: len(token), debug=False)
+        self.assertEqual([[(3, 1), (5, 2)]], d.doc2bow_batch([['abc', 'human', 'human']], return_csr=False))
+
     def testBuild(self):
         d = HashDictionary(self.texts, myhash=zlib.adler32)
         expected =  {5232: 2,
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+Automated tests for the Gibbs-sampled LDA model.
+"""
+
+
+import logging
+import unittest
+import os
+import tempfile
+
+import numpy as np
+
+from gensim.models import ldagibbs, ldamodel
+from gensim.test import basetests
+from gensim.test.test_ldamodel import corpus, dictionary
+
+
+def testfile():
+    # temporary data will be stored to this file
+    return os.path.join(tempfile.gettempdir(), 'gensim_models_ldagibbs.tst')
+
+
+def block_corpus(num_topics=4, words_per_topic=10, num_docs=300, seed=0):
+    # documents of a main and a minor topic (out of `num_topics`, with disjoint vocabularies)
+    rs = np.random.RandomState(seed)
+    blocks = np.arange(num_topics * words_per_topic).reshape(num_topics, words_per_topic)
+    docs = []
+    for _ in range(num_docs):
+        main, minor = rs.choice(num_topics, 2, replace=False)
+        words = np.concatenate([rs.choice(blocks[main], 25), rs.choice(blocks[minor], 5)])
+        ids, counts = np.unique(words, return_counts=True)
+        docs.append(list(zip(ids.tolist(), counts.astype(float).tolist())))
+    return docs, blocks
+
+
+@unittest.skipIf(ldagibbs.sample is None, "compiled Gibbs sampler not available")
+class TestLdaGibbs(unittest.TestCase, basetests.TestBaseTopicModel):
+    def setUp(self):
+        self.model = ldagibbs.LdaGibbs(corpus, id2word=dictionary, num_topics=2, iterations=50, random_state=0)
+
+    def testCounts(self):
+        num_tokens = sum(cnt for doc in corpus for _, cnt in doc)
+        self.assertEqual(self.model.nk.sum(), num_tokens)
+        self.assertTrue(np.array_equal(self.model.nwk.sum(axis=1), [
+            sum(cnt for doc in corpus for termid, cnt in doc if termid == id) for id in range(len(dictionary))]))
+
+    def testRecoverTopics(self):
+        docs, blocks = block_corpus()
+        id2word = dict((id, str(id)) for id in range(blocks.size))
+        for workers in (1, 2):
+            model = ldagibbs.LdaGibbs(
+                docs, id2word=id2word, num_topics=len(blocks), alpha=0.1, iterations=100,
+                workers=workers, random_state=1)
+            # every topic puts most of its weight on a single block of words
+            topics = model.get_topics()
+            self.assertTrue(np.allclose(topics.sum(axis=1), 1.0))
+            purity = [topic[blocks].sum(axis=1).max() for topic in topics]
+            self.assertTrue(min(purity) > 0.8, purity)
+
+    def testToLdaModel(self):
+        lda = self.model.to_ldamodel()
+        self.assertTrue(isinstance(lda, ldamodel.LdaModel))
+        self.assertTrue(np.allclose(lda.state.sstats, self.model.nwk.T))
+        self.assertEqual(lda.expElogbeta.shape, (2, len(dictionary)))
+        self.assertEqual(len(lda.get_document_topics(corpus[0], minimum_probability=0)), 2)
+
+    def testPersistence(self):
+        fname = testfile()
+        self.model.save(fname)
+        model2 = ldagibbs.LdaGibbs.load(fname)
+        self.assertTrue(np.array_equal(self.model.nwk, model2.nwk))
+        self.assertEqual(self.model.show_topic(0), model2.show_topic(0))
+        os.remove(fname)
+
+    def testBadTermId(self):
+        self.assertRaises(IndexError, ldagibbs.LdaGibbs, [[(len(dictionary), 1.0)]], id2word=dictionary)
+#endclass TestLdaGibbs
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.DEBUG)
+    unittest.main()
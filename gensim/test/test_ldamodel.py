@@ -469,6 +469,128 @@ class TestLdaModel(unittest.TestCase, basetests.TestBaseTopicModel):
         # test loading the large model arrays with mmap
         self.assertRaises(IOError, self.class_.load, fname, mmap='r')
 
+    def testCompiledInference(self):
+        if ldamodel.e_step is None:
+            self.skipTest("compiled E-step not available")
+        chunk = list(self.corpus) + [[], [(0, 3.0), (11, 1.0)]]
+
+        def inference(chunk, e_step):
+            e_step, ldamodel.e_step = ldamodel.e_step, e_step
+            try:
+                self.model.random_state = np.random.RandomState(42)
+                return self.model.inference(chunk, collect_sstats=True)
+            finally:
+                ldamodel.e_step = e_step
+
+        gamma, sstats = inference(chunk, ldamodel.e_step)
+        expected_gamma, expected_sstats = inference(chunk, None)
+        self.assertTrue(np.allclose(gamma, expected_gamma, rtol=1e-10))
+        self.assertTrue(np.allclose(sstats, expected_sstats, rtol=1e-10))
+
+        # a scipy.sparse chunk gives the same result
+        csr = matutils.corpus2csc(chunk, num_terms=len(dictionary)).T.tocsr()
+        gamma_csr, sstats_csr = inference(csr, ldamodel.e_step)
+        self.assertTrue(np.allclose(gamma_csr, gamma) and np.allclose(sstats_csr, sstats))
+        self.assertRaises(IndexError, self.model.inference, [[(len(dictionary), 1.0)]])
+
+    def testBatchInference(self):
+        inferencer = ldamodel.LdaInference(self.model)
+        theta = inferencer.infer(corpus)
+        self.assertEqual(theta.shape, (len(corpus), self.model.num_topics))
+        self.assertTrue(np.allclose(theta.sum(axis=1), 1.0))
+        # deterministic, and close to the (randomly initialized) topics of single documents
+        self.assertTrue(np.array_equal(theta, inferencer.infer(corpus)))
+        expected = [[prob for _, prob in self.model.get_document_topics(doc, minimum_probability=0)] for doc in corpus]
+        self.assertTrue(np.allclose(theta, expected, atol=1e-2))
+
+        # the same result from a scipy.sparse matrix, into a reused buffer, and over threads
+        csr = matutils.corpus2csc(corpus, num_terms=len(dictionary)).T.tocsr()
+        out = np.zeros_like(theta)
+        self.assertTrue(inferencer.infer(csr, out=out) is out)
+        self.assertTrue(np.allclose(out, theta))
+        threaded = ldamodel.LdaInference(self.model, threads=2)
+        self.assertTrue(np.allclose(threaded.infer(corpus), theta))
+        threaded.close()
+        self.assertRaises(ValueError, inferencer.infer, corpus, out=np.zeros((1, 1)))
+
+        # the topics are a snapshot, with or without the compiled E-step, until refresh()
+        self.model.expElogbeta = np.ones_like(self.model.expElogbeta)
+        e_step, ldamodel.e_step = ldamodel.e_step, None
+        try:
+            self.assertTrue(np.allclose(inferencer.infer(corpus), theta))
+        finally:
+            ldamodel.e_step = e_step
+        self.assertTrue(np.allclose(inferencer.infer(corpus), theta))
+        inferencer.refresh()
+        self.assertFalse(np.allclose(inferencer.infer(corpus), theta))
+
+    def testBound(self):
+        gamma, _ = self.model.inference(corpus)
+        Elogbeta = matutils.dirichlet_expectation(self.model.state.get_lambda())
+        # the likelihood part of the documents' bound, computed word by word
+        expected = []
+        for d, doc in enumerate(corpus):
+            Elogthetad = matutils.dirichlet_expectation(gamma[d])
+            expected.append(sum(cnt * np.log(np.sum(np.exp(Elogthetad + Elogbeta[:, id]))) for id, cnt in doc))
+        alphapart = self.model.doc_bounds(corpus, gamma) - expected
+        self.assertTrue(np.allclose(alphapart, self.model.doc_bounds([[]] * len(corpus), gamma)))
+        self.assertAlmostEqual(
+            self.model.bound(corpus, gamma), np.sum(expected) + np.sum(alphapart) + self.model.topic_bound())
+
+        # estimates from the whole corpus are exact, from samples they come with an interval
+        perwordbound, lower, upper = self.model.per_word_bound(corpus)
+        corpus_words = sum(cnt for doc in corpus for _, cnt in doc)
+        self.assertTrue(lower == perwordbound == upper)
+        self.assertAlmostEqual(perwordbound, self.model.bound(corpus) / corpus_words, places=2)
+        perwordbound, lower, upper = self.model.per_word_bound(corpus, total_docs=100, sample_size=5)
+        self.assertTrue(lower < perwordbound < upper)
+        self.assertAlmostEqual(self.model.log_perplexity(corpus), self.model.per_word_bound(corpus)[0], places=5)
+
+    def testEarlyStopping(self):
+        model = self.class_(corpus, id2word=dictionary, num_topics=2, passes=3, random_state=0)
+        self.assertEqual([metrics['pass'] for metrics in model.pass_metrics], [0, 1, 2])
+        self.assertFalse('perplexity' in model.pass_metrics[0])
+        self.assertFalse('diff' in model.pass_metrics[0])  # only tracked for stop_metric='diff'
+        self.assertEqual(model.stop_reason, "completed all 3 passes")
+
+        model = self.class_(
+            corpus, id2word=dictionary, num_topics=2, passes=100, random_state=0, stop_metric='diff', stop_threshold=0.01)
+        self.assertTrue(1 < len(model.pass_metrics) < 100)
+        self.assertTrue(model.pass_metrics[-1]['diff'] < 0.01 <= model.pass_metrics[-2]['diff'])
+        self.assertTrue(model.stop_reason.startswith("converged after %i of 100 passes" % len(model.pass_metrics)))
+        # with a small prior, expElogbeta underflows to zero for some words; the diff stays finite
+        model = self.class_(
+            corpus, id2word=dictionary, num_topics=2, passes=100, random_state=0, eta=0.001,
+            stop_metric='diff', stop_threshold=0.01)
+        self.assertTrue(np.all(np.isfinite([metrics['diff'] for metrics in model.pass_metrics])))
+        self.assertTrue(model.stop_reason.startswith("converged after"))
+
+        model = self.class_(
+            corpus, id2word=dictionary, num_topics=2, passes=100, random_state=0,
+            stop_metric='perplexity', heldout_corpus=corpus[:3])
+        self.assertTrue(1 < len(model.pass_metrics) < 100)
+        bounds = [metrics['per_word_bound'] for metrics in model.pass_metrics]
+        self.assertTrue((bounds[-1] - bounds[-2]) / abs(bounds[-2]) < 0.001)
+        self.assertAlmostEqual(model.pass_metrics[-1]['perplexity'], np.exp2(-bounds[-1]))
+
+        self.assertRaises(ValueError, self.class_, id2word=dictionary, num_topics=2, stop_metric='likelihood')
+
+    def testFloat32(self):
+        model64 = self.class_(corpus, id2word=dictionary, num_topics=2, passes=10, random_state=0)
+        model32 = self.class_(corpus, id2word=dictionary, num_topics=2, passes=10, random_state=0, dtype=np.float32)
+        self.assertEqual(model32.expElogbeta.dtype, np.float32)
+        self.assertEqual(model32.state.sstats.dtype, np.float32)
+        self.assertTrue(np.allclose(model32.expElogbeta, model64.expElogbeta, atol=1e-4))
+        self.assertAlmostEqual(model32.bound(corpus), model64.bound(corpus), places=2)
+
+        fname = testfile()
+        model32.save(fname)
+        model2 = self.class_.load(fname)
+        self.assertEqual(model2.dtype, np.float32)
+        self.assertEqual(model2.state.sstats.dtype, np.float32)
+        self.assertTrue(np.allclose(model2.expElogbeta, model32.expElogbeta))
+        self.assertRaises(ValueError, self.class_, corpus, id2word=dictionary, num_topics=2, dtype=np.int32)
+
     def testRandomStateBackwardCompatibility(self):
         # load a model saved using a pre-0.13.2 version of Gensim
         pre_0_13_2_fname = datapath('pre_0_13_2_model')
@@ -506,6 +628,29 @@ class TestLdaMulticore(TestLdaModel):
     def testAlphaAuto(self):
         self.assertRaises(RuntimeError, self.class_, alpha='auto')
 
+    def testSharedTopics(self):
+        # workers read the topics from shared memory; a single batch pass must match LdaModel,
+        # up to the initial gammas (the workers draw them from random states of their own)
+        kwargs = dict(id2word=dictionary, num_topics=3, passes=1, chunksize=4, eval_every=None, random_state=1)
+        model = self.class_(corpus, batch=True, workers=1, **kwargs)
+        expected = ldamodel.LdaModel(corpus, update_every=0, **kwargs)
+        self.assertTrue(np.allclose(model.expElogbeta, expected.expElogbeta, atol=0.05))
+        # with the same seeds, the workers reproduce the same topics
+        expected = self.class_(corpus, batch=True, workers=1, **kwargs)
+        self.assertTrue(np.allclose(model.expElogbeta, expected.expElogbeta))
+
+        # workers reading their own partitions of the corpus see the same documents
+        model = self.class_(self.corpus, batch=True, workers=1, read_in_workers=True, **kwargs)
+        expected_mm = self.class_(self.corpus, batch=True, workers=1, **kwargs)
+        self.assertTrue(np.allclose(model.expElogbeta, expected_mm.expElogbeta))
+        # plain lists can't be partitioned, so the master reads them as usual
+        model = self.class_(corpus, batch=True, workers=1, read_in_workers=True, **kwargs)
+        self.assertTrue(np.allclose(model.expElogbeta, expected.expElogbeta))
+
+        shared = ldamulticore.SharedArray((2, 3), np.float32)
+        self.assertEqual((shared.array.shape, shared.array.dtype), ((2, 3), np.float32))
+        self.assertTrue(np.all(shared.array == 0))
+
 
 #endclass TestLdaMulticore
 
@@ -255,6 +255,46 @@ class TestShardedCorpus(unittest.TestCase):
             fname = dataset._shard_name(n)
             self.assertTrue(os.path.isfile(fname))
 
+    def test_shard_cache(self):
+
+        dataset = ShardedCorpus(self.tmp_fname, self.data, shardsize=100,
+                                dim=self.dim, cache_shards=3)
+        offsets = list(xrange(len(dataset)))
+        random.shuffle(offsets)
+        batch = dataset[offsets[:50]]
+        self.assertEqual((50, self.dim), batch.shape)
+        for i, offset in enumerate(offsets[:50]):
+            self.assertTrue(np.array_equal(dataset[offset], batch[i]))
+        self.assertTrue(len(dataset._shard_cache()) <= 3)
+
+        # crossing shard boundaries back and forth doesn't reload the shards
+        dataset[150], dataset[250], dataset[350]
+        shard = dataset.current_shard
+        dataset[150], dataset[250], dataset[350]
+        self.assertIs(shard, dataset.current_shard)
+
+        self.assertRaises(ValueError, lambda: dataset[[0, len(dataset)]])
+
+    def test_prefetch(self):
+
+        dataset = ShardedCorpus(self.tmp_fname, self.data, shardsize=100,
+                                dim=self.dim, prefetch=2)
+        expected = ShardedCorpus(self.tmp_fname, self.data, shardsize=100,
+                                 dim=self.dim)
+        for i, (doc, expected_doc) in enumerate(zip(dataset, expected)):
+            self.assertTrue(np.array_equal(doc, expected_doc))
+            if i == 0:
+                self.assertEqual(set([1, 2]), set(dataset._prefetched))
+        self.assertEqual(len(expected), i + 1)
+
+        # prefetching state doesn't get saved
+        dataset.save()
+        loaded = ShardedCorpus.load(self.tmp_fname)
+        self.assertEqual(2, loaded.prefetch)
+        self.assertTrue(np.array_equal(loaded[555], expected[555]))
+        dataset.close()
+        loaded.close()
+
 ##############################################################################
 
 if __name__ == '__main__':
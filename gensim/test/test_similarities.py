@@ -465,6 +465,32 @@ class TestSimilarity(unittest.TestCase, _TestSimilarityABC):
         # to be mmaped!
 
 
+    def testPacked(self):
+        """test storing and mmaping the whole index from a single packed file"""
+        dense = [matutils.unitvec(matutils.sparse2full(doc, len(dictionary))) for doc in corpus]
+        for docs in [corpus, dense]:
+            index = self.cls(None, docs, num_features=len(dictionary), shardsize=3)
+            fname = testfile() + '.packed'
+            index.save_packed(fname)
+
+            # move the packed file elsewhere, the index must not depend on its original location
+            moved = os.path.join(tempfile.mkdtemp(), 'moved.packed')
+            os.rename(fname, moved)
+            for mmap in ['r', None]:
+                index2 = self.cls.load_packed(moved, mmap=mmap)
+                self.assertEqual(len(index2.shards), 3)
+                self.assertEqual(len(index2), len(index))
+                self.assertTrue(numpy.allclose(index[corpus], index2[corpus]))
+                self.assertEqual(str(index.vector_by_id(5)), str(index2.vector_by_id(5)))
+
+            # a packed index survives a regular pickle round-trip, too
+            index2.save(moved + '.pkl')
+            index3 = self.cls.load(moved + '.pkl')
+            self.assertTrue(numpy.allclose(index[corpus[0]], index3[corpus[0]]))
+            index.destroy()
+            os.remove(moved + '.pkl')
+            os.remove(moved)
+
     def testChunksize(self):
         index = self.cls(None, corpus, num_features=len(dictionary), shardsize=5)
         expected = [sim for sim in index]
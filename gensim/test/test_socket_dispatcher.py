@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Licensed under the GNU LGPL v2.1 - http://www.gnu.org/licenses/lgpl.html
+
+"""
+Automated tests for distributed LDA and LSI over the socket dispatcher.
+"""
+
+
+import logging
+import unittest
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Listener
+
+import numpy as np
+import scipy.sparse
+
+from gensim.models import ldamodel, lsimodel
+from gensim.models.socket_dispatcher import (
+    LdaWorker, LsiWorker, SocketDispatcher, recv_message, send_message, serve)
+from gensim.test.test_ldamodel import corpus, dictionary
+
+
+class TestFraming(unittest.TestCase):
+    def roundtrip(self, obj):
+        sender, receiver = Pipe()
+        try:
+            send_message(sender, obj)
+            return recv_message(receiver)
+        finally:
+            sender.close()
+            receiver.close()
+
+    def testArrays(self):
+        rs = np.random.RandomState(0)
+        small, large = rs.rand(3), rs.rand(40, 50)
+        fortran, floats = np.asfortranarray(rs.rand(60, 30)), rs.rand(100, 20).astype(np.float32)
+        result = self.roundtrip({'small': small, 'large': [large, large.T], 'fortran': fortran, 'floats': floats})
+        self.assertTrue(np.array_equal(result['small'], small))
+        self.assertTrue(np.array_equal(result['large'][0], large))
+        self.assertTrue(np.array_equal(result['large'][1], large.T))
+        self.assertTrue(np.array_equal(result['fortran'], fortran))
+        self.assertTrue(result['fortran'].flags.f_contiguous)
+        self.assertEqual(result['floats'].dtype, np.float32)
+        self.assertTrue(np.array_equal(result['floats'], floats))
+
+    def testModelState(self):
+        state = ldamodel.LdaState(0.1, (10, 1000))
+        state.sstats[...] = np.random.RandomState(0).rand(10, 1000)
+        state.numdocs = 42
+        job = scipy.sparse.random(1000, 200, density=0.05, format='csc', random_state=0)
+        result_state, result_job = self.roundtrip((state, job))
+        self.assertEqual(result_state.numdocs, 42)
+        self.assertTrue(np.array_equal(result_state.sstats, state.sstats))
+        self.assertEqual((result_job != job).nnz, 0)
+
+
+class TestSocketDispatcher(unittest.TestCase):
+    def testLda(self):
+        num_tokens = sum(cnt for doc in corpus for _, cnt in doc)
+        with SocketDispatcher(LdaWorker, workers=2, maxsize=2) as dispatcher:
+            model = ldamodel.LdaModel(
+                corpus, id2word=dictionary, num_topics=2, chunksize=3, update_every=0, passes=1,
+                random_state=0, dispatcher=dispatcher)
+            self.assertEqual(model.numworkers, 2)
+            # one batch M-step from the merged E-steps of all chunks
+            self.assertAlmostEqual(model.state.sstats.sum(), num_tokens, places=5)
+            # further updates go through the same workers
+            model.update(corpus)
+            self.assertEqual(model.state.numdocs, 2 * len(corpus))
+        self.assertEqual(model.state.get_lambda().shape, (2, len(dictionary)))
+        # the model keeps the closed dispatcher: further training fails instead of hanging
+        self.assertRaises(RuntimeError, model.update, corpus)
+        for method, args in [(dispatcher.putjob, (corpus,)), (dispatcher.getstate, ()), (dispatcher.reset, ())]:
+            self.assertRaises(RuntimeError, method, *args)
+        dispatcher.close()  # closing twice is fine
+
+    def testLsi(self):
+        serial = lsimodel.LsiModel(corpus, id2word=dictionary, num_topics=2)
+        with SocketDispatcher(LsiWorker, workers=2) as dispatcher:
+            model = lsimodel.LsiModel(corpus, id2word=dictionary, num_topics=2, chunksize=3, dispatcher=dispatcher)
+        self.assertEqual(model.docs_processed, len(corpus))
+        # merging the workers' truncated decompositions only approximates the serial one
+        self.assertTrue(np.allclose(model.projection.s, serial.projection.s, rtol=0.05))
+        self.assertEqual(model.projection.u.shape, (len(dictionary), 2))
+
+    def testRemoteWorkers(self):
+        listeners = [Listener(('localhost', 0), authkey=b'test') for _ in range(2)]
+        servers = [Process(target=serve, args=(listener,)) for listener in listeners]
+        for server in servers:
+            server.daemon = True
+            server.start()
+        try:
+            addresses = [listener.address for listener in listeners]
+            serial = lsimodel.LsiModel(corpus, id2word=dictionary, num_topics=2)
+            with SocketDispatcher(LsiWorker, addresses=addresses, authkey=b'test') as dispatcher:
+                self.assertEqual(dispatcher.getworkers(), ["%s:%s" % address for address in addresses])
+                model = lsimodel.LsiModel(corpus, id2word=dictionary, num_topics=2, chunksize=3, dispatcher=dispatcher)
+            self.assertTrue(np.allclose(model.projection.s, serial.projection.s, rtol=0.05))
+        finally:
+            for server in servers:
+                server.terminate()
+                server.join()
+            for listener in listeners:
+                listener.close()
+
+    def testErrors(self):
+        self.assertRaises(ValueError, SocketDispatcher, LdaWorker)
+        self.assertRaises(ValueError, SocketDispatcher, LdaWorker, workers=1, addresses=[('localhost', 1)])
+        with SocketDispatcher(LdaWorker, workers=1) as dispatcher:
+            # jobs before initialization fail in the worker; the error surfaces in the dispatcher
+            dispatcher.putjob(corpus)
+            self.assertRaises(RuntimeError, dispatcher.getstate)
+            # the dispatcher stays usable
+            model = ldamodel.LdaModel(corpus, id2word=dictionary, num_topics=2, dispatcher=dispatcher)
+            self.assertEqual(model.state.numdocs, len(corpus))
+
+        with SocketDispatcher(LsiWorker, workers=2) as dispatcher:
+            # a worker that's gone fails every broadcast, instead of blocking the later ones
+            dispatcher.processes[1].terminate()
+            dispatcher.processes[1].join()
+            for _ in range(2):
+                self.assertRaises((EOFError, IOError), dispatcher.reset)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.DEBUG)
+    unittest.main()
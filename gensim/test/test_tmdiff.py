@@ -7,6 +7,7 @@
 import unittest
 import numpy as np
 
+from gensim import matutils
 from gensim.corpora import Dictionary
 from gensim.models import LdaModel
 
@@ -51,6 +52,30 @@ class TestLdaDiff(unittest.TestCase):
             if dist_name == "jaccard":
                 self.assertTrue(np.allclose(mdiff, np.zeros(mdiff.shape, dtype=mdiff.dtype)))
 
+    def testDistances(self):
+        other = LdaModel(corpus=self.corpus, id2word=self.dictionary, num_topics=self.num_topics + 2, passes=10)
+        d1, d2 = self.model.state.get_lambda(), other.state.get_lambda()
+        topics1 = [{word for word, _ in self.model.show_topic(i, topn=5)} for i in range(self.num_topics)]
+        topics2 = [{word for word, _ in other.show_topic(i, topn=5)} for i in range(self.num_topics + 2)]
+        pairwise = {
+            "kullback_leibler": [[matutils.kullback_leibler(p, q) for q in d2] for p in d1],
+            "hellinger": [[matutils.hellinger(p, q) for q in d2] for p in d1],
+            "jaccard": [[matutils.jaccard_distance(p, q) for q in topics2] for p in topics1],
+        }
+        for dist_name, expected in pairwise.items():
+            mdiff, annotation = self.model.diff(other, distance=dist_name, num_words=5, normed=False)
+            self.assertTrue(np.allclose(mdiff, expected))
+            self.assertEqual(len(annotation), self.num_topics)
+            for i, row in enumerate(annotation):
+                self.assertEqual(len(row), self.num_topics + 2)
+                for j, (int_tokens, diff_tokens) in enumerate(row):
+                    self.assertEqual(set(int_tokens), topics1[i] & topics2[j])
+                    self.assertEqual(set(diff_tokens), topics1[i] ^ topics2[j])
+
+        mdiff, annotation = self.model.diff(other, n_ann_terms=2, annotate=False)
+        self.assertEqual(mdiff.shape, (self.num_topics, self.num_topics + 2))
+        self.assertTrue(annotation is None)
+
     def testInput(self):
         self.assertRaises(ValueError, self.model.diff, self.model, n_ann_terms=self.n_ann_terms, distance='something')
         self.assertRaises(ValueError, self.model.diff, [], n_ann_terms=self.n_ann_terms, distance='something')
@@ -8,7 +8,10 @@ Automated tests for checking various utils functions.
 """
 
 
+import gzip
 import logging
+import os
+import tempfile
 import unittest
 
 from gensim import utils
@@ -180,6 +183,97 @@ class TestWindowing(unittest.TestCase):
         self.assertEqual('test', texts[1][0])
 
 
+class TestBlockCompressed(unittest.TestCase):
+    def setUp(self):
+        self.fname = os.path.join(tempfile.gettempdir(), 'gensim_utils.tst.bgz')
+        self.lines = [('line %i %s\n' % (i, 'x' * (i % 37))).encode('utf8') for i in range(2000)]
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def test_roundtrip(self):
+        offsets = []
+        with utils.BlockCompressedWriter(self.fname, blocksize=1000) as fout:
+            fout.write(b'header          \n')
+            for line in self.lines:
+                offsets.append(fout.tell())
+                fout.write(line)
+            # overwrite a placeholder in the (already compressed) first block
+            fout.seek(7)
+            fout.write(b'42')
+            fout.seek(0, 2)
+        expected = b'header 42' + b' ' * 7 + b'\n' + b''.join(self.lines)
+
+        # each block is a separate gzip member => the whole file is a valid .gz file
+        with gzip.open(self.fname) as fin:
+            self.assertEqual(fin.read(), expected)
+
+        with utils.smart_open(self.fname) as fin:
+            self.assertTrue(isinstance(fin, utils.BlockCompressedReader))
+            self.assertTrue(len(fin.coffsets) > 1)
+            self.assertEqual(fin.read(), expected)
+            for lineno in [1500, 3, 1999, 0, 700]:
+                fin.seek(offsets[lineno])
+                self.assertEqual(fin.readline(), self.lines[lineno])
+                self.assertEqual(fin.tell(), offsets[lineno] + len(self.lines[lineno]))
+            fin.seek(offsets[3])
+            self.assertEqual(fin.readline(4), self.lines[3][:4])
+            self.assertEqual(fin.readline(), self.lines[3][4:])
+            fin.seek(0)
+            self.assertEqual(b''.join(fin), expected)
+
+    def test_modes(self):
+        with utils.smart_open(self.fname, 'wb') as fout:
+            fout.write(b''.join(self.lines))
+        # appending would rewrite (=truncate) the file
+        for mode in ('ab', 'a', 'r+b', 'wb+'):
+            self.assertRaises(ValueError, utils.smart_open, self.fname, mode)
+        with utils.smart_open(self.fname) as fin:
+            self.assertEqual(fin.read(), b''.join(self.lines))
+
+    def test_not_block_compressed(self):
+        with gzip.open(self.fname, 'wb') as fout:
+            fout.write(b''.join(self.lines))
+        self.assertRaises(IOError, utils.BlockCompressedReader, self.fname)
+
+
+class TestCorpusStats(unittest.TestCase):
+    def setUp(self):
+        self.fname = os.path.join(tempfile.gettempdir(), 'gensim_utils.tst.txt')
+        with open(self.fname, 'wb') as fout:
+            fout.write(b'x' * 100000)
+
+    def tearDown(self):
+        for fname in (self.fname, self.fname + utils.CORPUS_STATS_EXT):
+            if os.path.exists(fname):
+                os.remove(fname)
+
+    def test_roundtrip(self):
+        self.assertEqual(utils.load_corpus_stats(self.fname), None)
+        stats = utils.save_corpus_stats(self.fname, 10, num_nnz=20, num_terms=5)
+        self.assertEqual(utils.load_corpus_stats(self.fname), stats)
+        self.assertEqual((stats['num_docs'], stats['num_nnz'], stats['num_terms']), (10, 20, 5))
+        self.assertEqual(utils.corpus_length(FakeCorpusFile(self.fname)), 10)
+
+    def test_stale(self):
+        utils.save_corpus_stats(self.fname, 10)
+        # the same size, but different content at the end
+        with open(self.fname, 'r+b') as fout:
+            fout.seek(-1, 2)
+            fout.write(b'y')
+        self.assertEqual(utils.load_corpus_stats(self.fname), None)
+        self.assertEqual(utils.corpus_length(FakeCorpusFile(self.fname)), 3)
+
+
+class FakeCorpusFile(object):
+    """Corpus without a len(), backed by the file `fname`."""
+    def __init__(self, fname):
+        self.fname = fname
+
+    def __iter__(self):
+        return iter([[], [], []])
+
+
 if __name__ == '__main__':
     logging.root.setLevel(logging.WARNING)
     unittest.main()
@@ -9,8 +9,11 @@ Automated tests for checking the WikiCorpus
 """
 
 
+import bz2
 import os
+import re
 import sys
+import tempfile
 import types
 import logging
 import unittest
@@ -26,6 +29,29 @@ FILENAME_U = 'bgwiki-latest-pages-articles-shortened.xml.bz2'
 logger = logging.getLogger(__name__)
 
 
+def testfile():
+    # temporary data will be stored to this file
+    return os.path.join(tempfile.gettempdir(), 'gensim_wikicorpus.tst')
+
+
+def make_multistream(fname, out_fname, index_fname, pages_per_stream=3):
+    """Convert the plain bz2 dump `fname` into a multistream dump plus its index."""
+    with open(fname, 'rb') as fin:
+        xml = bz2.decompress(fin.read())
+    pages = re.findall(br'\s*<page>.*?</page>', xml, re.DOTALL)
+    header = xml[:xml.index(b'<page>')]
+    footer = xml[xml.rindex(b'</page>') + len(b'</page>'):]
+    with open(out_fname, 'wb') as fout, open(index_fname, 'wb') as findex:
+        fout.write(bz2.compress(header))
+        for i in range(0, len(pages), pages_per_stream):
+            offset = fout.tell()
+            for page in pages[i: i + pages_per_stream]:
+                pageid = re.search(br'<id>(\d+)</id>', page).group(1)
+                findex.write(str(offset).encode('ascii') + b':' + pageid + b':title\n')
+            fout.write(bz2.compress(b''.join(pages[i: i + pages_per_stream])))
+        fout.write(bz2.compress(footer))
+
+
 class TestWikiCorpus(unittest.TestCase):
 
     # #TODO: sporadic failure to be investigated
@@ -63,6 +89,48 @@ class TestWikiCorpus(unittest.TestCase):
         l = wc.get_texts()
         self.assertTrue(u'папа' in next(l))
 
+    def test_multistream(self):
+        fname, index_fname = testfile() + '.xml.bz2', testfile() + '-index.txt'
+        make_multistream(datapath(FILENAME), fname, index_fname)
+        try:
+            expected = WikiCorpus(datapath(FILENAME), processes=1)
+            expected.metadata = True
+            wc = WikiCorpus(fname, processes=2, index_fname=index_fname, dictionary=expected.dictionary)
+            wc.metadata = True
+            texts = list(wc.get_texts())
+            self.assertTrue(len(texts) > 0)
+            self.assertEqual(list(expected.get_texts()), texts)
+        finally:
+            os.remove(fname)
+            os.remove(index_fname)
+
+    def test_partition(self):
+        fname, index_fname = testfile() + '.xml.bz2', testfile() + '-index.txt'
+        make_multistream(datapath(FILENAME), fname, index_fname, pages_per_stream=2)
+        try:
+            wc = WikiCorpus(fname, processes=1, index_fname=index_fname)
+            expected = list(wc)
+            for num_partitions in (1, 2, 5):
+                self.assertEqual([doc for part in wc.split(num_partitions) for doc in part], expected)
+            # plain dumps can't be split without decompressing them in full
+            self.assertRaises(NotImplementedError, list, WikiCorpus(
+                datapath(FILENAME), processes=1, dictionary=wc.dictionary).partition(0, 2))
+        finally:
+            os.remove(fname)
+            os.remove(index_fname)
+
+    def test_texts_cache(self):
+        cache_fname = testfile()
+        try:
+            wc = WikiCorpus(datapath(FILENAME), processes=1, texts_cache=cache_fname)
+            expected = list(wc)
+            self.assertTrue(os.path.exists(cache_fname + '.header'))
+            self.assertEqual(expected, list(wc))
+        finally:
+            for fname in (cache_fname, cache_fname + '.header'):
+                if os.path.exists(fname):
+                    os.remove(fname)
+
 
 if __name__ == '__main__':
     logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.DEBUG)
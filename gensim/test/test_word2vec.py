@@ -12,6 +12,7 @@ Automated tests for checking transformation algorithms (the models package).
 import logging
 import unittest
 import os
+import shutil
 import tempfile
 import itertools
 import bz2
@@ -790,6 +791,48 @@ class TestWord2VecSentenceIterators(unittest.TestCase):
             for words in sentences:
                 self.assertEqual(words, utils.to_unicode(orig.readline()).split())
 
+    def testLineSentencePartitions(self):
+        """Do the parts of a LineSentence together yield all its sentences?"""
+        for fname in (datapath('lee_background.cor'), datapath('head500.noblanks.cor.bz2')):
+            sentences = word2vec.LineSentence(fname)
+            expected = list(sentences)
+            for num_partitions in (1, 3, 10):
+                parts = sentences.split(num_partitions)
+                self.assertEqual(len(parts), num_partitions)
+                got = [sentence for part in parts for sentence in part]
+                self.assertEqual(sorted(got), sorted(expected))
+                if not fname.endswith('.bz2'):
+                    # byte ranges of a plain file even keep the sentence order
+                    self.assertEqual(got, expected)
+
+        sentences = word2vec.LineSentence(datapath('lee_background.cor'), limit=20)
+        self.assertEqual(
+            sorted(sentence for part in sentences.split(3) for sentence in part), sorted(sentences))
+
+    def testPathLineSentencesPartitions(self):
+        """Do the parts of a PathLineSentences together yield all its sentences?"""
+        sentences = word2vec.PathLineSentences(datapath('PathLineSentences'))
+        expected = list(sentences)
+        for num_partitions in (1, 2, 3):
+            self.assertEqual([sentence for part in sentences.split(num_partitions) for sentence in part], expected)
+
+        # uncompressed files are split into byte ranges, across file boundaries
+        dirpath = tempfile.mkdtemp()
+        try:
+            with utils.smart_open(datapath('lee_background.cor')) as fin:
+                lines = fin.readlines()
+            for fileno, start in enumerate(range(0, len(lines), 100)):
+                with utils.smart_open(os.path.join(dirpath, '%i.txt' % fileno), 'wb') as fout:
+                    fout.writelines(lines[start: start + 100])
+            sentences = word2vec.PathLineSentences(dirpath)
+            expected = list(sentences)
+            for num_partitions in (1, 4, 7):
+                parts = sentences.split(num_partitions)
+                self.assertTrue(all(list(part) for part in parts))
+                self.assertEqual([sentence for part in parts for sentence in part], expected)
+        finally:
+            shutil.rmtree(dirpath)
+
 
 #endclass TestWord2VecSentenceIterators
 
@@ -27,6 +27,10 @@ except ImportError:
 import re
 import unicodedata
 import os
+import bisect
+import struct
+import threading
+import zlib
 import random
 import itertools
 import tempfile
@@ -48,7 +52,7 @@ from six import iterkeys, iteritems, u, string_types, unichr
 from six.moves import xrange
 
 try:
-    from smart_open import smart_open
+    from smart_open import smart_open as _smart_open
 except ImportError:
     logger.info("smart_open library not found; falling back to local-filesystem-only")
 
@@ -67,7 +71,7 @@ except ImportError:
             attrs['__exit__'] = lambda self, type, value, traceback: self.close()
         return type('Closing' + base.__name__, (base, object), attrs)
 
-    def smart_open(fname, mode='rb'):
+    def _smart_open(fname, mode='rb'):
         _, ext = os.path.splitext(fname)
         if ext == '.bz2':
             from bz2 import BZ2File
@@ -78,6 +82,305 @@ except ImportError:
         return open(fname, mode)
 
 
+#: Files with this extension are stored as a sequence of independently compressed
+#: gzip blocks, which allows fast seeking (see `BlockCompressedReader`).
+BLOCK_COMPRESSED_EXT = '.bgz'
+
+
+def smart_open(fname, mode='rb', *args, **kwargs):
+    """
+    Open `fname` (local path or URI), transparently (de)compressing '.gz' and '.bz2'
+    files via the `smart_open` library, and '.bgz' files via `BlockCompressedReader`
+    and `BlockCompressedWriter`.
+    """
+    if isinstance(fname, string_types) and fname.endswith(BLOCK_COMPRESSED_EXT):
+        if 'a' in mode or '+' in mode:
+            raise ValueError("block-compressed files can only be read or (over)written, not opened with mode %r" % mode)
+        if 'r' in mode:
+            return BlockCompressedReader(fname)
+        return BlockCompressedWriter(fname)
+    return _smart_open(fname, mode, *args, **kwargs)
+
+
+# gzip member header of a block-compressed file: magic, CM=deflate, FLG=FEXTRA, MTIME,
+# XFL, OS=unknown, XLEN, and an extra subfield "GZ" of length 8 that holds the
+# compressed size of the whole member and the uncompressed size of its data
+BLOCK_HEADER = struct.Struct('<BBBBIBBHBBHII')
+BLOCK_TRAILER = struct.Struct('<II')  # CRC32, ISIZE
+
+
+class BlockCompressedWriter(object):
+    """
+    Write a seekable, block-compressed file (similar to BGZF from SAMtools).
+
+    The data is cut into blocks of `blocksize` uncompressed bytes, and each block
+    is stored as a separate, self-contained gzip member. The result is a valid
+    .gz file (readable by `gunzip` or `gzip.GzipFile`), but any block can also be
+    decompressed on its own, see `BlockCompressedReader`.
+
+    `tell()` returns positions in the *uncompressed* data, so offsets recorded by
+    corpus writers (e.g. during `IndexedCorpus.serialize`) work directly with
+    `BlockCompressedReader.seek()`.
+
+    Seeking back is supported within the first block and within the block currently
+    being written, for overwriting placeholder headers (as done by `MmWriter`).
+    The first block is re-compressed on `close()` if it was overwritten.
+    """
+    def __init__(self, fname, blocksize=64 * 1024, compresslevel=6):
+        self.fname = fname
+        self.blocksize = blocksize
+        self.compresslevel = compresslevel
+        self.fout = open(fname, 'wb')
+        self.buffer = bytearray()  # uncompressed data of the block being written
+        self.pos = 0  # uncompressed length of all data written so far
+        self.cursor = None  # write position when overwriting earlier data, None when appending
+        self.first_block, self.first_block_dirty = None, False
+        self.block_offsets = []  # compressed offset of each block written so far
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self.fout is None
+
+    def _write_block(self, data):
+        if not self.block_offsets:
+            self.first_block = bytearray(data)
+        self.block_offsets.append(self.fout.tell())
+        self.fout.write(compress_block(bytes(data), self.compresslevel))
+
+    def write(self, data):
+        if self.cursor is None:
+            self.buffer.extend(data)
+            self.pos += len(data)
+            while len(self.buffer) >= self.blocksize:
+                self._write_block(self.buffer[:self.blocksize])
+                del self.buffer[:self.blocksize]
+            return
+
+        # overwriting previously written data
+        end = self.cursor + len(data)
+        buffer_start = self.pos - len(self.buffer)
+        if self.cursor >= buffer_start and end <= self.pos:
+            self.buffer[self.cursor - buffer_start: end - buffer_start] = data
+        elif self.first_block is not None and end <= len(self.first_block):
+            self.first_block[self.cursor: end] = data
+            self.first_block_dirty = True
+        else:
+            raise IOError("block-compressed file %s only supports overwriting within its first "
+                          "or its last block" % self.fname)
+        self.cursor = None if end == self.pos else end
+
+    def tell(self):
+        return self.pos if self.cursor is None else self.cursor
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.tell()
+        elif whence == 2:
+            offset += self.pos
+        if not 0 <= offset <= self.pos:
+            raise IOError("invalid seek position %i in %s" % (offset, self.fname))
+        self.cursor = None if offset == self.pos else offset
+        return offset
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.fout is None:
+            return
+        if self.buffer:
+            self._write_block(self.buffer)
+            self.buffer = bytearray()
+        self.fout.close()
+        self.fout = None
+
+        if self.first_block_dirty:
+            # re-compress the first block; its compressed size has most likely changed
+            logger.debug("re-compressing first block of %s", self.fname)
+            tmp_fname = self.fname + '.tmp'
+            with open(tmp_fname, 'wb') as fout:
+                fout.write(compress_block(bytes(self.first_block), self.compresslevel))
+                if len(self.block_offsets) > 1:
+                    with open(self.fname, 'rb') as fin:
+                        fin.seek(self.block_offsets[1])
+                        shutil.copyfileobj(fin, fout)
+            os.remove(self.fname)
+            os.rename(tmp_fname, self.fname)
+
+
+def compress_block(data, compresslevel=6):
+    """Return the bytestring `data` compressed into a single gzip member of a block-compressed file."""
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    cdata = compressor.compress(data) + compressor.flush()
+    size = BLOCK_HEADER.size + len(cdata) + BLOCK_TRAILER.size
+    header = BLOCK_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 255, 12, ord('G'), ord('Z'), 8, size, len(data))
+    return header + cdata + BLOCK_TRAILER.pack(zlib.crc32(data) & 0xffffffff, len(data) & 0xffffffff)
+
+
+def decompress_block(raw):
+    """Inverse of `compress_block`: return the data stored in the gzip member `raw`."""
+    data = zlib.decompress(raw[BLOCK_HEADER.size: -BLOCK_TRAILER.size], -zlib.MAX_WBITS)
+    crc, size = BLOCK_TRAILER.unpack(raw[-BLOCK_TRAILER.size:])
+    if size != len(data) & 0xffffffff or crc != zlib.crc32(data) & 0xffffffff:
+        raise IOError("corrupted block in block-compressed file")
+    return data
+
+
+class BlockCompressedReader(object):
+    """
+    Read-only, seekable file-like object over a file written by `BlockCompressedWriter`.
+
+    The block table is built on open, by hopping over the gzip member headers.
+    Seeking anywhere therefore costs (at most) a single block decompression,
+    unlike with `gzip.GzipFile`, which has to decompress everything from the
+    start of the file.
+
+    When the file is read sequentially, up to `workers` following blocks are
+    decompressed ahead of time in background threads (zlib releases the GIL),
+    so that full scans use several cores.
+    """
+    def __init__(self, fname, workers=None):
+        self.fname = fname
+        self.name = fname
+        self.fin = open(fname, 'rb')
+        self.workers = min(4, multiprocessing.cpu_count()) if workers is None else workers
+        self.lock = threading.Lock()
+        self.pool, self.prefetched = None, {}
+
+        coffsets, csizes, uoffsets = [], [], []
+        coffset, uoffset = 0, 0
+        while True:
+            header = self.fin.read(BLOCK_HEADER.size)
+            if not header:
+                break
+            fields = BLOCK_HEADER.unpack(header) if len(header) == BLOCK_HEADER.size else None
+            if fields is None or fields[:4] != (0x1f, 0x8b, 8, 4) or fields[8:11] != (ord('G'), ord('Z'), 8):
+                self.fin.close()
+                raise IOError("%s is not a block-compressed file (corrupted block at offset %i)" % (fname, coffset))
+            csize, usize = fields[11], fields[12]
+            coffsets.append(coffset)
+            csizes.append(csize)
+            uoffsets.append(uoffset)
+            coffset += csize
+            uoffset += usize
+            self.fin.seek(coffset)
+        self.coffsets, self.csizes, self.uoffsets = coffsets, csizes, uoffsets
+        self.size = uoffset
+        self.pos = 0
+        self.block_no, self.block = -1, b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self.fin is None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        if self.fin is not None:
+            self.fin.close()
+            self.fin = None
+
+    def _read_block(self, block_no):
+        with self.lock:
+            self.fin.seek(self.coffsets[block_no])
+            raw = self.fin.read(self.csizes[block_no])
+        return decompress_block(raw)
+
+    def _load_block(self, block_no):
+        if block_no == self.block_no:
+            return
+        sequential = block_no == self.block_no + 1
+        result = self.prefetched.pop(block_no, None)
+        self.block = result.get() if result is not None else self._read_block(block_no)
+        self.block_no = block_no
+
+        for stale in [no for no in self.prefetched if no < block_no or no > block_no + self.workers]:
+            del self.prefetched[stale]
+        if sequential and self.workers > 0:
+            if self.pool is None:
+                from multiprocessing.pool import ThreadPool
+                self.pool = ThreadPool(self.workers)
+            for no in xrange(block_no + 1, min(block_no + 1 + self.workers, len(self.coffsets))):
+                if no not in self.prefetched:
+                    self.prefetched[no] = self.pool.apply_async(self._read_block, (no,))
+
+    def _seek_block(self):
+        """Make sure the block containing the current position is loaded; return offset within it."""
+        block_no = self.block_no
+        if not (0 <= block_no and self.uoffsets[block_no] <= self.pos < self.uoffsets[block_no] + len(self.block)):
+            block_no = bisect.bisect_right(self.uoffsets, self.pos) - 1
+            self._load_block(block_no)
+        return self.pos - self.uoffsets[block_no]
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.pos
+        parts = []
+        while size > 0 and self.pos < self.size:
+            offset = self._seek_block()
+            part = self.block[offset: offset + size]
+            parts.append(part)
+            self.pos += len(part)
+            size -= len(part)
+        return b''.join(parts)
+
+    def readline(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self.pos
+        parts = []
+        while size > 0 and self.pos < self.size:
+            offset = self._seek_block()
+            limit = min(offset + size, len(self.block))
+            end = self.block.find(b'\n', offset, limit)
+            part = self.block[offset: end + 1] if end >= 0 else self.block[offset: limit]
+            parts.append(part)
+            self.pos += len(part)
+            size -= len(part)
+            if end >= 0:
+                break
+        return b''.join(parts)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+    next = __next__  # python 2
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.pos
+        elif whence == 2:
+            offset += self.size
+        self.pos = max(0, offset)
+        return self.pos
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+
 PAT_ALPHABETIC = re.compile('(((?![\d])\w)+)', re.UNICODE)
 RE_HTML_ENTITY = re.compile(r'&(#?)([xX]?)(\w{1,8});', re.UNICODE)
 
@@ -734,12 +1037,19 @@ class SlicedCorpus(SaveLoad):
 
     def __iter__(self):
         if hasattr(self.corpus, 'index') and len(self.corpus.index) > 0:
-            return (self.corpus.docbyoffset(i) for i in
-                    self.corpus.index[self.slice_])
+            offsets = self.corpus.index[self.slice_]
+            if hasattr(self.corpus, 'docbyoffsets'):
+                return self._iter_batches(offsets, getattr(self.corpus, 'batchsize', 10000))
+            return (self.corpus.docbyoffset(i) for i in offsets)
         else:
             return itertools.islice(self.corpus, self.slice_.start,
                                     self.slice_.stop, self.slice_.step)
 
+    def _iter_batches(self, offsets, batchsize):
+        for start in xrange(0, len(offsets), batchsize):
+            for doc in self.corpus.docbyoffsets(offsets[start: start + batchsize]):
+                yield doc
+
     def __len__(self):
         # check cached length, calculate if needed
         if self.length is None:
@@ -751,6 +1061,98 @@ class SlicedCorpus(SaveLoad):
         return self.length
 
 
+class CorpusPartition(SaveLoad):
+    def __init__(self, corpus, partno, num_partitions):
+        """
+        Return the `partno`-th of `num_partitions` disjoint parts of `corpus`,
+        as iterated by `corpus.iter_partition(partno, num_partitions)`.
+
+        All parts together yield each document of `corpus` exactly once. Each part
+        reads its documents directly from the underlying storage, so the parts can
+        be pickled to different processes and iterated there independently.
+
+        >>> parts = corpus.split(4)  # == [corpus.partition(partno, 4) for partno in range(4)]
+        >>> pool.map(worker_function, parts)
+
+        """
+        if not 0 <= partno < num_partitions:
+            raise ValueError("invalid partition %i of %i" % (partno, num_partitions))
+        self.corpus = corpus
+        self.partno = partno
+        self.num_partitions = num_partitions
+
+    def __iter__(self):
+        return self.corpus.iter_partition(self.partno, self.num_partitions)
+
+
+def partition_range(total, partno, num_partitions):
+    """
+    Return the `(start, end)` bounds of the `partno`-th of `num_partitions`
+    contiguous, (almost) equally sized parts of `range(total)`.
+
+    >>> [partition_range(10, partno, 3) for partno in range(3)]
+    [(0, 3), (3, 6), (6, 10)]
+
+    """
+    if not 0 <= partno < num_partitions:
+        raise ValueError("invalid partition %i of %i" % (partno, num_partitions))
+    return total * partno // num_partitions, total * (partno + 1) // num_partitions
+
+
+def is_plain_file(fname):
+    """
+    Is `fname` the path of an uncompressed local file, ie. one that can be
+    seeked to any byte offset cheaply?
+    """
+    return (
+        isinstance(fname, string_types) and os.path.isfile(fname) and
+        not fname.endswith(('.gz', '.bz2', BLOCK_COMPRESSED_EXT)))
+
+
+def iter_lines_range(fname, start, end):
+    """
+    Yield the lines (as bytestrings) of the uncompressed file `fname` that begin
+    at a byte offset within `[start, end)`.
+
+    Only that part of the file is read: a line belongs to the range its first byte
+    falls into, so adjacent ranges always yield disjoint lines, and all ranges of
+    a partitioning of the file together yield every line exactly once.
+    """
+    with open(fname, 'rb') as fin:
+        pos = start
+        if start > 0:
+            # skip the rest of a line that began before `start`
+            fin.seek(start - 1)
+            pos = start - 1 + len(fin.readline())
+        for line in fin:
+            if pos >= end:
+                break
+            yield line
+            pos += len(line)
+
+
+def iter_lines_partition(input, partno, num_partitions, limit=None):
+    """
+    Yield the lines of the `partno`-th of `num_partitions` disjoint parts of the
+    text `input` (a file name, or a file-like object supporting seek).
+
+    An uncompressed local file is split into equally sized byte ranges, see
+    `iter_lines_range`, and only the `partno`-th range is read. Anything else
+    (compressed files, file-like objects, or `limit` set to clip the input to its
+    first `limit` lines) has to be read from the start; every `num_partitions`-th
+    line, starting with line number `partno`, is yielded then.
+    """
+    if limit is None and is_plain_file(input):
+        start, end = partition_range(os.path.getsize(input), partno, num_partitions)
+        for line in iter_lines_range(input, start, end):
+            yield line
+    else:
+        partition_range(0, partno, num_partitions)  # validate the arguments
+        with file_or_filename(input) as fin:
+            for line in itertools.islice(fin, partno, limit, num_partitions):
+                yield line
+
+
 def safe_unichr(intval):
     try:
         return unichr(intval)
@@ -940,6 +1342,88 @@ def unpickle(fname):
             return _pickle.loads(f.read())
 
 
+#: File name extension of the corpus statistics stored next to a corpus file, see `save_corpus_stats`.
+CORPUS_STATS_EXT = '.stats'
+
+
+def file_checksum(fname, blocksize=65536):
+    """
+    Return a cheap checksum of the file `fname`, as a `(size in bytes, CRC32)`
+    2-tuple, where the CRC32 only covers the first and last `blocksize` bytes.
+
+    Meant to notice a replaced or rewritten file without reading all of it; unlike
+    the modification time, it is kept when the file is copied around.
+    """
+    size = os.path.getsize(fname)
+    with open(fname, 'rb') as fin:
+        crc = zlib.crc32(fin.read(blocksize))
+        if size > blocksize:
+            fin.seek(max(blocksize, size - blocksize))
+            crc = zlib.crc32(fin.read(blocksize), crc)
+    return size, crc & 0xffffffff
+
+
+def save_corpus_stats(fname, num_docs, num_nnz=None, num_terms=None):
+    """
+    Store statistics of the corpus saved in the local file `fname` in a small
+    sidecar file next to it (`fname.stats`), so that consumers which need them
+    don't have to make an extra pass over the corpus.
+
+    The statistics are the number of documents, the number of non-zero entries and
+    the number of terms (1 + the highest term id), None if not known, along with
+    the byte size and checksum of `fname` (see `file_checksum`) to detect stale
+    statistics. Return the statistics as a dict.
+    """
+    size, checksum = file_checksum(fname)
+    stats = {
+        'num_docs': num_docs, 'num_nnz': num_nnz, 'num_terms': num_terms,
+        'size': size, 'checksum': checksum,
+    }
+    stats_fname = smart_extension(fname, CORPUS_STATS_EXT)
+    logger.info("saving corpus statistics %s to %s", stats, stats_fname)
+    pickle(stats, stats_fname)
+    return stats
+
+
+def load_corpus_stats(fname):
+    """
+    Return the corpus statistics stored by `save_corpus_stats` for the corpus file
+    `fname` as a dict, or None if there are none, or they're out of date because
+    `fname` changed since they were saved.
+    """
+    if not isinstance(fname, string_types):
+        return None
+    stats_fname = smart_extension(fname, CORPUS_STATS_EXT)
+    if not (os.path.isfile(stats_fname) and os.path.isfile(fname)):
+        return None
+    try:
+        stats = unpickle(stats_fname)
+    except Exception as err:
+        logger.warning("failed to load corpus statistics from %s: %s", stats_fname, err)
+        return None
+    if (stats.get('size'), stats.get('checksum')) != file_checksum(fname):
+        logger.info("ignoring out of date corpus statistics %s", stats_fname)
+        return None
+    return stats
+
+
+def corpus_length(corpus):
+    """
+    Return the number of documents in `corpus`: its `len()` if it has one, else the
+    number from the corpus statistics saved for its file `corpus.fname` (see
+    `save_corpus_stats`), else count the documents with a full pass over `corpus`.
+    """
+    try:
+        return len(corpus)
+    except Exception:
+        pass
+    stats = load_corpus_stats(getattr(corpus, 'fname', None))
+    if stats is not None:
+        return stats['num_docs']
+    logger.warning("input corpus stream has no len(); counting documents")
+    return sum(1 for _ in corpus)
+
+
 def revdict(d):
     """
     Reverse a dictionary mapping.
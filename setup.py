@@ -248,6 +248,15 @@ setup(
             include_dirs=[model_dir]),
         Extension('gensim.models.doc2vec_inner',
             sources=['./gensim/models/doc2vec_inner.c'],
+            include_dirs=[model_dir]),
+        Extension('gensim._matutils',
+            sources=['./gensim/_matutils.c'],
+            include_dirs=[gensim_dir]),
+        Extension('gensim.models.ldamodel_inner',
+            sources=['./gensim/models/ldamodel_inner.c'],
+            include_dirs=[model_dir]),
+        Extension('gensim.models.ldagibbs_inner',
+            sources=['./gensim/models/ldagibbs_inner.c'],
             include_dirs=[model_dir])
     ],
     cmdclass=cmdclass,